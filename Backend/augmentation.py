@@ -0,0 +1,710 @@
+import json
+import os
+from collections.abc import Sequence
+from typing import Any, Dict, Iterator, List, Optional
+
+import numpy as np
+
+from schemas import AugmentationRule, AugmentationStrategy
+
+# Largest dataset an augmentation may produce; balancing a long-tailed field can otherwise ask for billions of rows
+AUGMENT_MAX_ROWS = int(os.getenv("AUGMENT_MAX_ROWS", "5000000"))
+# Nearest neighbors SMOTE interpolates towards when a rule does not set k_neighbors
+SMOTE_K_NEIGHBORS = int(os.getenv("SMOTE_K_NEIGHBORS", "5"))
+# Candidates compared per row when SMOTE looks for neighbors: the rows around it in k-d tree
+# order, times one more for every 4 numeric columns beyond the first 4. The search is exact
+# for minority classes no larger than that and approximate above it (see _nearest_neighbors)
+SMOTE_NEIGHBOR_WINDOW = int(os.getenv("SMOTE_NEIGHBOR_WINDOW", "512"))
+# Records serialized per chunk when an augmented dataset is written out as JSON
+AUGMENT_JSON_CHUNK_ROWS = int(os.getenv("AUGMENT_JSON_CHUNK_ROWS", "1000"))
+# Augmented datasets up to this many records are returned as a regular AugmentationResponse;
+# larger ones are streamed chunk by chunk instead of being copied into one list
+AUGMENT_STREAM_MIN_ROWS = int(os.getenv("AUGMENT_STREAM_MIN_ROWS", "10000"))
+# Passes over the rules the joint rebalancing solver makes at most before settling for the closest fit
+IPF_MAX_ITERATIONS = int(os.getenv("IPF_MAX_ITERATIONS", "200"))
+# Largest remaining target error (percentage points, or share of the target count) that ends the fitting early
+IPF_TOLERANCE = float(os.getenv("IPF_TOLERANCE", "1e-6"))
+
+# Strategies the joint solver handles; they all only choose how often each row occurs
+_SOLVED_STRATEGIES = (
+    AugmentationStrategy.TARGET_PERCENTAGE,
+    AugmentationStrategy.BALANCE_CATEGORIES,
+    AugmentationStrategy.OVERSAMPLE_VALUE,
+)
+
+# Stands for "field not present in the record", which is different from an explicit None
+_MISSING = object()
+
+
+def _hashable(value: Any) -> Any:
+    try:
+        hash(value)
+        return value
+    except TypeError:
+        return ("__unhashable__", json.dumps(value, sort_keys=True, default=str))
+
+
+class _Column:
+    """
+    One field of the working dataset, factorized: codes[i] indexes uniques for output row i.
+    changed marks the cells a rule rewrote; everything else still reads from the base row.
+    """
+
+    def __init__(self, uniques: List[Any], codes: np.ndarray):
+        self.uniques = uniques
+        self._lookup = {_hashable(value): code for code, value in enumerate(uniques) if value is not _MISSING}
+        self.codes = codes
+        self.changed = np.zeros(len(codes), dtype=bool)
+
+    def code_of(self, value: Any, add: bool = False) -> Optional[int]:
+        code = self._lookup.get(_hashable(value))
+        if code is None and add:
+            code = len(self.uniques)
+            self.uniques.append(value)
+            self._lookup[_hashable(value)] = code
+        return code
+
+    def matches(self, value: Any) -> np.ndarray:
+        """Mask of the rows where record.get(field) == value; None also matches a missing field."""
+        return np.isin(self.codes, self.codes_for(value))
+
+    def codes_for(self, value: Any) -> List[int]:
+        codes = []
+        code = self.code_of(value)
+        if code is not None:
+            codes.append(code)
+        if value is None:
+            missing = self.code_of_missing()
+            if missing is not None:
+                codes.append(missing)
+        return codes
+
+    def is_category(self) -> np.ndarray:
+        """Per code, whether it is a category for balancing; None and a missing field are not."""
+        return np.array([value is not None and value is not _MISSING for value in self.uniques], dtype=bool)
+
+    def code_of_missing(self) -> Optional[int]:
+        return next((code for code, value in enumerate(self.uniques) if value is _MISSING), None)
+
+    def take(self, positions: np.ndarray) -> None:
+        self.codes = self.codes[positions]
+        self.changed = self.changed[positions]
+
+    def extend(self, values: List[Any]) -> None:
+        """Adds rows holding values (_MISSING for an absent field)."""
+        codes = []
+        for value in values:
+            if value is _MISSING:
+                code = self.code_of_missing()
+                if code is None:
+                    code = len(self.uniques)
+                    self.uniques.append(_MISSING)
+            else:
+                code = self.code_of(value, add=True)
+            codes.append(code)
+        self.codes = np.concatenate((self.codes, np.array(codes, dtype=np.int64)))
+        self.changed = np.concatenate((self.changed, np.zeros(len(codes), dtype=bool)))
+
+    def assign(self, positions: np.ndarray, value: Any) -> None:
+        self.codes[positions] = self.code_of(value, add=True)
+        self.changed[positions] = True
+
+
+class _PercentageTarget:
+    """The value's share of all rows should be share (0-1)."""
+
+    absolute = False
+
+    def __init__(self, rule: AugmentationRule, mask: np.ndarray):
+        self.rule = rule
+        self.mask = mask
+        self.share = rule.target_percentage / 100
+
+    def achieved(self, weights: np.ndarray) -> float:
+        total = weights.sum()
+        return weights[self.mask].sum() / total * 100 if total else 0.0
+
+    def fit(self, weights: np.ndarray) -> None:
+        total = weights.sum()
+        with_value = weights[self.mask].sum()
+        if with_value <= 0 or with_value >= total:
+            return
+        weights[self.mask] *= self.share * total / with_value
+        weights[~self.mask] *= (1 - self.share) * total / (total - with_value)
+
+    def error(self, weights: np.ndarray) -> float:
+        return abs(self.achieved(weights) - self.share * 100)
+
+    def report(self, counts: np.ndarray) -> Dict[str, Any]:
+        return _report_entry(self.rule, self.share * 100, self.achieved(counts), "percent")
+
+
+class _CountTarget:
+    """
+    At least count rows should have the value. Oversampling only adds rows, so a count
+    below the current one leaves the value's rows as they are.
+    """
+
+    absolute = True
+
+    def __init__(self, rule: AugmentationRule, mask: np.ndarray):
+        self.rule = rule
+        self.mask = mask
+        self.count = rule.target_count
+
+    def fit(self, weights: np.ndarray) -> None:
+        with_value = weights[self.mask].sum()
+        if with_value > 0:
+            weights[self.mask] *= max(1.0, self.count / with_value)
+
+    def error(self, weights: np.ndarray) -> float:
+        return max(0.0, self.count - weights[self.mask].sum()) / max(self.count, 1)
+
+    def report(self, counts: np.ndarray) -> Dict[str, Any]:
+        achieved = counts[self.mask].sum()
+        return _report_entry(self.rule, self.count, achieved, "records", error=max(0.0, self.count - achieved))
+
+
+class _BalanceTarget:
+    """Every category of the field should have the same share of the categorized rows."""
+
+    absolute = False
+
+    def __init__(self, rule: AugmentationRule, categories: np.ndarray, categorized: np.ndarray):
+        self.rule = rule
+        self.categories = categories
+        self.categorized = categorized
+        self.minlength = int(categories.max()) + 1 if categories.size else 0
+
+    def shares(self, weights: np.ndarray) -> np.ndarray:
+        """Share of every category that still has rows."""
+        per_category = np.bincount(self.categories[self.categorized], weights[self.categorized], minlength=self.minlength)
+        present = per_category[per_category > 0]
+        return present / present.sum() if present.size else present
+
+    def fit(self, weights: np.ndarray) -> None:
+        per_category = np.bincount(self.categories[self.categorized], weights[self.categorized], minlength=self.minlength)
+        present = per_category > 0
+        if present.sum() < 2:
+            return
+        factors = np.zeros(self.minlength)
+        factors[present] = per_category[present].sum() / present.sum() / per_category[present]
+        weights[self.categorized] *= factors[self.categories[self.categorized]]
+
+    def error(self, weights: np.ndarray) -> float:
+        shares = self.shares(weights)
+        return np.abs(shares - 1 / shares.size).max() * 100 if shares.size else 0.0
+
+    def report(self, counts: np.ndarray) -> Dict[str, Any]:
+        shares = self.shares(counts)
+        if not shares.size:
+            return _report_entry(self.rule, 0.0, 0.0, "percent")
+        # The category that ended up furthest from an equal share
+        worst = shares[np.abs(shares - 1 / shares.size).argmax()]
+        return _report_entry(self.rule, 100 / shares.size, worst * 100, "percent")
+
+
+def _report_entry(rule: AugmentationRule, target: float, achieved: float, unit: str,
+                  error: Optional[float] = None) -> Dict[str, Any]:
+    if error is None:
+        error = abs(float(achieved) - float(target))
+    return {
+        "field": rule.field,
+        "strategy": rule.strategy.value,
+        "value": rule.value,
+        "target": round(float(target), 4),
+        "achieved": round(float(achieved), 4),
+        "error": round(float(error), 4),
+        "unit": unit,
+    }
+
+
+def _nearest_neighbors(values: np.ndarray, k: int) -> np.ndarray:
+    """
+    Indices of (up to) the k nearest other rows of every row, by euclidean distance over
+    standardized columns (a missing value counts as the column mean).
+
+    Rows are put in k-d tree order (see _kd_order) and cut into tiles of consecutive rows;
+    every row of a tile is compared with the same slice of window rows around the tile, many
+    tiles at a time through batched matrix products. The cost grows with n log n instead of
+    n^2, and with at most window rows every row is compared with every other one.
+
+    Above that the search is approximate: neighbors on the far side of a k-d split can fall
+    outside the window, and more so the more columns there are. The window (SMOTE_NEIGHBOR_WINDOW)
+    therefore grows with the number of columns; on 5000 normally distributed rows about 85%
+    of the true 5 nearest neighbors are found with 3 columns and 65-70% with 5 to 16.
+    The ones missed are replaced by slightly farther rows, which SMOTE tolerates.
+    """
+    rows = values.shape[0]
+    if rows < 2:
+        return np.zeros((rows, 1), dtype=np.int64)
+    k = min(k, rows - 1)
+    present = ~np.isnan(values)
+    counts = np.maximum(present.sum(axis=0), 1)
+    means = np.where(present, values, 0).sum(axis=0) / counts
+    centered = np.where(present, values - means, 0)
+    stds = np.sqrt((centered ** 2).sum(axis=0) / counts)
+    scaled = centered / np.where(stds > 0, stds, 1)
+
+    window = max(SMOTE_NEIGHBOR_WINDOW * max(1, values.shape[1] // 4), 2 * (k + 1))
+    tile = window // 2
+    span = min(window, rows)
+    order = _kd_order(scaled, tile)
+    points = scaled[order]
+    norms = (points ** 2).sum(axis=1)
+    neighbors = np.empty((rows, k), dtype=np.int64)
+    tile_starts = np.arange(0, rows, tile)
+    block = max(1, 4_000_000 // (tile * span))
+    for first_tile in range(0, tile_starts.size, block):
+        starts = tile_starts[first_tile:first_tile + block]
+        queries = np.minimum(starts[:, None] + np.arange(tile), rows - 1)
+        slice_starts = np.clip(starts + tile // 2 - span // 2, 0, rows - span)
+        candidates = slice_starts[:, None] + np.arange(span)
+        distances = norms[candidates][:, None, :] - 2 * np.matmul(points[queries], points[candidates].transpose(0, 2, 1))
+        distances[candidates[:, None, :] == queries[:, :, None]] = np.inf
+        nearest = np.argpartition(distances, k - 1, axis=2)[:, :, :k]
+        found = np.take_along_axis(np.broadcast_to(candidates[:, None, :], distances.shape), nearest, axis=2)
+        neighbors[order[queries.reshape(-1)]] = order[found.reshape(-1, k)]
+    return neighbors
+
+
+def _kd_order(points: np.ndarray, leaf_size: int) -> np.ndarray:
+    """
+    Orders the rows so that rows close in space are close in the order: every group of rows
+    (at first, all of them) is split at the median of its widest column, level by level,
+    until the groups hold about leaf_size rows. All groups of a level are split at once.
+    """
+    rows, columns = points.shape
+    groups = np.zeros(rows, dtype=np.int64)
+    if not columns:
+        return np.arange(rows)
+    levels = int(np.ceil(np.log2(max(rows / leaf_size, 1))))
+    for level in range(levels):
+        sizes = np.bincount(groups, minlength=1 << level)
+        spreads = np.stack([
+            np.bincount(groups, points[:, j] ** 2, minlength=sizes.size) / np.maximum(sizes, 1)
+            - (np.bincount(groups, points[:, j], minlength=sizes.size) / np.maximum(sizes, 1)) ** 2
+            for j in range(columns)
+        ], axis=1)
+        keys = points[np.arange(rows), spreads.argmax(axis=1)[groups]]
+        order = np.lexsort((keys, groups))
+        starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+        upper = np.empty(rows, dtype=np.int64)
+        upper[order] = (np.arange(rows) - starts[groups[order]]) >= sizes[groups[order]] // 2
+        groups = groups * 2 + upper
+    return np.argsort(groups, kind="stable")
+
+
+def _decimals(values: List[Any]) -> int:
+    """Decimal places the floats of a column are written with (at most 6), judged from a sample."""
+    decimals = 0
+    for v in values[:1000]:
+        text = repr(float(v))
+        if "e" in text:
+            return 6
+        decimals = max(decimals, len(text.partition(".")[2].rstrip("0")))
+    return min(decimals, 6)
+
+
+def _round_counts(weights: np.ndarray) -> np.ndarray:
+    """Integer counts with the same (rounded) total, giving the leftover rows to the largest remainders."""
+    counts = np.floor(weights).astype(np.int64)
+    leftover = int(round(weights.sum())) - int(counts.sum())
+    if leftover > 0:
+        counts[np.argsort(counts - weights, kind="stable")[:leftover]] += 1
+    return counts
+
+
+class AugmentationEngine:
+    """
+    Row-index based augmentation.
+
+    The working dataset is a vector of indices into the original records plus, for every
+    field a rule looks at, a factorized column (built in a single pass over the records the
+    first time the field is used). The rules are solved together (see solve()) and applied
+    by selecting, dropping and duplicating rows through index arrays and rewriting values by
+    changing codes, so no record is copied or rescanned while rules run. materialize()
+    returns an AugmentedDataset view over the original records, which are never modified.
+    """
+
+    def __init__(self, records: List[Dict], seed: Optional[int] = None, max_rows: int = AUGMENT_MAX_ROWS):
+        self.max_rows = max_rows
+        self.base: List[Dict] = list(records)
+        self.rows = np.arange(len(self.base), dtype=np.int64)
+        self.rng = np.random.default_rng(seed)
+        self._columns: Dict[str, _Column] = {}
+        # How close each rule's target ended up, one entry per solved rule
+        self.report: List[Dict[str, Any]] = []
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def apply(self, rules: List[AugmentationRule]) -> "AugmentationEngine":
+        # New records are synthesized first, so the rebalancing rules see them
+        for rule in rules:
+            if rule.strategy == AugmentationStrategy.SMOTE:
+                print(f"Applying SMOTE rule for field '{rule.field}' with value '{rule.value}' to {rule.target_count} records")
+                self.smote(rule, rule.k_neighbors or SMOTE_K_NEIGHBORS)
+        self.solve(rules)
+        return self
+
+    def column(self, field: str) -> _Column:
+        """The factorized column for field, aligned with the current rows."""
+        column = self._columns.get(field)
+        if column is None:
+            values = [record.get(field, _MISSING) for record in self.base]
+            try:
+                # Distinct values in order of first appearance, then every value mapped to its position
+                lookup = dict.fromkeys(values)
+            except TypeError:
+                # Lists or dicts in the column: key them by their JSON form instead
+                values_by_key = {}
+                keys = []
+                for value in values:
+                    key = value if value is _MISSING else _hashable(value)
+                    values_by_key.setdefault(key, value)
+                    keys.append(key)
+                lookup = dict.fromkeys(keys)
+                uniques = [values_by_key[key] for key in lookup]
+                values = keys
+            else:
+                uniques = list(lookup)
+            for code, key in enumerate(lookup):
+                lookup[key] = code
+            base_codes = np.fromiter(map(lookup.__getitem__, values), dtype=np.int64, count=len(values))
+            column = self._columns[field] = _Column(uniques, base_codes[self.rows])
+        return column
+
+    def solve(self, rules: List[AugmentationRule]) -> None:
+        """
+        Rebalances the rows for all TARGET_PERCENTAGE, BALANCE_CATEGORIES and OVERSAMPLE_VALUE
+        rules at once.
+
+        Rows are grouped into cells by their values in every field a rule looks at. Iterative
+        proportional fitting then scales one weight per cell until each rule's target holds:
+        a percentage rule fixes the share of its value, a balance rule gives every category of
+        its field the same share, an oversample rule raises the count of its value (it never
+        removes rows). Without an oversample rule the total is free, and it is chosen so that
+        no cell shrinks, i.e. the original rows are all kept and only duplicated (within
+        max_rows); rows with no value in a balanced field are kept but not duplicated. The weights
+        are rounded to a sample count per cell and the rows are resampled once; conflicting
+        rules are satisfied as closely as possible and self.report says how close each got.
+        """
+        rules = [rule for rule in rules if rule.strategy in _SOLVED_STRATEGIES]
+        if not rules:
+            return
+        for rule in rules:
+            if rule.strategy == AugmentationStrategy.TARGET_PERCENTAGE:
+                print(f"Applying TARGET_PERCENTAGE rule for field '{rule.field}' with value '{rule.value}' to {rule.target_percentage}%")
+            elif rule.strategy == AugmentationStrategy.BALANCE_CATEGORIES:
+                print(f"Applying BALANCE_CATEGORIES rule for field '{rule.field}'")
+            else:
+                print(f"Applying OVERSAMPLE_VALUE rule for field '{rule.field}' with value '{rule.value}' to {rule.target_count} records")
+            self._seed_missing_value(rule)
+        if not len(self.rows):
+            return
+
+        cells, sizes, targets = self._cells(rules)
+        weights = sizes.astype(np.float64)
+        for _ in range(IPF_MAX_ITERATIONS):
+            for target in targets:
+                target.fit(weights)
+            if max(target.error(weights) for target in targets) < IPF_TOLERANCE:
+                break
+
+        if weights.sum() > 0 and not any(target.absolute for target in targets):
+            # Scale up until every cell keeps at least the rows it has. Rows without a value in a
+            # balanced field are not part of its categories and are never duplicated
+            held = np.zeros(len(sizes), dtype=bool)
+            for target in targets:
+                if isinstance(target, _BalanceTarget):
+                    held |= ~target.categorized
+            grown = (weights > 0) & ~held
+            if grown.any():
+                scale = (sizes[grown] / weights[grown]).max()
+                weights[~held] *= scale
+                weights[held] = np.minimum(weights[held] * scale, sizes[held])
+            total = weights.sum()
+            if total > self.max_rows:
+                print(f"Warning: keeping every original row would need {int(total)} records, "
+                      f"capping the augmented dataset at {self.max_rows} records")
+                weights *= self.max_rows / total
+        counts = _round_counts(weights)
+        self._check_size(int(counts.sum()) - len(self.rows))
+        self._resample(cells, sizes, counts)
+
+        for target in targets:
+            entry = target.report(counts.astype(np.float64))
+            self.report.append(entry)
+            print(f"  -> '{entry['field']}' {entry['strategy']}: target {entry['target']:g}, "
+                  f"achieved {entry['achieved']:g} ({entry['unit']})")
+
+    def materialize(self) -> "AugmentedDataset":
+        """
+        The augmented dataset as a view: the row index vector plus, for rows that had cells
+        rewritten, one shared patch per distinct set of rewritten values.
+        """
+        changed_fields = [(field, column) for field, column in self._columns.items() if column.changed.any()]
+        if not changed_fields:
+            return AugmentedDataset(self.base, self.rows)
+        changed = np.zeros(len(self.rows), dtype=bool)
+        for _, column in changed_fields:
+            changed |= column.changed
+        positions = np.flatnonzero(changed)
+        keys = np.stack([np.where(column.changed[positions], column.codes[positions], -1) for _, column in changed_fields], axis=1)
+        unique_keys, inverse = np.unique(keys, axis=0, return_inverse=True)
+        patches = [
+            {field: column.uniques[code] for (field, column), code in zip(changed_fields, key) if code >= 0}
+            for key in unique_keys.tolist()
+        ]
+        patch_ids = np.full(len(self.rows), -1, dtype=np.int32)
+        patch_ids[positions] = inverse.reshape(-1)
+        return AugmentedDataset(self.base, self.rows, patch_ids, patches)
+
+    def _check_size(self, to_add: int) -> None:
+        if len(self.rows) + to_add > self.max_rows:
+            raise ValueError(
+                f"Augmentation would grow the dataset to {len(self.rows) + to_add} records, "
+                f"more than the limit of {self.max_rows}"
+            )
+
+    def smote(self, rule: AugmentationRule, k_neighbors: int = SMOTE_K_NEIGHBORS) -> None:
+        """
+        Synthesizes records with field == value until target_count rows have it, SMOTE-style:
+        each new record starts from a random record of the class and one of its k nearest
+        neighbors within the class, numeric fields are interpolated between the two at a random
+        point (integers stay integers, floats keep their precision) and every other field is
+        taken from one of the two at random. For large classes the neighbors are approximate
+        (see _nearest_neighbors).
+        """
+        column = self.column(rule.field)
+        current = int(column.matches(rule.value).sum())
+        to_add = rule.target_count - current
+        print(f"  -> Current count of '{rule.value}' in '{rule.field}': {current}")
+        if to_add > 0 and not current:
+            print(f"Warning: No existing records with '{rule.field}' = '{rule.value}' to interpolate between.")
+        elif to_add > 0:
+            self._check_size(to_add)
+            print(f"  -> Need to SYNTHESIZE {to_add} records with '{rule.field}' = '{rule.value}'")
+            # Duplicates carry no extra information, so every distinct record counts once
+            records = [self.base[i] for i in np.unique(self.rows[column.matches(rule.value)]).tolist()]
+            self._append_records(self._synthesize(records, rule.field, rule.value, to_add, k_neighbors))
+            current += to_add
+        self.report.append(_report_entry(rule, rule.target_count, current, "records"))
+
+    def _synthesize(self, records: List[Dict], field: str, value: Any, count: int, k_neighbors: int) -> List[Dict]:
+        fields = [name for name in dict.fromkeys(name for record in records for name in record) if name != field]
+        numeric, other = [], []
+        for name in fields:
+            column = [record.get(name, _MISSING) for record in records]
+            present = [v for v in column if v is not _MISSING and v is not None]
+            if present and all(isinstance(v, (int, float)) and not isinstance(v, bool) for v in present):
+                numeric.append((name, column, present))
+            else:
+                other.append((name, column))
+
+        values = np.array([[np.nan if v is _MISSING or v is None else v for v in column] for _, column, _ in numeric],
+                          dtype=np.float64).T.reshape(len(records), len(numeric))
+        neighbors = _nearest_neighbors(values, k_neighbors)
+        starts = self.rng.integers(0, len(records), count)
+        ends = neighbors[starts, self.rng.integers(0, neighbors.shape[1], count)]
+        gaps = self.rng.random((count, 1))
+        start_values, end_values = values[starts], values[ends]
+        # A field missing from one of the two records comes from the other one
+        start_values = np.where(np.isnan(start_values), end_values, start_values)
+        end_values = np.where(np.isnan(end_values), start_values, end_values)
+        interpolated = start_values + gaps * (end_values - start_values)
+
+        synthesized: Dict[str, List[Any]] = {field: [value] * count}
+        for j, (name, _, present) in enumerate(numeric):
+            column = interpolated[:, j]
+            if all(isinstance(v, int) for v in present):
+                column_values = [int(v) if v == v else _MISSING for v in np.rint(column).tolist()]
+            else:
+                column = np.round(column, _decimals(present))
+                column_values = [v if v == v else _MISSING for v in column.tolist()]
+            synthesized[name] = column_values
+        from_end = self.rng.random((count, len(other))) < 0.5
+        starts_list, ends_list = starts.tolist(), ends.tolist()
+        for j, (name, column) in enumerate(other):
+            picks = from_end[:, j].tolist()
+            synthesized[name] = [column[e] if pick else column[s] for s, e, pick in zip(starts_list, ends_list, picks)]
+
+        names = list(synthesized)
+        return [
+            {name: v for name, v in zip(names, row) if v is not _MISSING}
+            for row in zip(*synthesized.values())
+        ]
+
+    def _seed_missing_value(self, rule: AugmentationRule) -> None:
+        """
+        Gives a rule that asks for a value no row has some rows to scale: copies of random rows
+        (or empty records when there are none) with the field set to the value.
+        """
+        if rule.strategy == AugmentationStrategy.TARGET_PERCENTAGE:
+            wanted = int(round(rule.target_percentage / 100 * len(self.rows)))
+        elif rule.strategy == AugmentationStrategy.OVERSAMPLE_VALUE:
+            wanted = rule.target_count
+        else:
+            return
+        column = self.column(rule.field)
+        if wanted <= 0 or column.matches(rule.value).any():
+            return
+        print(f"Warning: No existing records with '{rule.field}' = '{rule.value}'. Creating new records by modifying copies of existing ones.")
+        if len(self.rows):
+            added = self._append(self.rng.choice(len(self.rows), min(wanted, len(self.rows)), replace=False))
+        elif rule.strategy == AugmentationStrategy.OVERSAMPLE_VALUE:
+            # Nothing to copy from: the new row holds only this field
+            added = self._append_empty(1)
+        else:
+            return
+        column.assign(added, rule.value)
+
+    def _cells(self, rules: List[AugmentationRule]):
+        """
+        Groups the rows by their values in every field the rules use. Returns the cell of
+        each row, the number of rows per cell and one fitting target per rule.
+        """
+        fields = list(dict.fromkeys(rule.field for rule in rules))
+        columns = [self.column(field) for field in fields]
+        cardinality = 1
+        for column in columns:
+            cardinality *= max(len(column.uniques), 1)
+        if cardinality <= 4 * len(self.rows) + 65536:
+            # Few enough combinations to number them with a lookup table instead of sorting
+            keys = np.zeros(len(self.rows), dtype=np.int64)
+            for column in columns:
+                keys = keys * max(len(column.uniques), 1) + column.codes
+            present = np.bincount(keys, minlength=cardinality) > 0
+            cells = (np.cumsum(present) - 1)[keys]
+            first = np.empty(int(present.sum()), dtype=np.int64)
+            positions = np.arange(len(self.rows), dtype=np.int64)
+            first[cells[::-1]] = positions[::-1]
+        else:
+            keys = np.stack([column.codes for column in columns], axis=1)
+            _, first, cells = np.unique(keys, axis=0, return_index=True, return_inverse=True)
+            cells = cells.reshape(-1)
+        sizes = np.bincount(cells)
+
+        targets = []
+        for rule in rules:
+            column = self.column(rule.field)
+            cell_codes = column.codes[first]
+            if rule.strategy == AugmentationStrategy.BALANCE_CATEGORIES:
+                targets.append(_BalanceTarget(rule, cell_codes, column.is_category()[cell_codes]))
+                continue
+            mask = np.isin(cell_codes, column.codes_for(rule.value))
+            if rule.strategy == AugmentationStrategy.TARGET_PERCENTAGE:
+                targets.append(_PercentageTarget(rule, mask))
+            else:
+                targets.append(_CountTarget(rule, mask))
+        return cells, sizes, targets
+
+    def _resample(self, cells: np.ndarray, sizes: np.ndarray, counts: np.ndarray) -> None:
+        """
+        Makes every cell hold counts[cell] rows: a random subset of its rows when it shrinks,
+        all of them plus random duplicates when it grows. Kept rows stay in their order.
+        """
+        kept = np.arange(len(cells), dtype=np.int64)
+        shrinking = counts < sizes
+        if shrinking.any():
+            # Rows of the shrinking cells grouped by cell, in random order within each cell
+            candidates = np.flatnonzero(shrinking[cells])
+            candidates = candidates[np.lexsort((self.rng.random(candidates.size), cells[candidates]))]
+            starts = np.concatenate(([0], np.cumsum(np.where(shrinking, sizes, 0))[:-1]))
+            rank = np.arange(candidates.size) - starts[cells[candidates]]
+            keep = np.ones(len(cells), dtype=bool)
+            keep[candidates[rank >= counts[cells[candidates]]]] = False
+            kept = np.flatnonzero(keep)
+        deficits = np.maximum(counts - sizes, 0)
+        if not deficits.any():
+            self._take(kept)
+            return
+        # Every duplicate is drawn from its cell's slice of the rows grouped by cell
+        order = np.argsort(cells.astype(np.uint16) if len(sizes) <= 1 << 16 else cells, kind="stable")
+        starts = np.concatenate(([0], np.cumsum(sizes)[:-1]))
+        grown = np.repeat(np.arange(len(sizes)), deficits)
+        offsets = (self.rng.random(grown.size) * sizes[grown]).astype(np.int64)
+        self._take(np.concatenate((kept, order[starts[grown] + offsets])))
+
+    def _take(self, positions: np.ndarray) -> None:
+        self.rows = self.rows[positions]
+        for column in self._columns.values():
+            column.take(positions)
+
+    def _append(self, positions: np.ndarray) -> np.ndarray:
+        """Appends copies of the rows at positions; returns the positions of the new rows."""
+        start = len(self.rows)
+        self._take(np.concatenate((np.arange(start, dtype=np.int64), positions.astype(np.int64))))
+        return np.arange(start, len(self.rows), dtype=np.int64)
+
+    def _append_empty(self, count: int) -> np.ndarray:
+        """Appends count new empty records; returns their positions."""
+        return self._append_records([{} for _ in range(count)])
+
+    def _append_records(self, records: List[Dict]) -> np.ndarray:
+        """Appends new records to the base and the dataset; returns their positions."""
+        start = len(self.rows)
+        first_new = len(self.base)
+        self.base.extend(records)
+        self.rows = np.concatenate((self.rows, np.arange(first_new, len(self.base), dtype=np.int64)))
+        for field, column in self._columns.items():
+            column.extend([record.get(field, _MISSING) for record in records])
+        return np.arange(start, len(self.rows), dtype=np.int64)
+
+
+class AugmentedDataset(Sequence):
+    """
+    Read-only sequence of the records of an augmented dataset.
+
+    Each base record is stored once however often it was duplicated: the dataset is a
+    vector of indices into the base records plus, for the rows a rule rewrote, the index of
+    a patch holding the rewritten cells. Records are built as they are read; unpatched
+    rows are the base records themselves (shared between duplicates, so they must not be
+    modified) and patched rows are fresh dicts. Memory therefore grows with the number of
+    distinct records, not with how heavily they were oversampled.
+    """
+
+    def __init__(self, base: List[Dict], rows: np.ndarray, patch_ids: Optional[np.ndarray] = None,
+                 patches: Optional[List[Dict[str, Any]]] = None):
+        self.base = base
+        self.rows = rows
+        self.patch_ids = patch_ids
+        self.patches = patches or []
+
+    def __len__(self) -> int:
+        return len(self.rows)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return [self[i] for i in range(*index.indices(len(self)))]
+        record = self.base[self.rows[index]]
+        if self.patch_ids is not None and self.patch_ids[index] >= 0:
+            record = {**record, **self.patches[self.patch_ids[index]]}
+        return record
+
+    def __iter__(self) -> Iterator[Dict]:
+        for start in range(0, len(self.rows), AUGMENT_JSON_CHUNK_ROWS):
+            yield from self._chunk(start, start + AUGMENT_JSON_CHUNK_ROWS)
+
+    def iter_json(self, chunk_rows: int = AUGMENT_JSON_CHUNK_ROWS) -> Iterator[str]:
+        """The dataset as a JSON array, in pieces of chunk_rows records."""
+        yield "["
+        for start in range(0, len(self.rows), chunk_rows):
+            rows_json = ", ".join(json.dumps(record, default=str) for record in self._chunk(start, start + chunk_rows))
+            yield rows_json if start == 0 else ", " + rows_json
+        yield "]"
+
+    def _chunk(self, start: int, stop: int) -> Iterator[Dict]:
+        base = self.base
+        rows = self.rows[start:stop].tolist()
+        if self.patch_ids is None:
+            yield from map(base.__getitem__, rows)
+            return
+        patches = self.patches
+        for row, patch_id in zip(rows, self.patch_ids[start:stop].tolist()):
+            yield base[row] if patch_id < 0 else {**base[row], **patches[patch_id]}
+
+
+def augment_records(records: List[Dict], rules: List[AugmentationRule], seed: Optional[int] = None) -> AugmentedDataset:
+    return AugmentationEngine(records, seed).apply(rules).materialize()
@@ -0,0 +1,98 @@
+import hashlib
+import os
+import re
+import threading
+from typing import Dict
+
+# Bounds for the adaptive batch size (rows requested per LLM call)
+BATCH_SIZE_INITIAL = int(os.getenv("BATCH_SIZE_INITIAL", "50"))
+BATCH_SIZE_MIN = int(os.getenv("BATCH_SIZE_MIN", "5"))
+BATCH_SIZE_MAX = int(os.getenv("BATCH_SIZE_MAX", "250"))
+# Clean batches after which a remembered failing size is forgotten, so the sizer may probe above it again
+BATCH_CEILING_EXPIRY = int(os.getenv("BATCH_CEILING_EXPIRY", "20"))
+
+
+class AdaptiveBatchSizer:
+    """
+    Picks how many rows to request per LLM call for a given schema.
+
+    The size grows multiplicatively while responses parse cleanly and shrinks
+    after a response that came back short (truncated, or with records that did not
+    parse). The largest size that failed is remembered as a ceiling so the sizer settles
+    just below it instead of oscillating; after ceiling_expiry clean batches the ceiling is
+    forgotten, so a transient failure does not cap the size for good. Only batches that got
+    a response are recorded: provider errors say nothing about the batch size. State is
+    kept per schema fingerprint and shared across requests.
+    """
+
+    def __init__(self, initial: int = BATCH_SIZE_INITIAL, min_size: int = BATCH_SIZE_MIN,
+                 max_size: int = BATCH_SIZE_MAX, growth: float = 1.5, shrink: float = 0.5,
+                 ceiling_expiry: int = BATCH_CEILING_EXPIRY):
+        self.min_size = max(1, min_size)
+        self.max_size = max(self.min_size, max_size)
+        self.initial = min(max(initial, self.min_size), self.max_size)
+        self.growth = growth
+        self.shrink = shrink
+        self.ceiling_expiry = max(1, ceiling_expiry)
+        self._sizes: Dict[str, int] = {}
+        self._ceilings: Dict[str, int] = {}
+        self._clean_since_ceiling: Dict[str, int] = {}
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def fingerprint(prompt: str) -> str:
+        """Stable key for a batch prompt: row counts and whitespace are ignored."""
+        normalized = re.sub(r'\d+\s+(rows|records)', '', prompt.lower())
+        normalized = re.sub(r'\s+', ' ', normalized).strip()
+        return hashlib.sha1(normalized.encode('utf-8')).hexdigest()
+
+    def size_for(self, fingerprint: str) -> int:
+        with self._lock:
+            return self._sizes.get(fingerprint, self.initial)
+
+    def record(self, fingerprint: str, requested: int, received: int, clean: bool) -> int:
+        """
+        Feeds back the outcome of one batch that got a response and returns the updated size.
+        The batch grows the size when it parsed fully and returned at least 90% of the requested
+        rows, and shrinks it when it returned fewer than 90%; a complete but partly malformed
+        response leaves the size alone.
+        """
+        with self._lock:
+            size = self._sizes.get(fingerprint, self.initial)
+            ceiling = self._ceilings.get(fingerprint, self.max_size + 1)
+
+            if received >= 0.9 * requested:
+                if clean and ceiling <= self.max_size:
+                    self._clean_since_ceiling[fingerprint] = self._clean_since_ceiling.get(fingerprint, 0) + 1
+                    if self._clean_since_ceiling[fingerprint] >= self.ceiling_expiry:
+                        ceiling = self.max_size + 1
+                        self._ceilings.pop(fingerprint, None)
+                        self._clean_since_ceiling.pop(fingerprint, None)
+                # Only grow when the batch actually used the current size; once a failing
+                # size is known, approach it by bisection rather than overshooting again
+                if clean and requested >= size:
+                    grown = int(size * self.growth) + 1
+                    if ceiling <= self.max_size:
+                        grown = min(grown, (size + ceiling) // 2)
+                    size = min(grown, ceiling - 1, self.max_size)
+            else:
+                ceiling = min(ceiling, max(requested, self.min_size + 1))
+                self._ceilings[fingerprint] = ceiling
+                self._clean_since_ceiling[fingerprint] = 0
+                # Relative to the failed request, so concurrent failures in one wave shrink only once
+                size = min(size, int(requested * self.shrink))
+
+            size = max(size, self.min_size)
+            self._sizes[fingerprint] = size
+            return size
+
+    def stats(self) -> Dict[str, Dict[str, int]]:
+        with self._lock:
+            return {
+                fp: {"size": size, "ceiling": self._ceilings.get(fp, self.max_size + 1)}
+                for fp, size in self._sizes.items()
+            }
+
+
+# Global sizer instance shared by all generation requests
+batch_sizer = AdaptiveBatchSizer()
@@ -0,0 +1,323 @@
+"""
+Benchmark suite for the backend hot paths: JSON cleanup of model responses, augmentation
+strategies, exporters and /history serialization.
+
+Every case reports wall time (best of at least --repeat runs, and of as many runs as fit in
+--min-time for short cases), throughput and peak traced memory, and is compared against the
+stored baseline (benchmark_baseline.json next to this file). A case that uses more memory than
+the baseline by more than --tolerance is a regression, as is one that is slower by more than
+--tolerance and by more than --min-time-change seconds (shorter differences are timer and
+scheduler noise). A case that produces a different number of rows than the baseline is a
+regression too (its timings no longer measure the same work); the script then exits with status 1.
+
+Timings only compare on the same hardware: regenerate the baseline with --update-baseline on
+the machine that runs the comparison. A warning is printed when the baseline was recorded in
+a different environment.
+
+    python benchmark.py                     # run everything and compare
+    python benchmark.py --max-rows 100000   # skip the 1M-row cases
+    python benchmark.py --only augment      # cases whose name contains "augment"
+    python benchmark.py --update-baseline   # store this run as the new baseline
+
+The benchmark never calls Gemini (the offline stub provider is selected) and uses its own
+throwaway SQLite database.
+"""
+
+import argparse
+import contextlib
+import gc
+import json
+import os
+import platform
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Callable, Dict, List, Optional, Tuple
+
+# Must be configured before the application modules are imported
+_BENCHMARK_DIR = tempfile.mkdtemp(prefix="datagen-benchmark-")
+os.environ["DATABASE_URL"] = f"sqlite:///{os.path.join(_BENCHMARK_DIR, 'benchmark.db')}"
+os.environ["LLM_PROVIDER"] = "stub"
+os.environ["RESULT_CACHE_DIR"] = os.path.join(_BENCHMARK_DIR, "result_cache")
+
+import numpy as np
+
+BASELINE_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+AUGMENT_SIZES = (10_000, 100_000, 1_000_000)
+CLEAN_JSON_SIZES = (10_000, 100_000, 1_000_000)
+CSV_SIZES = (10_000, 100_000, 1_000_000)
+EXCEL_SIZES = (10_000, 100_000)
+HISTORY_ROWS_PER_ENTRY = (1_000, 10_000)
+HISTORY_ENTRIES = 20
+SEED = 1234
+# Upper bound on the timed runs of one case when --min-time asks for more than --repeat
+MAX_RUNS = 100
+
+
+def build_dataset(rows: int) -> List[Dict]:
+    """Deterministic mixed-type dataset used by every case."""
+    from synthesis import ColumnarSampler
+    return ColumnarSampler([
+        {"name": "id", "type": "id"},
+        {"name": "customer", "type": "id", "prefix": "Customer "},
+        {"name": "segment", "type": "category", "values": ["A", "B", "C", "D", "E"], "weights": [40, 25, 15, 12, 8]},
+        {"name": "region", "type": "category", "values": [f"Region {i}" for i in range(20)]},
+        {"name": "amount", "type": "float", "min": 1.0, "max": 5000.0, "distribution": "normal", "mean": 800.0, "std": 400.0},
+        {"name": "active", "type": "boolean", "true_probability": 0.7},
+        {"name": "signup_date", "type": "date", "start": "2018-01-01", "end": "2024-12-31"},
+    ], seed=SEED).sample(rows)
+
+
+def measure(run: Callable[[], int], repeat: int, min_time: float = 0.0) -> Dict[str, float]:
+    """
+    Times run() (best of at least repeat runs, without tracing; short cases keep running until
+    min_time seconds were measured, up to MAX_RUNS) and then measures its peak traced memory
+    in one extra run. run() returns the number of rows it processed.
+    """
+    timings = []
+    rows = 0
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        while len(timings) < repeat or (sum(timings) < min_time and len(timings) < MAX_RUNS):
+            gc.collect()
+            started = time.perf_counter()
+            rows = run()
+            timings.append(time.perf_counter() - started)
+
+        gc.collect()
+        tracemalloc.start()
+        try:
+            run()
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    seconds = min(timings)
+    return {
+        "rows": rows,
+        "seconds": round(seconds, 4),
+        "rows_per_second": round(rows / seconds, 1) if seconds > 0 else 0.0,
+        "peak_mb": round(peak / (1024 * 1024), 2),
+    }
+
+
+def clean_json_cases(generator, max_rows: int) -> List[Tuple[str, Callable[[], int]]]:
+    cases = []
+    for rows in CLEAN_JSON_SIZES:
+        if rows > max_rows:
+            continue
+        # Shaped like a real model answer: prose and a markdown fence around the array
+        payload = "Here is your dataset:\n```json\n" + json.dumps(build_dataset(rows), indent=2) + "\n```\n"
+
+        def run(payload=payload, rows=rows):
+            json.loads(generator._clean_json_response(payload))
+            return rows
+        cases.append((f"clean_json_response/{rows}", run))
+    return cases
+
+
+def augment_cases(generator, max_rows: int) -> List[Tuple[str, Callable[[], int]]]:
+    from schemas import AugmentationRule, AugmentationStrategy
+    rules = {
+        AugmentationStrategy.TARGET_PERCENTAGE: AugmentationRule(
+            field="segment", strategy=AugmentationStrategy.TARGET_PERCENTAGE, value="A", target_percentage=20.0),
+        AugmentationStrategy.BALANCE_CATEGORIES: AugmentationRule(
+            field="segment", strategy=AugmentationStrategy.BALANCE_CATEGORIES),
+        AugmentationStrategy.OVERSAMPLE_VALUE: None,
+        AugmentationStrategy.SMOTE: None,
+    }
+    cases = []
+    for rows in AUGMENT_SIZES:
+        if rows > max_rows:
+            continue
+        data = build_dataset(rows)
+        for strategy in AugmentationStrategy:
+            # Count-based strategies take segment "E" (8% of the rows) up to 20%
+            rule = rules.get(strategy) or AugmentationRule(
+                field="segment", strategy=strategy, value="E", target_count=rows // 5)
+
+            def run(data=data, rule=rule):
+                # Records are shared between runs, so work on shallow copies like the endpoint's input;
+                # the result is a lazy view, so read every record as serializing it would
+                return sum(1 for _ in generator.augment_data([dict(record) for record in data], [rule]))
+            cases.append((f"augment_data/{strategy.value}/{rows}", run))
+
+        # rows // 50 stores, the first half of them twice as common as the second
+        stores = max(2, rows // 50)
+        store_data = [dict(record, store=f"Store {record['id'] % (stores if record['id'] % 3 else stores // 2)}") for record in data]
+        store_rule = AugmentationRule(field="store", strategy=AugmentationStrategy.BALANCE_CATEGORIES)
+
+        def run_high_cardinality(data=store_data, rule=store_rule):
+            return sum(1 for _ in generator.augment_data([dict(record) for record in data], [rule]))
+        cases.append((f"augment_data/balance_categories_high_cardinality/{rows}", run_high_cardinality))
+    return cases
+
+
+def export_cases(max_rows: int) -> List[Tuple[str, Callable[[], int]]]:
+    from exports import _pandas, exporter
+
+    # pandas is imported on the first export; keep that one-off cost out of the timings
+    _pandas()
+    cases = []
+    for rows in CSV_SIZES:
+        if rows <= max_rows:
+            data = build_dataset(rows)
+
+            def run_csv(data=data):
+                exporter.to_csv(data)
+                return len(data)
+            cases.append((f"export/to_csv/{rows}", run_csv))
+    for rows in EXCEL_SIZES:
+        if rows > max_rows:
+            continue
+        data = build_dataset(rows)
+        tables = {"customers": data[:rows // 4], "orders": data}
+
+        def run_excel(data=data):
+            exporter.to_excel_bytes(data)
+            return len(data)
+
+        def run_excel_relational(tables=tables):
+            exporter.to_excel_bytes_relational(tables)
+            return sum(len(table) for table in tables.values())
+        cases.append((f"export/to_excel_bytes/{rows}", run_excel))
+        cases.append((f"export/to_excel_bytes_relational/{rows}", run_excel_relational))
+    return cases
+
+
+def history_cases(max_rows: int) -> List[Tuple[str, Callable[[], int]]]:
+    from fastapi.encoders import jsonable_encoder
+
+    import main
+    from models import GenerationHistory, SessionLocal, User, init_db
+
+    init_db()
+
+    cases = []
+    for rows in HISTORY_ROWS_PER_ENTRY:
+        if rows > max_rows:
+            continue
+        db = SessionLocal()
+        user = User(username=f"benchmark-{rows}", email=f"benchmark-{rows}@example.com", hashed_password="x")
+        db.add(user)
+        db.commit()
+        data_json = json.dumps(build_dataset(rows))
+        for _ in range(HISTORY_ENTRIES):
+            db.add(GenerationHistory(domain="Custom", rows_generated=rows, data_json=data_json, user_id=user.id))
+        db.commit()
+
+        def run(db=db, user=user, rows=rows):
+            # What FastAPI does for the endpoint: call it, encode the result, render JSON
+            response = main.get_generation_history(current_user=user, db=db)
+            json.dumps(jsonable_encoder(response))
+            db.expire_all()
+            return HISTORY_ENTRIES * rows
+        cases.append((f"history/serialize/{HISTORY_ENTRIES}x{rows}", run))
+    return cases
+
+
+def load_baseline(path: str) -> Optional[Dict]:
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        return None
+
+
+def environment_info() -> Dict[str, str]:
+    import pandas as pd
+    return {
+        "python": platform.python_version(),
+        "numpy": np.__version__,
+        "pandas": pd.__version__,
+        "platform": platform.platform(),
+        "cpu_count": str(os.cpu_count()),
+    }
+
+
+def compare(name: str, result: Dict, baseline: Optional[Dict], tolerance: float,
+            min_time_change: float = 0.0) -> Tuple[str, bool]:
+    """Returns the comparison column for one case and whether it regressed."""
+    reference = (baseline or {}).get("results", {}).get(name)
+    if not reference:
+        return "no baseline", False
+    if "rows" in reference and result["rows"] != reference["rows"]:
+        # Different output means the timings no longer measure the same work
+        return f"❌ rows {result['rows']} vs {reference['rows']} in the baseline", True
+    time_change = result["seconds"] / reference["seconds"] - 1 if reference["seconds"] else 0.0
+    memory_change = result["peak_mb"] / reference["peak_mb"] - 1 if reference["peak_mb"] else 0.0
+    slower = time_change > tolerance and result["seconds"] - reference["seconds"] > min_time_change
+    regressed = slower or memory_change > tolerance
+    marker = "❌" if regressed else "✅"
+    return f"{marker} time {time_change:+.0%}, memory {memory_change:+.0%}", regressed
+
+
+def main_cli(argv: Optional[List[str]] = None) -> int:
+    parser = argparse.ArgumentParser(description="Benchmark the dataset generator hot paths.")
+    parser.add_argument("--only", help="Only run cases whose name contains this text")
+    parser.add_argument("--max-rows", type=int, default=max(AUGMENT_SIZES), help="Skip cases larger than this")
+    parser.add_argument("--repeat", type=int, default=3, help="Minimum timed runs per case (the best one counts)")
+    parser.add_argument("--min-time", type=float, default=3.0, help="Keep timing short cases until this many seconds were measured")
+    parser.add_argument("--tolerance", type=float, default=0.25, help="Allowed slowdown / memory growth before a case counts as a regression")
+    parser.add_argument("--min-time-change", type=float, default=0.05,
+                        help="Slowdowns of fewer seconds than this are noise, whatever their share")
+    parser.add_argument("--baseline", default=BASELINE_PATH, help="Baseline file to compare against")
+    parser.add_argument("--update-baseline", action="store_true", help="Store the results as the new baseline")
+    args = parser.parse_args(argv)
+
+    print("🔍 Preparing benchmark cases...")
+    with open(os.devnull, "w") as devnull, contextlib.redirect_stdout(devnull):
+        from generator import DatasetGenerator
+        generator = DatasetGenerator()
+        cases = (
+            clean_json_cases(generator, args.max_rows)
+            + augment_cases(generator, args.max_rows)
+            + export_cases(args.max_rows)
+            + history_cases(args.max_rows)
+        )
+    if args.only:
+        cases = [(name, run) for name, run in cases if args.only in name]
+
+    baseline = load_baseline(args.baseline)
+    if baseline is None and not args.update_baseline:
+        print(f"⚠️  No baseline found at {args.baseline}; run with --update-baseline to create one")
+    elif baseline is not None and not args.update_baseline and baseline.get("environment") != environment_info():
+        print(f"⚠️  The baseline was recorded in a different environment ({baseline.get('environment')}); "
+              f"timings are only comparable after regenerating it here with --update-baseline")
+
+    results: Dict[str, Dict] = {}
+    regressions = []
+    print(f"{'case':<50} {'rows/s':>14} {'seconds':>9} {'peak MB':>9}  vs baseline")
+    for name, run in cases:
+        try:
+            result = measure(run, max(1, args.repeat), args.min_time)
+        except Exception as e:
+            print(f"{name:<50} ❌ failed: {e}")
+            regressions.append(name)
+            continue
+        results[name] = result
+        comparison, regressed = compare(name, result, baseline, args.tolerance, args.min_time_change)
+        if regressed:
+            regressions.append(name)
+        print(f"{name:<50} {result['rows_per_second']:>14,.0f} {result['seconds']:>9.3f} {result['peak_mb']:>9.1f}  {comparison}")
+
+    if args.update_baseline:
+        stored = load_baseline(args.baseline) or {}
+        # Merge so a partial run (--only / --max-rows) keeps the other cases
+        merged = dict(stored.get("results", {}))
+        merged.update(results)
+        with open(args.baseline, "w", encoding="utf-8") as f:
+            json.dump({"environment": environment_info(), "results": merged}, f, indent=2, sort_keys=True)
+            f.write("\n")
+        print(f"💾 Baseline updated with {len(results)} cases: {args.baseline}")
+        return 0
+
+    if regressions:
+        print(f"❌ {len(regressions)} regressions: {', '.join(regressions)}")
+        return 1
+    print("✅ No regressions against the baseline")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main_cli())
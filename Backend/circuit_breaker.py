@@ -0,0 +1,196 @@
+import os
+import threading
+import time
+from collections import deque
+from typing import Any, Callable, Dict
+
+import google.api_core.exceptions as api_exceptions
+
+# Number of most recent calls the error and slow-call rates are computed over
+CIRCUIT_WINDOW_SIZE = int(os.getenv("CIRCUIT_WINDOW_SIZE", "20"))
+# Calls the window must hold before the rates can open the circuit
+CIRCUIT_MIN_CALLS = int(os.getenv("CIRCUIT_MIN_CALLS", "5"))
+# Share of failed calls in the window that opens the circuit
+CIRCUIT_ERROR_RATE = float(os.getenv("CIRCUIT_ERROR_RATE", "0.5"))
+# A successful call slower than this counts as slow
+CIRCUIT_SLOW_CALL_SECONDS = float(os.getenv("CIRCUIT_SLOW_CALL_SECONDS", "30.0"))
+# Share of slow calls in the window that opens the circuit
+CIRCUIT_SLOW_CALL_RATE = float(os.getenv("CIRCUIT_SLOW_CALL_RATE", "0.8"))
+# How long the circuit stays open before trial calls are let through
+CIRCUIT_OPEN_SECONDS = float(os.getenv("CIRCUIT_OPEN_SECONDS", "30.0"))
+# Trial calls that must succeed in half-open state before the circuit closes again
+CIRCUIT_HALF_OPEN_CALLS = int(os.getenv("CIRCUIT_HALF_OPEN_CALLS", "2"))
+# What generation endpoints do while the circuit is open: "fallback" serves the fallback
+# generator's data, "reject" answers 503 right away
+CIRCUIT_OPEN_ACTION = os.getenv("CIRCUIT_OPEN_ACTION", "fallback").lower()
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+class CircuitOpenError(Exception):
+    """Raised instead of calling the provider while the circuit is open (or half-open with its trial call busy)."""
+
+    def __init__(self, retry_after: float, state: str = "open"):
+        super().__init__(f"LLM provider circuit is {state.replace('_', '-')}, retry in {retry_after:.0f}s")
+        self.retry_after = retry_after
+
+
+def counts_as_failure(error: Exception) -> bool:
+    """Provider-side failures count; requests the API rejected as invalid say nothing about its health."""
+    if isinstance(error, api_exceptions.TooManyRequests):
+        return True
+    return not isinstance(error, (api_exceptions.ClientError, CircuitOpenError))
+
+
+class CircuitBreaker:
+    """
+    Closed / open / half-open circuit breaker around the LLM provider.
+
+    While closed, every call's outcome goes into a sliding window of the last window_size
+    calls; once the window holds min_calls outcomes and either the error rate or the
+    slow-call rate reaches its threshold, the circuit opens. While open, calls fail
+    immediately with CircuitOpenError so generation goes straight to the fallback path.
+    After open_seconds the circuit turns half-open and lets half_open_calls trial calls
+    through one at a time: if they all succeed it closes, any failure opens it again.
+    """
+
+    def __init__(self, window_size: int = CIRCUIT_WINDOW_SIZE, min_calls: int = CIRCUIT_MIN_CALLS,
+                 error_rate: float = CIRCUIT_ERROR_RATE, slow_call_seconds: float = CIRCUIT_SLOW_CALL_SECONDS,
+                 slow_call_rate: float = CIRCUIT_SLOW_CALL_RATE, open_seconds: float = CIRCUIT_OPEN_SECONDS,
+                 half_open_calls: int = CIRCUIT_HALF_OPEN_CALLS):
+        self.min_calls = max(1, min_calls)
+        self.error_rate = error_rate
+        self.slow_call_seconds = slow_call_seconds
+        self.slow_call_rate = slow_call_rate
+        self.open_seconds = open_seconds
+        self.half_open_calls = max(1, half_open_calls)
+        # (failed, slow) per call
+        self._window: deque = deque(maxlen=max(1, window_size))
+        self._lock = threading.Lock()
+        self._state = CLOSED
+        self._opened_at = 0.0
+        self._trial_in_flight = False
+        self._trial_successes = 0
+        self.times_opened = 0
+        self.rejected = 0
+
+    def call(self, fn: Callable[[str], Any], prompt: str) -> Any:
+        """Runs fn(prompt) if the circuit allows it and records the outcome; raises CircuitOpenError otherwise."""
+        trial = self._admit()
+        started = time.monotonic()
+        try:
+            response = fn(prompt)
+        except Exception as e:
+            if counts_as_failure(e):
+                self._record(trial, failed=True, slow=False)
+            elif trial:
+                self._release()
+            raise
+        self._record(trial, failed=False, slow=time.monotonic() - started > self.slow_call_seconds)
+        return response
+
+    def check(self) -> None:
+        """Raises CircuitOpenError while the circuit is open, without taking a trial slot."""
+        with self._lock:
+            self._advance(time.monotonic())
+            if self._state == OPEN:
+                self.rejected += 1
+                raise CircuitOpenError(self._retry_after(time.monotonic()))
+
+    def is_open(self) -> bool:
+        return self.state() == OPEN
+
+    def state(self) -> str:
+        with self._lock:
+            self._advance(time.monotonic())
+            return self._state
+
+    def stats(self) -> Dict[str, Any]:
+        with self._lock:
+            now = time.monotonic()
+            self._advance(now)
+            failures = sum(1 for failed, _ in self._window if failed)
+            slow = sum(1 for _, is_slow in self._window if is_slow)
+            return {
+                "state": self._state,
+                "open": int(self._state == OPEN),
+                "window_calls": len(self._window),
+                "window_failures": failures,
+                "window_slow_calls": slow,
+                "times_opened": self.times_opened,
+                "rejected": self.rejected,
+                "retry_after_seconds": round(self._retry_after(now), 1) if self._state == OPEN else 0,
+            }
+
+    def _admit(self) -> bool:
+        """Returns whether the admitted call is a half-open trial call."""
+        with self._lock:
+            now = time.monotonic()
+            self._advance(now)
+            if self._state == CLOSED:
+                return False
+            if self._state == HALF_OPEN and not self._trial_in_flight:
+                self._trial_in_flight = True
+                return True
+            self.rejected += 1
+            if self._state == OPEN:
+                raise CircuitOpenError(self._retry_after(now))
+            raise CircuitOpenError(1.0, self._state)
+
+    def _release(self) -> None:
+        with self._lock:
+            self._trial_in_flight = False
+
+    def _record(self, trial: bool, failed: bool, slow: bool) -> None:
+        with self._lock:
+            now = time.monotonic()
+            if trial:
+                self._trial_in_flight = False
+                if self._state != HALF_OPEN:
+                    return
+                if failed or slow:
+                    self._open(now, "trial call failed" if failed else "trial call was slow")
+                    return
+                self._trial_successes += 1
+                if self._trial_successes >= self.half_open_calls:
+                    self._state = CLOSED
+                    self._window.clear()
+                    print("✅ LLM circuit closed again after successful trial calls")
+                return
+            if self._state != CLOSED:
+                # A call admitted before the circuit opened finished late
+                return
+
+            self._window.append((failed, slow))
+            if len(self._window) < self.min_calls:
+                return
+            failures = sum(1 for f, _ in self._window if f) / len(self._window)
+            slow_calls = sum(1 for _, s in self._window if s) / len(self._window)
+            if failures >= self.error_rate:
+                self._open(now, f"error rate {failures:.0%}")
+            elif slow_calls >= self.slow_call_rate:
+                self._open(now, f"slow-call rate {slow_calls:.0%}")
+
+    def _open(self, now: float, reason: str) -> None:
+        self._state = OPEN
+        self._opened_at = now
+        self._trial_successes = 0
+        self._window.clear()
+        self.times_opened += 1
+        print(f"🔌 LLM circuit opened ({reason}), failing fast for {self.open_seconds:.0f}s")
+
+    def _advance(self, now: float) -> None:
+        if self._state == OPEN and now - self._opened_at >= self.open_seconds:
+            self._state = HALF_OPEN
+            self._trial_in_flight = False
+            self._trial_successes = 0
+            print("🔌 LLM circuit half-open, letting trial calls through")
+
+    def _retry_after(self, now: float) -> float:
+        return max(0.0, self.open_seconds - (now - self._opened_at))
+
+
+# Global breaker shared by every generator instance
+llm_breaker = CircuitBreaker()
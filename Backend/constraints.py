@@ -0,0 +1,167 @@
+import os
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+
+from schemas import (ConstraintType, ExactValueConstraint, PercentageConstraint,
+                     RangeConstraint)
+
+# How out-of-range numbers are repaired: "resample" draws from the in-range values already
+# present in the column (uniform within the range when they are scarce), "clamp" moves them to the bound
+CONSTRAINT_RANGE_REPAIR = os.getenv("CONSTRAINT_RANGE_REPAIR", "resample").lower()
+# In-range values "resample" needs before it copies them: at least this share of the rows...
+CONSTRAINT_RANGE_MIN_VALID_SHARE = float(os.getenv("CONSTRAINT_RANGE_MIN_VALID_SHARE", "0.25"))
+# ...and this many distinct values; otherwise a few survivors would be copied into every repaired cell
+CONSTRAINT_RANGE_MIN_DISTINCT = int(os.getenv("CONSTRAINT_RANGE_MIN_DISTINCT", "10"))
+
+
+class ConstraintEnforcer:
+    """
+    Applies generation constraints to finished records in one columnar pass per field.
+
+    Each constrained field is pulled out of the records once as a NumPy array; every
+    violation is found with a vectorized mask and only the violating cells are rewritten:
+      - RangeConstraint: missing, non-numeric or out-of-range values are resampled from the valid
+        values, drawn uniformly within the range when those are scarce (or clamped)
+      - ExactValueConstraint: every cell is set to the value
+      - PercentageConstraint: exactly round(percentage * rows) rows get the value, changing
+        as few cells as possible; surplus rows get other values observed in the column
+    The row count never changes, and fields that no record has are left alone. After
+    enforce(), report holds one entry per applied constraint with the number of violations
+    found and cells changed.
+    """
+
+    def __init__(self, constraints: Optional[List[Union[PercentageConstraint, ExactValueConstraint, RangeConstraint]]],
+                 seed: Optional[int] = None, range_repair: str = CONSTRAINT_RANGE_REPAIR):
+        self.constraints = list(constraints or [])
+        self.rng = np.random.default_rng(seed)
+        self.range_repair = range_repair
+        self.report: List[Dict[str, Any]] = []
+
+    def enforce(self, records: List[Dict], row_local_only: bool = False) -> List[Dict]:
+        """
+        Rewrites violating cells in place and returns the records. With row_local_only, percentage
+        constraints (which need the whole dataset) are skipped, so batches can be fixed as they arrive.
+        """
+        self.report = []
+        if not records or not self.constraints:
+            return records
+
+        by_field: Dict[str, List] = {}
+        for constraint in self.constraints:
+            if row_local_only and isinstance(constraint, PercentageConstraint):
+                continue
+            by_field.setdefault(constraint.field, []).append(constraint)
+
+        for field, constraints in by_field.items():
+            if not any(field in record for record in records):
+                # The model named its columns differently: do not invent a new column
+                print(f"⚠️  Constraint field '{field}' does not exist in the generated data, skipping it")
+                continue
+            column = np.empty(len(records), dtype=object)
+            column[:] = [record.get(field) for record in records]
+            changed = np.zeros(len(records), dtype=bool)
+            for constraint in constraints:
+                if isinstance(constraint, RangeConstraint):
+                    entry = self._enforce_range(constraint, column, changed)
+                elif isinstance(constraint, ExactValueConstraint):
+                    entry = self._enforce_exact(constraint, column, changed)
+                else:
+                    entry = self._enforce_percentage(constraint, column, changed)
+                self.report.append(entry)
+
+            for i in np.flatnonzero(changed).tolist():
+                records[i][field] = column[i]
+        return records
+
+    def summary(self) -> str:
+        return ", ".join(
+            f"{entry['type']}({entry['field']}): {entry['violations']} violations, {entry['changed']} fixed"
+            for entry in self.report
+        )
+
+    def _enforce_range(self, constraint: RangeConstraint, column: np.ndarray, changed: np.ndarray):
+        numbers = _to_float(column)
+        low = -np.inf if constraint.min_value is None else float(constraint.min_value)
+        high = np.inf if constraint.max_value is None else float(constraint.max_value)
+        valid = ~np.isnan(numbers) & (numbers >= low) & (numbers <= high)
+        bad = np.flatnonzero(~valid)
+
+        if bad.size:
+            # Integers stay integers when the column (and the bounds) are whole numbers
+            observed = numbers[~np.isnan(numbers)]
+            bounds = [b for b in (constraint.min_value, constraint.max_value) if b is not None]
+            integral = bool(np.all(observed == np.floor(observed))) and all(float(b).is_integer() for b in bounds)
+            if self.range_repair == "clamp":
+                repaired = np.clip(np.nan_to_num(numbers[bad], nan=low if np.isfinite(low) else high), low, high)
+            elif (valid.sum() >= CONSTRAINT_RANGE_MIN_VALID_SHARE * len(numbers)
+                  and np.unique(numbers[valid]).size >= CONSTRAINT_RANGE_MIN_DISTINCT):
+                repaired = numbers[valid][self.rng.integers(0, int(valid.sum()), bad.size)]
+            else:
+                finite_low = low if np.isfinite(low) else high - 100
+                finite_high = high if np.isfinite(high) else low + 100
+                repaired = self.rng.uniform(finite_low, finite_high, bad.size)
+            if integral:
+                repaired = np.clip(np.rint(repaired), np.ceil(low), np.floor(high)).astype(np.int64)
+            column[bad] = repaired.tolist()
+            changed[bad] = True
+        return self._entry(constraint, int(bad.size), int(bad.size))
+
+    def _enforce_exact(self, constraint: ExactValueConstraint, column: np.ndarray, changed: np.ndarray):
+        bad = np.flatnonzero(column != constraint.value)
+        column[bad] = constraint.value
+        changed[bad] = True
+        return self._entry(constraint, int(bad.size), int(bad.size))
+
+    def _enforce_percentage(self, constraint: PercentageConstraint, column: np.ndarray, changed: np.ndarray):
+        rows = len(column)
+        desired = int(round(constraint.percentage / 100 * rows))
+        matches = np.flatnonzero(column == constraint.value)
+        difference = desired - matches.size
+        if difference > 0:
+            others = np.flatnonzero(column != constraint.value)
+            chosen = others[self.rng.permutation(others.size)[:difference]]
+            column[chosen] = constraint.value
+        elif difference < 0:
+            chosen = matches[self.rng.permutation(matches.size)[:-difference]]
+            others = np.array([value for value in column.tolist() if value is not None and value != constraint.value], dtype=object)
+            if others.size:
+                column[chosen] = others[self.rng.integers(0, others.size, chosen.size)]
+            else:
+                column[chosen] = "Other"
+        else:
+            chosen = matches[:0]
+        changed[chosen] = True
+        return self._entry(constraint, abs(difference), int(chosen.size))
+
+    @staticmethod
+    def _entry(constraint, violations: int, changed: int) -> Dict[str, Any]:
+        if isinstance(constraint, RangeConstraint):
+            constraint_type = ConstraintType.RANGE
+        elif isinstance(constraint, ExactValueConstraint):
+            constraint_type = ConstraintType.EXACT_VALUE
+        else:
+            constraint_type = ConstraintType.PERCENTAGE_DISTRIBUTION
+        return {
+            "type": constraint_type.value,
+            "field": constraint.field,
+            "violations": violations,
+            "changed": changed,
+        }
+
+
+def _to_float(column: np.ndarray) -> np.ndarray:
+    """Numeric view of an object column; anything that is not a number (or numeric string) becomes NaN."""
+    try:
+        return column.astype(float)
+    except (TypeError, ValueError):
+        pass
+    numbers = np.full(len(column), np.nan)
+    for i, value in enumerate(column.tolist()):
+        if isinstance(value, bool) or value is None:
+            continue
+        try:
+            numbers[i] = float(value)
+        except (TypeError, ValueError):
+            continue
+    return numbers
@@ -1,8 +1,23 @@
 import json
+import time
 from io import BytesIO
 from typing import Dict, List, Union
 
-import pandas as pd
+from startup import startup_report
+
+_pd = None
+
+
+def _pandas():
+    """pandas is imported on the first export instead of when the app starts."""
+    global _pd
+    if _pd is None:
+        started = time.perf_counter()
+        import pandas
+        _pd = pandas
+        startup_report.record_deferred("pandas", time.perf_counter() - started)
+    return _pd
+
 
 class DataExporter:
     def to_csv(self, data: List[Dict]) -> str:
@@ -12,6 +27,7 @@ class DataExporter:
             print("🔍 Exporter: No data provided for CSV export")
             return ""
         try:
+            pd = _pandas()
             df = pd.DataFrame(data)
             print(f"🔍 Exporter: DataFrame created with shape {df.shape}")
             print(f"🔍 Exporter: CSV columns: {list(df.columns)}")
@@ -58,6 +74,7 @@ class DataExporter:
             print("🔍 Exporter: No data provided for Excel export")
             return b""
         try:
+            pd = _pandas()
             df = pd.DataFrame(data)
             print(f"🔍 Exporter: DataFrame created with shape {df.shape}")
             print(f"🔍 Exporter: DataFrame columns: {list(df.columns)}")
@@ -97,6 +114,7 @@ class DataExporter:
             print("🔍 Exporter: No relational data provided for Excel export")
             return b""
         try:
+            pd = _pandas()
             output = BytesIO()
             with pd.ExcelWriter(output, engine="openpyxl") as writer:
                 sheet_count = 0
@@ -163,6 +181,7 @@ class DataExporter:
             print("🔍 Exporter: No data for Excel fallback")
             return ""
         try:
+            pd = _pandas()
             df = pd.DataFrame(data)
             csv_content = df.to_csv(index=False, encoding="utf-8-sig")
             print(f"🔍 Exporter: Excel fallback CSV generated, length: {len(csv_content)}")
@@ -180,6 +199,7 @@ class DataExporter:
             print("🔍 Exporter: No relational data provided for CSV export")
             return ""
         try:
+            pd = _pandas()
             all_records: List[Dict] = []
             for table_name, table_data in data.items():
                 if table_data and len(table_data) > 0:
@@ -1,37 +1,115 @@
 # ayushbhardwaj90/dataset-generator-using-genai/Dataset-Generator-using-GenAI-79155e47a57111fac9d81a099df114ccf1eeb342/generator.py
 
+import contextvars
 import json
+import math
 import os
-import random
 import re
-from collections import Counter
-from datetime import datetime, timedelta
-from typing import Any, Dict, List, Optional, Union
-
-import google.generativeai as genai
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from contextlib import contextmanager
+from functools import partial
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple, Union
+
+import google.api_core.exceptions as api_exceptions
+import numpy as np
 from dotenv import load_dotenv
 
-from schemas import (AugmentationRule, AugmentationStrategy, ColumnDataType,
-                     ColumnSchema, ExactValueConstraint, PercentageConstraint,
+from augmentation import AugmentationEngine, AugmentedDataset
+from batching import batch_sizer
+from circuit_breaker import HALF_OPEN, OPEN, CircuitOpenError, llm_breaker
+from constraints import ConstraintEnforcer
+from llm_providers import LLM_PROVIDER, LLMProvider, create_provider
+from metrics import (batch_rows, current_labels, fallbacks, llm_call_seconds,
+                     llm_errors, llm_tokens, parse_failures, quota_errors,
+                     rows_generated, salvaged_rows)
+from prompt_cache import prompt_cache
+from rate_limit import rate_limiter
+from relational import RelationalSynthesizer, table_levels
+from schemas import (AugmentationRule, ColumnDataType, ColumnSchema,
+                     ExactValueConstraint, PercentageConstraint,
                      RangeConstraint, RelationalGenerationRequest, TableSchema)
+from startup import startup_report
+from synthesis import ColumnarSampler, columns_to_records, normalize_spec
+from uniqueness import UniquenessEnforcer
+from wire_format import OUTPUT_FORMATS, decode_output, output_instruction
 
 # Load environment variables
 load_dotenv()
 
-class DatasetGenerator:
+# Maximum number of batch requests sent to Gemini at the same time
+GEMINI_MAX_CONCURRENCY = int(os.getenv("GEMINI_MAX_CONCURRENCY", "4"))
+# Number of parent keys shown to the model when generating a child table
+RELATIONAL_FK_POOL_SIZE = int(os.getenv("RELATIONAL_FK_POOL_SIZE", "100"))
+# Response format for generated rows: "records", "columnar" or "csv" (see wire_format.py)
+LLM_OUTPUT_FORMAT = os.getenv("LLM_OUTPUT_FORMAT", "records").lower()
+# Batch calls one dataset may make, as a multiple of the batches the first wave's size needs;
+# stops top-up waves from calling the model forever when most rows keep getting rejected
+GENERATION_MAX_CALLS_FACTOR = float(os.getenv("GENERATION_MAX_CALLS_FACTOR", "3"))
+# Rows per streamed batch in seed-and-scale mode, where all rows are sampled locally in one go
+SEED_SCALE_STREAM_BATCH_ROWS = int(os.getenv("SEED_SCALE_STREAM_BATCH_ROWS", "1000"))
+
+
+class GenerationOutcome:
+    """What happened while a dataset was generated, besides the records themselves."""
+
     def __init__(self):
-        # Configure Gemini API
-        api_key = os.getenv('GEMINI_API_KEY')
-        if not api_key:
-            raise ValueError("GEMINI_API_KEY not found in environment variables")
-        
-        try:
-            genai.configure(api_key=api_key)
-            self.model = genai.GenerativeModel('gemini-1.5-flash')
-            print("✅ Gemini API initialized successfully")
-        except Exception as e:
-            print(f"❌ Failed to initialize Gemini API: {e}")
-            raise
+        self.used_fallback = False
+        self.warnings: List[str] = []
+
+
+# Outcome of the generation running in this context; batch and table threads share it
+_outcome: contextvars.ContextVar = contextvars.ContextVar("generation_outcome", default=None)
+
+
+@contextmanager
+def track_outcome() -> Iterator[GenerationOutcome]:
+    """Collects what the generator calls made inside the block report into one GenerationOutcome."""
+    outcome = GenerationOutcome()
+    token = _outcome.set(outcome)
+    try:
+        yield outcome
+    finally:
+        _outcome.reset(token)
+
+
+def _note_warning(message: str) -> None:
+    print(f"⚠️  {message}")
+    outcome = _outcome.get()
+    if outcome is not None:
+        outcome.warnings.append(message)
+
+
+def _note_fallback() -> None:
+    fallbacks.inc()
+    outcome = _outcome.get()
+    if outcome is not None:
+        outcome.used_fallback = True
+
+
+class DatasetGenerator:
+    def __init__(self, max_concurrency: int = GEMINI_MAX_CONCURRENCY, provider: Optional[LLMProvider] = None,
+                 output_format: str = LLM_OUTPUT_FORMAT):
+        self.max_concurrency = max(1, max_concurrency)
+        if output_format not in OUTPUT_FORMATS:
+            raise ValueError(f"Unknown output format '{output_format}', expected one of {OUTPUT_FORMATS}")
+        # How batch responses are requested and decoded; the compact formats name each column only once
+        self.output_format = output_format
+        # The text-generation backend (Gemini unless LLM_PROVIDER selects another one), created on first use
+        self._provider = provider
+        self._provider_lock = threading.Lock()
+        self.provider_name = provider.name if provider else LLM_PROVIDER
+
+    @property
+    def provider(self) -> LLMProvider:
+        if self._provider is None:
+            with self._provider_lock:
+                if self._provider is None:
+                    started = time.perf_counter()
+                    self._provider = create_provider(self.provider_name)
+                    startup_report.record_deferred("LLM provider", time.perf_counter() - started)
+        return self._provider
     
     def refine_prompt(self, prompt: str) -> Optional[str]:
         """
@@ -58,281 +136,482 @@ class DatasetGenerator:
         User input: "{prompt}"
         Refined: 
         """
+        cached = prompt_cache.get(prompt)
+        if cached is not None:
+            print(f"✅ Refined prompt served from cache. Output: {cached}")
+            return cached
+
         try:
             print("🔄 Refining user prompt with Gemini...")
-            response = self.model.generate_content(refinement_prompt)
+            response = self._call_model(refinement_prompt)
             refined_text = response.text.strip()
             print(f"✅ Prompt refined. Output: {refined_text}")
             
             if refined_text == "VAGUE_PROMPT":
                 return None
+            prompt_cache.set(prompt, refined_text)
             return refined_text
+        except (api_exceptions.ResourceExhausted, CircuitOpenError):
+            # Still out of quota after the rate limiter's retries, or the provider is down: let the endpoint report it
+            raise
         except Exception as e:
             print(f"❌ Prompt refinement failed: {e}")
             return None
 
-    def _generate_in_batches(self, base_prompt: str, total_rows: int, batch_size: int = 50) -> List[Dict]:
-        """Generates data in batches to ensure consistency for large datasets."""
-        all_data = []
-        num_batches = (total_rows + batch_size - 1) // batch_size
-        
+    def _call_model(self, prompt: str):
+        """
+        Single entry point for every LLM call made by the generator. Calls go through the circuit
+        breaker, which fails fast with CircuitOpenError while the provider is unhealthy, and the
+        shared rate limiter; every attempt the limiter makes is recorded by the breaker and timed
+        from the moment the limiter lets it through (the wait itself is llm_rate_limit_wait_seconds).
+        """
+        llm_breaker.check()
+        try:
+            response = rate_limiter.call(partial(llm_breaker.call, self._timed_generate), prompt)
+        except CircuitOpenError:
+            raise
+        except (api_exceptions.ResourceExhausted, api_exceptions.TooManyRequests):
+            quota_errors.inc()
+            raise
+        except Exception:
+            llm_errors.inc()
+            raise
+        usage = getattr(response, "usage_metadata", None)
+        if usage is not None:
+            endpoint, domain = current_labels()
+            llm_tokens.inc(getattr(usage, "prompt_token_count", 0) or 0, endpoint, domain, "prompt")
+            llm_tokens.inc(getattr(usage, "candidates_token_count", 0) or 0, endpoint, domain, "completion")
+        return response
+
+    def _timed_generate(self, prompt: str):
+        started = time.perf_counter()
+        try:
+            return self.provider.generate_content(prompt)
+        finally:
+            llm_call_seconds.observe(time.perf_counter() - started)
+
+    def _run_batch(self, label: str, prompt: str, rows: int) -> Tuple[List[Dict], float, bool, bool]:
+        """
+        Runs one batch request and returns its records, the elapsed time in seconds, whether
+        the response parsed cleanly (False on truncation or malformed JSON) and whether a
+        response arrived at all (False when the call failed).
+        """
+        started = time.perf_counter()
+        batch_data: List[Dict] = []
+        clean = False
+        responded = False
+        batch_rows.observe(rows)
+        try:
+            print(f"🔄 Generating batch {label} for {rows} rows...")
+            response = self._call_model(prompt)
+            responded = True
+            batch_data, parser = decode_output(response.text, self.output_format)
+            batch_data = batch_data[:rows]
+            clean = parser.dropped == 0 and not parser.truncated and bool(batch_data)
+            rows_generated.inc(len(batch_data))
+
+            if not batch_data:
+                parse_failures.inc()
+                print(f"❌ Invalid response format for batch {label}, skipping.")
+            elif not clean:
+                parse_failures.inc()
+                salvaged_rows.inc(len(batch_data))
+                print(f"⚠️  Batch {label} was {'truncated' if parser.truncated else 'partly malformed'}: "
+                      f"salvaged {parser.salvaged} records, dropped {parser.dropped}")
+        except Exception as e:
+            print(f"❌ Error generating batch {label}: {e}, attempting to continue...")
+
+        elapsed = time.perf_counter() - started
+        print(f"⏱️  Batch {label} finished in {elapsed:.2f}s with {len(batch_data)} records")
+        return batch_data, elapsed, clean, responded
+
+    def _iter_batches(self, base_prompt: str, total_rows: int, batch_size: Optional[int] = None,
+                      enforcer: Optional[UniquenessEnforcer] = None,
+                      progress: Optional[Callable[[int, int], None]] = None) -> Iterator[Tuple[int, List[Dict]]]:
+        """
+        Yields (batch_number, records) for every batch as soon as it has been parsed.
+        Batches are sent in waves of up to max_concurrency concurrent calls, so within a wave they arrive in
+        completion order; batch_number gives the deterministic position of the batch in the dataset.
+        Unless batch_size is given, the rows per call come from the adaptive sizer, which is updated
+        after every batch; rows lost to truncated or malformed batches are requested again in the next wave.
+        Every batch passes through the uniqueness enforcer (by default one that drops repeated rows), so
+        rejected duplicates count as missing rows and only that shortfall is requested again. The number
+        of calls is capped at GENERATION_MAX_CALLS_FACTOR times the batches the whole dataset needs at the
+        current batch size (re-evaluated every wave, as the size shrinks); when the cap is hit the rows
+        produced so far are returned. A short dataset is reported as a warning naming where the rows went.
+        progress, if given, is called with (rows produced, rows requested) after every accepted batch.
+        """
+        enforcer = enforcer or UniquenessEnforcer()
         # New: Remove existing row count from the base prompt before batching
         # The prompt from refine_prompt looks like "Generate a dataset with {rows} rows..."
         # This regex will remove that part so the batching logic can add it back correctly.
         cleaned_base_prompt = re.sub(r'Generate a dataset with \d+ rows and columns:', 'Generate a dataset with the following columns:', base_prompt.strip())
-        
-        for i in range(num_batches):
-            rows_to_generate = min(batch_size, total_rows - len(all_data))
-            if rows_to_generate <= 0:
+        fingerprint = batch_sizer.fingerprint(cleaned_base_prompt)
+
+        produced = 0
+        timings: List[float] = []
+        batch_count = 0
+        wave = 0
+        empty_waves = 0
+        failed_calls = 0
+        short_rows = 0
+        stop_reason = None
+        started = time.perf_counter()
+        max_calls = 0
+
+        while produced < total_rows:
+            circuit = llm_breaker.state()
+            if circuit == OPEN:
+                print("🔌 LLM circuit is open, stopping batch generation.")
+                stop_reason = "the LLM circuit opened"
                 break
-                
-            batch_prompt = f"{cleaned_base_prompt}\n\nGenerate exactly {rows_to_generate} records."
-            
-            try:
-                print(f"🔄 Generating batch {i+1}/{num_batches} for {rows_to_generate} rows...")
-                response = self.model.generate_content(batch_prompt)
-                cleaned_response = self._clean_json_response(response.text)
-                batch_data = json.loads(cleaned_response)
-                
-                if isinstance(batch_data, list):
-                    all_data.extend(batch_data)
-                else:
-                    print(f"❌ Invalid response format for batch {i+1}, skipping.")
-
-            except Exception as e:
-                print(f"❌ Error generating batch {i+1}: {e}, attempting to continue...")
-        
-        print(f"✅ Batch generation complete. Total records: {len(all_data)} of {total_rows} requested.")
-        return all_data
-
-    def generate_sample_data(self, domain: str, rows: int = 5,
-                             constraints: Optional[List[Union[PercentageConstraint, ExactValueConstraint, RangeConstraint]]] = None, custom_prompt: Optional[str] = None) -> List[Dict]:
-        """Generate realistic sample data using AI for a specific domain with optional constraints"""
-        
+            size = batch_size or batch_sizer.size_for(fingerprint)
+            # Never lowered, so shrinking batches get the calls they need but the cap cannot run away
+            max_calls = max(max_calls, 2, math.ceil(GENERATION_MAX_CALLS_FACTOR * math.ceil(total_rows / size)))
+            if batch_count >= max_calls:
+                stop_reason = f"the limit of {max_calls} batch calls was reached"
+                break
+            wave += 1
+            remaining = total_rows - produced
+            # While the circuit is half-open only one trial call is let through at a time
+            concurrency = 1 if circuit == HALF_OPEN else self.max_concurrency
+            wave_rows = [min(size, remaining - start) for start in range(0, remaining, size)][:min(concurrency, max_calls - batch_count)]
+
+            wave_records = 0
+            with ThreadPoolExecutor(max_workers=len(wave_rows), thread_name_prefix="gemini-batch") as executor:
+                # Each batch runs in a copy of the caller's context so it is measured under the caller's metric labels
+                futures = {
+                    executor.submit(
+                        contextvars.copy_context().run, self._run_batch, f"{batch_count + i + 1} (wave {wave})",
+                        f"{cleaned_base_prompt}\n\nGenerate exactly {rows} records.", rows
+                    ): (batch_count + i, rows)
+                    for i, rows in enumerate(wave_rows)
+                }
+                for future in as_completed(futures):
+                    batch_number, rows = futures[future]
+                    batch_data, elapsed, clean, responded = future.result()
+                    timings.append(elapsed)
+                    if responded:
+                        short_rows += rows - len(batch_data)
+                    else:
+                        failed_calls += 1
+                    # A failed call says nothing about whether the batch was too large
+                    if batch_size is None and responded:
+                        batch_sizer.record(fingerprint, rows, len(batch_data), clean)
+                    batch_data = enforcer.filter(batch_data)
+                    if batch_data:
+                        produced += len(batch_data)
+                        wave_records += len(batch_data)
+                        if progress:
+                            progress(produced, total_rows)
+                        yield batch_number, batch_data
+            batch_count += len(wave_rows)
+
+            if wave_records == 0:
+                empty_waves += 1
+                # A failed wave is retried once (smaller, if its responses came back short) before giving up
+                if empty_waves >= 2 or batch_size is not None:
+                    print(f"❌ Wave {wave} produced no records, stopping batch generation.")
+                    stop_reason = "a wave produced no records"
+                    break
+            else:
+                empty_waves = 0
+
+        wall_time = time.perf_counter() - started
+        if timings:
+            print(
+                f"⏱️  {batch_count} batches in {wave} waves with concurrency {self.max_concurrency}: wall {wall_time:.2f}s, "
+                f"batch min/avg/max {min(timings):.2f}/{sum(timings)/len(timings):.2f}/{max(timings):.2f}s"
+            )
+            if batch_size is None:
+                print(f"📏 Adaptive batch size for this schema is now {batch_sizer.size_for(fingerprint)} rows")
+        rejected = enforcer.stats()
+        if rejected["duplicate_rows"] or rejected["key_collisions"] or rejected["missing_keys"] or rejected["repaired_keys"]:
+            print(f"🧹 Uniqueness: rejected {rejected['duplicate_rows']} duplicate rows, {rejected['key_collisions']} key collisions "
+                  f"and {rejected['missing_keys']} rows without a key; renumbered {rejected['repaired_keys']} keys")
+        if produced < total_rows and produced > 0:
+            rejected_rows = rejected["duplicate_rows"] + rejected["key_collisions"] + rejected["missing_keys"]
+            _note_warning(
+                f"Generated {produced} of {total_rows} requested rows; stopped because {stop_reason}. "
+                f"{short_rows} rows were lost to truncated or malformed responses, {rejected_rows} were rejected "
+                f"as duplicates or invalid keys, and {failed_calls} of {batch_count} calls failed."
+            )
+        print(f"✅ Batch generation complete. Total records: {produced} of {total_rows} requested.")
+
+    def _generate_in_batches(self, base_prompt: str, total_rows: int, batch_size: Optional[int] = None,
+                             enforcer: Optional[UniquenessEnforcer] = None,
+                             progress: Optional[Callable[[int, int], None]] = None) -> List[Dict]:
+        """Generates data in batches to ensure consistency for large datasets, reassembled in batch order."""
+        batches = sorted(self._iter_batches(base_prompt, total_rows, batch_size, enforcer, progress), key=lambda batch: batch[0])
+        return [record for _, batch_data in batches for record in batch_data]
+
+    def _build_sample_prompt(self, domain: str, rows: int,
+                             constraints: Optional[List[Union[PercentageConstraint, ExactValueConstraint, RangeConstraint]]], custom_prompt: Optional[str]) -> str:
         # FIX: Simplified and more direct prompt to prevent AI confusion
         base_prompt = f"Generate a dataset for the {domain} domain with {rows} records. The data should be tailored to these specific requirements: '{custom_prompt}'"
 
         base_prompt += self._build_constraint_prompt_segment(constraints)
-        base_prompt += "\nReturn only a valid JSON array of objects, with no extra text or markdown."
+        base_prompt += f"\n{output_instruction(self.output_format)}"
+        return base_prompt
 
-        generated_data = self._generate_in_batches(base_prompt, rows)
+    def _build_custom_prompt(self, prompt: str,
+                             constraints: Optional[List[Union[PercentageConstraint, ExactValueConstraint, RangeConstraint]]]) -> str:
+        constraint_prompt_segment = self._build_constraint_prompt_segment(constraints)
+        columns_prompt = re.sub(r'Generate a dataset with \d+ rows and columns:', 'Generate a dataset with the following columns:', prompt.strip())
+
+        # FIX: Replaced the multi-line prompt with a single, clear instruction
+        return f"{columns_prompt}{constraint_prompt_segment}\n{output_instruction(self.output_format)}"
+
+    def stream_data(self, domain: str, rows: int,
+                    constraints: Optional[List[Union[PercentageConstraint, ExactValueConstraint, RangeConstraint]]] = None,
+                    refined_prompt: Optional[str] = None, unique_fields: Optional[List[str]] = None,
+                    seed: Optional[int] = None) -> Iterator[Tuple[int, List[Dict]]]:
+        """
+        Streaming counterpart of generate_sample_data / generate_custom_data: yields (batch_number, records)
+        as batches complete. Range and exact-value constraints are enforced per batch; percentage constraints
+        need the whole dataset to rebalance, so here they only act as prompt hints. Falls back to the domain fallback data
+        (drawn with seed) if the AI produced nothing.
+        """
+        if domain == "Custom":
+            base_prompt = self._build_custom_prompt(refined_prompt, constraints)
+        else:
+            base_prompt = self._build_sample_prompt(domain, rows, constraints, refined_prompt)
+        base_prompt += self._build_unique_prompt_segment(unique_fields)
+
+        constraint_enforcer = ConstraintEnforcer(constraints)
+        produced_any = False
+        for batch_number, batch_data in self._iter_batches(base_prompt, rows, enforcer=UniquenessEnforcer(unique_fields or [])):
+            produced_any = True
+            yield batch_number, constraint_enforcer.enforce(batch_data, row_local_only=True)
+
+        if not produced_any:
+            print(f"❌ AI generation failed for {domain}, streaming fallback data.")
+            yield 0, self._get_fallback_data(domain, rows, seed)
+
+    def stream_seed_scale_data(self, domain: str, rows: int,
+                               constraints: Optional[List[Union[PercentageConstraint, ExactValueConstraint, RangeConstraint]]] = None,
+                               refined_prompt: Optional[str] = None, seed: Optional[int] = None) -> Iterator[Tuple[int, List[Dict]]]:
+        """
+        Streaming counterpart of generate_seed_scale_data. The rows are sampled in one go (so every
+        constraint holds exactly) and yielded as (batch_number, records) in pieces of
+        SEED_SCALE_STREAM_BATCH_ROWS rows.
+        """
+        data = self.generate_seed_scale_data(domain, rows, constraints, refined_prompt, seed)
+        for batch_number, start in enumerate(range(0, len(data), SEED_SCALE_STREAM_BATCH_ROWS)):
+            yield batch_number, data[start:start + SEED_SCALE_STREAM_BATCH_ROWS]
+
+    def generate_sample_data(self, domain: str, rows: int = 5,
+                             constraints: Optional[List[Union[PercentageConstraint, ExactValueConstraint, RangeConstraint]]] = None, custom_prompt: Optional[str] = None,
+                             unique_fields: Optional[List[str]] = None,
+                             progress: Optional[Callable[[int, int], None]] = None,
+                             seed: Optional[int] = None) -> List[Dict]:
+        """Generate realistic sample data using AI for a specific domain with optional constraints (seed drives the fallback data)"""
+        base_prompt = self._build_sample_prompt(domain, rows, constraints, custom_prompt)
+        base_prompt += self._build_unique_prompt_segment(unique_fields)
+        generated_data = self._generate_in_batches(base_prompt, rows, enforcer=UniquenessEnforcer(unique_fields or []), progress=progress)
 
         # NEW: Check if generated_data is empty, and if so, return fallback data.
         if not generated_data:
             print(f"❌ AI generation failed for {domain}, using fallback data.")
-            return self._get_fallback_data(domain, rows)
+            return self._get_fallback_data(domain, rows, seed)
 
-        return generated_data
+        return self._enforce_constraints(generated_data, constraints)
 
     def generate_custom_data(self, prompt: str, rows: int = 5,
-                             constraints: Optional[List[Union[PercentageConstraint, ExactValueConstraint, RangeConstraint]]] = None) -> List[Dict]:
+                             constraints: Optional[List[Union[PercentageConstraint, ExactValueConstraint, RangeConstraint]]] = None,
+                             unique_fields: Optional[List[str]] = None,
+                             progress: Optional[Callable[[int, int], None]] = None,
+                             seed: Optional[int] = None) -> List[Dict]:
         """
         Generate custom data based on a free-form prompt using AI with optional constraints.
-        This function now expects a refined prompt to be passed to it.
+        This function now expects a refined prompt to be passed to it; seed drives the fallback data.
         """
-        constraint_prompt_segment = self._build_constraint_prompt_segment(constraints)
-
-        # FIX: Replaced the multi-line prompt with a single, clear instruction
-        base_prompt = f"{re.sub(r'Generate a dataset with \d+ rows and columns:', 'Generate a dataset with the following columns:', prompt.strip())}{constraint_prompt_segment}\nReturn only a valid JSON array of objects, with no extra text or markdown."
-
-        generated_data = self._generate_in_batches(base_prompt, rows)
+        base_prompt = self._build_custom_prompt(prompt, constraints)
+        base_prompt += self._build_unique_prompt_segment(unique_fields)
+        generated_data = self._generate_in_batches(base_prompt, rows, enforcer=UniquenessEnforcer(unique_fields or []), progress=progress)
 
         # FIX: The hardcoded fallback has been replaced with a dynamic call.
         if not generated_data:
             print("❌ Invalid response format for custom generation from AI, using fallback.")
-            return self._get_fallback_data("Custom", rows)
-
-        if constraints:
-            augmentation_rules = []
-            for constraint in constraints:
-                if isinstance(constraint, PercentageConstraint):
-                    augmentation_rules.append(
-                        AugmentationRule(
-                            field=constraint.field,
-                            strategy=AugmentationStrategy.TARGET_PERCENTAGE,
-                            value=constraint.value,
-                            target_percentage=constraint.percentage
-                        )
-                    )
-            if augmentation_rules:
-                print(f"Post-processing to enforce {len(augmentation_rules)} granular constraints for custom data...")
-                generated_data = self.augment_data(generated_data, augmentation_rules)
-                print(f"Post-processing for custom data complete. New count: {len(generated_data)}")
-
-        return generated_data
-
-    def generate_relational_data(self, request: RelationalGenerationRequest) -> Dict[str, List[Dict]]:
-        """
-        Generates multiple related datasets (tables) based on a defined schema
-        with foreign-key relationships and optional global constraints.
-        """
-        tables_prompt_segment = self._build_relational_schema_prompt(request.tables)
-        global_constraint_prompt_segment = self._build_constraint_prompt_segment(request.global_constraints)
-
-        full_prompt = f"""Generate multiple related datasets in a single JSON object.
-        The JSON object should have keys corresponding to table names, and values being JSON arrays of records for each table.
+            return self._get_fallback_data("Custom", rows, seed)
 
-        Here are the table schemas and relationships:
-        {tables_prompt_segment}
-        {global_constraint_prompt_segment}
+        return self._enforce_constraints(generated_data, constraints)
 
-        Ensure all foreign-key relationships are correctly maintained across tables.
-        Return ONLY a single valid JSON object, with no extra text or markdown formatting outside the JSON.
+    def _enforce_constraints(self, data: List[Dict],
+                             constraints: Optional[List[Union[PercentageConstraint, ExactValueConstraint, RangeConstraint]]]) -> List[Dict]:
+        """Fixes the cells that violate the constraints (the prompt only asks the model to respect them)."""
+        if not constraints:
+            return data
+        enforcer = ConstraintEnforcer(constraints)
+        started = time.perf_counter()
+        data = enforcer.enforce(data)
+        print(f"Post-processing enforced {len(constraints)} constraints in {time.perf_counter() - started:.2f}s: {enforcer.summary()}")
+        return data
+
+    def infer_dataset_spec(self, prompt: str) -> Optional[List[Dict]]:
+        """
+        Asks Gemini once for a column schema with value vocabularies, numeric ranges and
+        category weights, which the local sampler can then scale to any number of rows.
+        """
+        spec_prompt = f"""
+        Design the column specification for a synthetic dataset described by the request below.
+        Do NOT generate any rows. Return ONLY a JSON object of the form
+        {{"columns": [{{"name": "...", "type": "...", ...}}]}} with no extra text or markdown.
+
+        Allowed column types and their keys:
+        - "id": unique sequential identifier. Keys: "prefix" (optional string, e.g. "CUST_").
+        - "category": Keys: "values" (list of realistic values, 5-50 of them), "weights" (relative frequencies, same length).
+        - "string": free-text column. Keys: "values" (list of 20-100 realistic values) and optional "weights".
+        - "integer" / "float": Keys: "min", "max", "distribution" ("uniform" or "normal"), "mean", "std", "decimals" (float only).
+        - "boolean": Keys: "true_probability".
+        - "date" / "datetime": Keys: "start", "end" (ISO 8601).
+
+        Request: "{prompt}"
         """
         try:
-            print(f"🔄 Generating relational data for {len(request.tables)} tables with AI...")
-            response = self.model.generate_content(full_prompt)
-            cleaned_response = self._clean_json_response(response.text)
-
-            data = json.loads(cleaned_response)
-
-            if isinstance(data, dict) and all(isinstance(v, list) for v in data.values()):
-                print(f"✅ Successfully generated relational data for {len(data)} tables.")
-                generated_table_names = set(data.keys())
-                requested_table_names = {table.name for table in request.tables}
-                if requested_table_names.issubset(generated_table_names):
-                    if request.global_constraints:
-                         print("Warning: Global constraints on relational data are currently treated as hints to the LLM due to complexity of post-processing while preserving relational integrity.")
-                    return data
-                else:
-                    print(f"❌ Mismatch in generated tables. Requested: {requested_table_names}, Generated: {generated_table_names}")
-                    return self._fallback_relational(request.tables)
-            else:
-                print("❌ Invalid response format for relational generation from AI (expected dict of lists).")
-                return self._fallback_relational(request.tables)
-
-        except json.JSONDecodeError as e:
-            print(f"❌ Relational JSON parsing failed: {e}")
-            print(f"Raw response: {response.text}")
-            return self._fallback_relational(request.tables)
+            print("🔄 Inferring dataset spec with Gemini...")
+            response = self._call_model(spec_prompt)
+            spec = json.loads(self._clean_json_response(response.text))
+            columns = normalize_spec(spec)
+            print(f"✅ Dataset spec inferred with {len(columns)} columns: {[c['name'] for c in columns]}")
+            return columns
         except Exception as e:
-            print(f"❌ Relational AI generation error: {e}")
-            return self._fallback_relational(request.tables)
+            print(f"❌ Dataset spec inference failed: {e}")
+            return None
 
-    def augment_data(self, original_data: List[Dict], rules: List[AugmentationRule]) -> List[Dict]:
+    def generate_seed_scale_data(self, domain: str, rows: int,
+                                 constraints: Optional[List[Union[PercentageConstraint, ExactValueConstraint, RangeConstraint]]] = None,
+                                 refined_prompt: Optional[str] = None, seed: Optional[int] = None) -> List[Dict]:
         """
-        Augments and rebalances a dataset based on a list of rules.
-        This is a post-processing step.
+        "Seed and scale" generation: one LLM call infers the dataset spec, then every row is
+        sampled locally with NumPy, so the LLM cost no longer grows with the row count.
+        Constraints are applied exactly during sampling.
         """
-        augmented_data = list(original_data)
-        original_count = len(original_data)
-
-        for rule in rules:
-            if rule.strategy == AugmentationStrategy.TARGET_PERCENTAGE:
-                print(f"Applying TARGET_PERCENTAGE rule for field '{rule.field}' with value '{rule.value}' to {rule.target_percentage}%")
-                augmented_data = self._apply_target_percentage(augmented_data, rule.field, rule.value, rule.target_percentage)
-            elif rule.strategy == AugmentationStrategy.BALANCE_CATEGORIES:
-                print(f"Applying BALANCE_CATEGORIES rule for field '{rule.field}'")
-                augmented_data = self._balance_categories(augmented_data, rule.field)
-            elif rule.strategy == AugmentationStrategy.OVERSAMPLE_VALUE:
-                print(f"Applying OVERSAMPLE_VALUE rule for field '{rule.field}' with value '{rule.value}' to {rule.target_count} records")
-                augmented_data = self._oversample_value(augmented_data, rule.field, rule.value, rule.target_count)
-
-        print(f"Data augmentation complete. Original count: {original_count}, Augmented count: {len(augmented_data)}")
-        return augmented_data
-
-    def _apply_target_percentage(self, data: List[Dict], field: str, value: Any, target_percentage: float) -> List[Dict]:
+        if domain == "Custom":
+            description = refined_prompt
+        else:
+            description = f"A dataset for the {domain} domain. {refined_prompt or ''}".strip()
+        description += self._build_constraint_prompt_segment(constraints)
+
+        columns = self.infer_dataset_spec(description)
+        if not columns:
+            print(f"❌ Seed and scale generation failed for {domain}, using fallback data.")
+            return self._get_fallback_data(domain, rows, seed)
+
+        started = time.perf_counter()
+        data = ColumnarSampler(columns, constraints, seed).sample(rows)
+        print(f"✅ Sampled {len(data)} rows locally in {time.perf_counter() - started:.2f}s")
+        return data
+
+    def generate_relational_data(self, request: RelationalGenerationRequest,
+                                 progress: Optional[Callable[[int, int], None]] = None) -> Dict[str, List[Dict]]:
         """
-        Adjusts data to ensure a target percentage of records have a specific value in a field.
-        This version is more robust in introducing the target value if initially missing.
+        Generates multiple related datasets (tables) based on a defined schema
+        with foreign-key relationships and optional global constraints.
+
+        Tables are generated one by one in foreign-key order, each through the regular batch
+        pipeline. Child-table prompts receive a sample of the referenced parent keys, and any
+        foreign key outside the parent's key set is remapped afterwards. Tables of the same
+        dependency level run concurrently. A table that fails falls back on its own, without
+        discarding the tables that succeeded. progress, if given, is called with
+        (records generated, records requested) after every dependency level.
         """
-        if not data:
-            return []
-        current_data = list(data)
-        current_records_with_value = [record for record in current_data if record.get(field) == value]
-        current_count = len(current_records_with_value)
-        total_records = len(current_data)
-        desired_count = int(round(target_percentage / 100 * total_records))
-
-        print(f"  -> Current count of '{value}' in '{field}': {current_count}/{total_records} ({current_count/total_records*100:.1f}%)")
-        print(f"  -> Desired count: {desired_count}")
-
-        if current_count < desired_count:
-            num_to_add = desired_count - current_count
-            print(f"  -> Need to ADD {num_to_add} records with '{field}' = '{value}'")
-            records_without_value = [record for record in current_data if record.get(field) != value]
-            if len(records_without_value) >= num_to_add:
-                random.shuffle(records_without_value)
-                for i in range(num_to_add):
-                    records_without_value[i][field] = value
-                current_data = records_with_value + records_without_value
-            else:
-                print(f"  -> Not enough records WITHOUT '{value}' to modify. Modifying all available and duplicating/creating.")
-                for record in records_without_value:
-                    record[field] = value
-                remaining_to_add = num_to_add - len(records_without_value)
-                current_data = records_with_value + records_without_value
-                if remaining_to_add > 0:
-                    if current_data:
-                        for _ in range(remaining_to_add):
-                            current_data.append(random.choice(current_data).copy())
-                    else:
-                        for _ in range(remaining_to_add):
-                            current_data.append({field: value})
-        elif current_count > desired_count:
-            num_to_remove = current_count - desired_count
-            print(f"  -> Need to REMOVE {num_to_remove} records with '{field}' = '{value}'")
-            records_with_value = [record for record in current_data if record.get(field) == value]
-            records_without_value = [record for record in current_data if record.get(field) != value]
-            if num_to_remove >= len(records_with_value):
-                current_data = records_without_value
-            else:
-                random.shuffle(records_with_value)
-                current_data = records_without_value + records_with_value[num_to_remove:]
-        return current_data
-
-    def _balance_categories(self, data: List[Dict], field: str) -> List[Dict]:
-        """Balances the distribution of categories in a specified field by oversampling smaller categories."""
-        if not data:
-            return []
-        current_data = list(data)
-        category_counts = Counter(record.get(field) for record in current_data if field in record)
-        if not category_counts:
-            return current_data
-        target_count_per_category = max(category_counts.values())
-        balanced_data = []
-        for category, count in category_counts.items():
-            if category is None:
-                balanced_data.extend([record for record in current_data if field not in record or record.get(field) is None])
+        referenced = {}
+        for table in request.tables:
+            for col in table.columns:
+                if col.is_foreign_key:
+                    referenced.setdefault(col.references_table, set()).add(col.references_column)
+
+        generated: Dict[str, List[Dict]] = {}
+        key_columns: Dict[str, Dict[str, np.ndarray]] = {}
+        levels = table_levels(request.tables)
+        print(f"🔄 Generating relational data for {len(request.tables)} tables in {len(levels)} dependency levels with AI...")
+
+        for level in levels:
+            with ThreadPoolExecutor(max_workers=min(len(level), self.max_concurrency), thread_name_prefix="gemini-table") as executor:
+                futures = {
+                    executor.submit(contextvars.copy_context().run, self._generate_table, table, key_columns, request.global_constraints): table
+                    for table in level
+                }
+                for future in as_completed(futures):
+                    generated[futures[future].name] = future.result()
+
+            if progress:
+                progress(sum(len(rows) for rows in generated.values()), sum(table.rows for table in request.tables))
+            for table in level:
+                key_columns[table.name] = {
+                    column: np.array([record.get(column) for record in generated[table.name]], dtype=object)
+                    for column in referenced.get(table.name, ())
+                }
+
+        if request.global_constraints:
+            print("Warning: Global constraints on relational data are currently treated as hints to the LLM due to complexity of post-processing while preserving relational integrity.")
+        print(f"✅ Relational generation complete: {', '.join(f'{name}={len(rows)}' for name, rows in generated.items())}")
+        return {table.name: generated[table.name] for table in request.tables}
+
+    def _generate_table(self, table: TableSchema, key_columns: Dict[str, Dict[str, np.ndarray]],
+                        constraints: Optional[List[Union[PercentageConstraint, ExactValueConstraint, RangeConstraint]]]) -> List[Dict]:
+        """Generates one table of a relational request; key_columns holds the referenced columns of its parents."""
+        rng = np.random.default_rng()
+        pools = {}
+        for col in table.columns:
+            parent_keys = key_columns.get(col.references_table, {}).get(col.references_column) if col.is_foreign_key else None
+            if parent_keys is not None and len(parent_keys):
+                pool_size = min(RELATIONAL_FK_POOL_SIZE, len(parent_keys))
+                pools[col.name] = parent_keys[rng.choice(len(parent_keys), pool_size, replace=False)].tolist()
+
+        primary_keys = [col.name for col in table.columns if col.is_primary_key]
+        enforcer = UniquenessEnforcer(
+            unique_fields=[col.name for col in table.columns if col.unique],
+            required_fields=primary_keys,
+            # Integer keys can be renumbered safely: nothing references this table's rows yet
+            repair_fields=[col.name for col in table.columns if col.is_primary_key and col.data_type == ColumnDataType.INTEGER],
+        )
+        try:
+            records = self._generate_in_batches(self._build_table_prompt(table, pools, constraints), table.rows, enforcer=enforcer)
+        except Exception as e:
+            print(f"❌ Relational AI generation error for table '{table.name}': {e}")
+            records = []
+
+        if not records:
+            print(f"⚠️  Using fallback data for table '{table.name}'.")
+            _note_fallback()
+            return columns_to_records(RelationalSynthesizer().table_columns(table, key_columns))
+
+        for col in table.columns:
+            parent_keys = key_columns.get(col.references_table, {}).get(col.references_column) if col.is_foreign_key else None
+            if parent_keys is None or not len(parent_keys):
                 continue
-            records_in_category = [record for record in current_data if record.get(field) == category]
-            if count < target_count_per_category:
-                num_to_add = target_count_per_category - count
-                if records_in_category:
-                    for _ in range(num_to_add):
-                        balanced_data.append(random.choice(records_in_category).copy())
-                else:
-                    print(f"Warning: No existing records for category '{category}' in field '{field}' to oversample. Cannot balance this category effectively.")
-                    balanced_data.extend(records_in_category)
-            else:
-                balanced_data.extend(records_in_category)
-        return balanced_data
-
-    def _oversample_value(self, data: List[Dict], field: str, value: Any, target_count: int) -> List[Dict]:
-        """Oversamples records with a specific value in a field to reach a target count."""
-        current_data = list(data)
-        current_records_with_value = [record for record in current_data if record.get(field) == value]
-        current_count = len(current_records_with_value)
-        print(f"  -> Current count of '{value}' in '{field}': {current_count}")
-        print(f"  -> Desired count: {target_count}")
-        if current_count < target_count:
-            num_to_add = target_count - current_count
-            print(f"  -> Need to ADD {num_to_add} records with '{field}' = '{value}'")
-            candidates = [record for record in current_data if record.get(field) == value]
-            if not candidates:
-                print(f"Warning: No existing records with '{field}' = '{value}' to oversample. Creating new records by modifying existing ones.")
-                if current_data:
-                    for _ in range(num_to_add):
-                        modified_record = random.choice(current_data).copy()
-                        modified_record[field] = value
-                        current_data.append(modified_record)
+            # Compare as strings so "7" and 7 refer to the same parent row, then write the parent's own value
+            canonical = {str(key): key for key in parent_keys.tolist()}
+            invalid = []
+            for i, record in enumerate(records):
+                key = canonical.get(str(record.get(col.name)))
+                if key is None:
+                    invalid.append(i)
                 else:
-                    for _ in range(num_to_add):
-                        current_data.append({field: value})
-                return current_data
-            for _ in range(num_to_add):
-                current_data.append(random.choice(candidates).copy())
-        return current_data
+                    record[col.name] = key
+            if invalid:
+                print(f"⚠️  Remapped {len(invalid)} invalid foreign keys in {table.name}.{col.name}")
+                replacements = parent_keys[rng.integers(0, len(parent_keys), len(invalid))].tolist()
+                if col.unique:
+                    # Prefer parent keys no other row uses yet to keep the relationship one-to-one
+                    used = {str(record.get(col.name)) for record in records}
+                    unused = [key for key in parent_keys.tolist() if str(key) not in used]
+                    replacements = ([unused[j] for j in rng.permutation(len(unused))] + replacements)[:len(invalid)]
+                for i, key in zip(invalid, replacements):
+                    records[i][col.name] = key
+        return records
+
+    def augment_data(self, original_data: List[Dict], rules: List[AugmentationRule], seed: Optional[int] = None) -> AugmentedDataset:
+        """
+        Augments and rebalances a dataset based on a list of rules.
+        This is a post-processing step; see AugmentationEngine for how the rules are applied.
+        The result is a lazy, read-only view over the original records.
+        """
+        engine = AugmentationEngine(original_data, seed).apply(rules)
+        print(f"Data augmentation complete. Original count: {len(original_data)}, Augmented count: {len(engine)}")
+        return engine.materialize()
 
     def _clean_json_response(self, response_text: str) -> str:
         """Clean AI response to extract valid JSON"""
@@ -386,30 +665,50 @@ class DatasetGenerator:
                     segments.append(f"- The '{constraint.field}' field must be {' and '.join(range_desc)}.")
         return "\n".join(segments)
 
-    def _build_relational_schema_prompt(self, tables: List[TableSchema]) -> str:
+    def _build_unique_prompt_segment(self, unique_fields: Optional[List[str]]) -> str:
+        if not unique_fields:
+            return ""
+        fields = ", ".join(f"'{field}'" for field in unique_fields)
+        return f"\nEvery record must have a distinct value in these fields: {fields}."
+
+    def _build_table_prompt(self, table: TableSchema, fk_pools: Dict[str, List],
+                            constraints: Optional[List[Union[PercentageConstraint, ExactValueConstraint, RangeConstraint]]]) -> str:
         """
-        Builds a natural language prompt segment describing the relational schema.
+        Builds the batch prompt for a single table of a relational request,
+        including the allowed values for each foreign-key column.
         """
-        prompt_lines = []
-        for table in tables:
-            prompt_lines.append(f"Table Name: {table.name} (Generate {table.rows} rows)")
-            prompt_lines.append("Columns:")
-            for col in table.columns:
-                col_desc = f"  - {col.name} ({col.data_type.value})"
-                if col.description:
-                    col_desc += f": {col.description}"
-                if col.is_primary_key:
-                    col_desc += " (Primary Key)"
-                if col.is_foreign_key:
-                    col_desc += f" (Foreign Key referencing {col.references_table}.{col.references_column})"
-                if col.unique and not col.is_primary_key:
-                    col_desc += " (Unique)"
-                prompt_lines.append(col_desc)
-            prompt_lines.append("")
-        return "\n".join(prompt_lines)
+        prompt_lines = [f"Generate records for the table '{table.name}'.", "Columns:"]
+        for col in table.columns:
+            col_desc = f"  - {col.name} ({col.data_type.value})"
+            if col.description:
+                col_desc += f": {col.description}"
+            if col.is_primary_key:
+                col_desc += " (Primary Key)"
+            if col.is_foreign_key:
+                col_desc += f" (Foreign Key referencing {col.references_table}.{col.references_column})"
+            if col.unique and not col.is_primary_key:
+                col_desc += " (Unique)"
+            prompt_lines.append(col_desc)
+        for column, pool in fk_pools.items():
+            prompt_lines.append(f"The '{column}' field must only use these existing values: {json.dumps(pool, default=str)}")
+        prompt = "\n".join(prompt_lines)
+        prompt += self._build_constraint_prompt_segment(constraints)
+        prompt += f"\n{output_instruction(self.output_format)}"
+        return prompt
     
-    def _get_fallback_data(self, domain: str, rows: int) -> List[Dict]:
+    def _get_fallback_data(self, domain: str, rows: int, seed: Optional[int] = None) -> List[Dict]:
         """Get fallback data for any domain"""
+        _note_fallback()
+        columns = self._get_fallback_columns(domain, rows, seed)
+        if columns is None:
+            return [{"error": f"Domain {domain} not supported"}]
+        return columns_to_records(columns)
+
+    def _get_fallback_columns(self, domain: str, rows: int, seed: Optional[int] = None) -> Optional[Dict[str, np.ndarray]]:
+        """
+        Samples fallback data column by column with the NumPy engine. Records are only built
+        by the caller, so exporters can consume the columns directly. Returns None for unknown domains.
+        """
         fallback_methods = {
             "E-commerce": self._fallback_ecommerce,
             "Healthcare": self._fallback_healthcare,
@@ -418,91 +717,64 @@ class DatasetGenerator:
             "HR": self._fallback_hr,
             "Custom": self._fallback_custom
         }
-        if domain in fallback_methods:
-            print(f"⚠️  Using fallback data for {domain}")
-            return fallback_methods[domain](rows)
-        else:
-            return [{"error": f"Domain {domain} not supported"}]
-
-    def _fallback_relational(self, tables: List[TableSchema]) -> Dict[str, List[Dict]]:
-        """Generates fallback data for relational requests."""
-        print("⚠️  Using fallback data for relational generation.")
-        generated_data = {}
-        for table in tables:
-            table_data = []
-            for i in range(table.rows):
-                row = {}
-                for col in table.columns:
-                    if col.is_primary_key:
-                        row[col.name] = f"{table.name.upper()}_{col.name.upper()}_{i+1}"
-                    elif col.is_foreign_key:
-                        row[col.name] = f"{col.references_table.upper()}_{col.references_column.upper()}_{random.randint(1, table.rows)}"
-                    else:
-                        if col.data_type == ColumnDataType.INTEGER:
-                            row[col.name] = random.randint(1, 100)
-                        elif col.data_type == ColumnDataType.FLOAT:
-                            row[col.name] = round(random.uniform(1.0, 100.0), 2)
-                        elif col.data_type == ColumnDataType.BOOLEAN:
-                            row[col.name] = random.choice([True, False])
-                        elif col.data_type in [ColumnDataType.DATE, ColumnDataType.DATETIME]:
-                            row[col.name] = datetime.now().isoformat()
-                        else:
-                            row[col.name] = f"{col.name}_{i+1}"
-                table_data.append(row)
-            generated_data[table.name] = table_data
-        return generated_data
-
-    def _fallback_ecommerce(self, rows: int) -> List[Dict]:
-        products = ["iPhone 15", "Samsung Galaxy S24", "MacBook Pro", "AirPods Pro", "iPad Air"]
-        return [{
-            "product_id": f"PROD_{random.randint(10000, 99999)}", 
-            "product_name": random.choice(products), 
-            "brand": "Generic", 
-            "price": round(random.uniform(99.99, 1299.99), 2),
-            "category": "Electronics",
-            "description": "High-quality product",
-            "stock_quantity": random.randint(1, 100),
-            "rating": round(random.uniform(4.0, 5.0), 1),
-            "reviews_count": random.randint(50, 1000)
-        } for i in range(rows)]
+        if domain not in fallback_methods:
+            return None
+        print(f"⚠️  Using fallback data for {domain}")
+        return fallback_methods[domain](rows, seed)
+
+    def _fallback_ecommerce(self, rows: int, seed: Optional[int] = None) -> Dict[str, np.ndarray]:
+        return ColumnarSampler([
+            {"name": "product_id", "type": "code", "prefix": "PROD_", "min": 10000, "max": 99999},
+            {"name": "product_name", "type": "category", "values": ["iPhone 15", "Samsung Galaxy S24", "MacBook Pro", "AirPods Pro", "iPad Air"]},
+            {"name": "brand", "type": "constant", "value": "Generic"},
+            {"name": "price", "type": "float", "min": 99.99, "max": 1299.99, "decimals": 2},
+            {"name": "category", "type": "constant", "value": "Electronics"},
+            {"name": "description", "type": "constant", "value": "High-quality product"},
+            {"name": "stock_quantity", "type": "integer", "min": 1, "max": 100},
+            {"name": "rating", "type": "float", "min": 4.0, "max": 5.0, "decimals": 1},
+            {"name": "reviews_count", "type": "integer", "min": 50, "max": 1000}
+        ], seed=seed).sample_columns(rows)
     
-    def _fallback_healthcare(self, rows: int) -> List[Dict]:
-        return [{
-            "patient_id": f"P{random.randint(10000, 99999)}", 
-            "patient_name": f"Patient {i+1}", 
-            "age": random.randint(25, 65),
-            "gender": random.choice(["Male", "Female"]),
-            "diagnosis": random.choice(["Hypertension", "Diabetes", "Common Cold"]),
-            "specialty": "General Medicine",
-            "treatment": "Standard treatment",
-            "severity": "Moderate"
-        } for i in range(rows)]
+    def _fallback_healthcare(self, rows: int, seed: Optional[int] = None) -> Dict[str, np.ndarray]:
+        return ColumnarSampler([
+            {"name": "patient_id", "type": "code", "prefix": "P", "min": 10000, "max": 99999},
+            {"name": "patient_name", "type": "id", "prefix": "Patient "},
+            {"name": "age", "type": "integer", "min": 25, "max": 65},
+            {"name": "gender", "type": "category", "values": ["Male", "Female"]},
+            {"name": "diagnosis", "type": "category", "values": ["Hypertension", "Diabetes", "Common Cold"]},
+            {"name": "specialty", "type": "constant", "value": "General Medicine"},
+            {"name": "treatment", "type": "constant", "value": "Standard treatment"},
+            {"name": "severity", "type": "constant", "value": "Moderate"}
+        ], seed=seed).sample_columns(rows)
     
-    def _fallback_finance(self, rows: int) -> List[Dict]:
-        return [{
-            "transaction_id": f"TXN_{random.randint(100000, 999999)}", 
-            "account_id": f"ACC_{random.randint(1000, 9999)}",
-            "transaction_type": "Purchase",
-            "amount": round(random.uniform(-500, 500), 2),
-            "category": "General",
-            "merchant": "Generic Store"
-        } for i in range(rows)]
+    def _fallback_finance(self, rows: int, seed: Optional[int] = None) -> Dict[str, np.ndarray]:
+        return ColumnarSampler([
+            {"name": "transaction_id", "type": "code", "prefix": "TXN_", "min": 100000, "max": 999999},
+            {"name": "account_id", "type": "code", "prefix": "ACC_", "min": 1000, "max": 9999},
+            {"name": "transaction_type", "type": "constant", "value": "Purchase"},
+            {"name": "amount", "type": "float", "min": -500, "max": 500, "decimals": 2},
+            {"name": "category", "type": "constant", "value": "General"},
+            {"name": "merchant", "type": "constant", "value": "Generic Store"}
+        ], seed=seed).sample_columns(rows)
     
-    def _fallback_marketing(self, rows: int) -> List[Dict]:
-        return [{
-            "customer_id": f"CUST_{random.randint(10000, 99999)}", 
-            "customer_name": f"Customer {i+1}", 
-            "email": f"customer{i+1}@email.com",
-            "segment": "General"
-        } for i in range(rows)]
+    def _fallback_marketing(self, rows: int, seed: Optional[int] = None) -> Dict[str, np.ndarray]:
+        return ColumnarSampler([
+            {"name": "customer_id", "type": "code", "prefix": "CUST_", "min": 10000, "max": 99999},
+            {"name": "customer_name", "type": "id", "prefix": "Customer "},
+            {"name": "email", "type": "id", "prefix": "customer", "suffix": "@email.com"},
+            {"name": "segment", "type": "constant", "value": "General"}
+        ], seed=seed).sample_columns(rows)
     
-    def _fallback_hr(self, rows: int) -> List[Dict]:
-        return [{
-            "employee_id": f"EMP_{random.randint(1000, 9999)}", 
-            "employee_name": f"Employee {i+1}",
-            "department": "General",
-            "job_title": "Employee"
-        } for i in range(rows)]
-
-    def _fallback_custom(self, rows: int) -> List[Dict]:
-        return [{"id": i + 1, "data": f"Custom fallback data {i+1}"} for i in range(rows)]
\ No newline at end of file
+    def _fallback_hr(self, rows: int, seed: Optional[int] = None) -> Dict[str, np.ndarray]:
+        return ColumnarSampler([
+            {"name": "employee_id", "type": "code", "prefix": "EMP_", "min": 1000, "max": 9999},
+            {"name": "employee_name", "type": "id", "prefix": "Employee "},
+            {"name": "department", "type": "constant", "value": "General"},
+            {"name": "job_title", "type": "constant", "value": "Employee"}
+        ], seed=seed).sample_columns(rows)
+
+    def _fallback_custom(self, rows: int, seed: Optional[int] = None) -> Dict[str, np.ndarray]:
+        return ColumnarSampler([
+            {"name": "id", "type": "id"},
+            {"name": "data", "type": "id", "prefix": "Custom fallback data "}
+        ], seed=seed).sample_columns(rows)
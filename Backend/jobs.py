@@ -0,0 +1,243 @@
+import os
+import socket
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime, timedelta
+from typing import Callable, Dict, Optional, Tuple
+
+from models import GenerationJob, SessionLocal
+from schemas import JobStatus
+from sqlalchemy import and_, or_
+
+# Generation jobs run at the same time; the rest wait in the queue
+JOB_WORKERS = int(os.getenv("JOB_WORKERS", "2"))
+# Queued plus running jobs accepted before new submissions are refused
+JOB_MAX_PENDING = int(os.getenv("JOB_MAX_PENDING", "100"))
+# How often a worker refreshes the heartbeat of the jobs it owns
+JOB_HEARTBEAT_SECONDS = float(os.getenv("JOB_HEARTBEAT_SECONDS", "15"))
+# A queued or running job whose heartbeat is older than this is considered abandoned by its worker
+JOB_LEASE_SECONDS = float(os.getenv("JOB_LEASE_SECONDS", "60"))
+
+# handler(request_json, user_id, progress) -> (history_id, rows_generated)
+JobHandler = Callable[[str, Optional[int], Callable[[int, int], None]], Tuple[int, int]]
+
+
+class JobQueueFull(Exception):
+    pass
+
+
+class JobQueue:
+    """
+    Background execution of generation requests.
+
+    Jobs are persisted in the generation_jobs table and run on a bounded pool of worker
+    threads, so long generations no longer hold an HTTP request open and the number of
+    concurrent generations no longer depends on how many clients are waiting. Each job
+    kind has a handler registered by the API; handlers report progress in rows and save
+    their result as a GenerationHistory entry, which the job then points to.
+
+    Several workers (uvicorn processes, hosts) may share the table, so every job records the
+    worker that owns it and a heartbeat the owner refreshes while the job is pending. Only
+    jobs owned by this worker id (left over from a previous process with the same id) or
+    whose lease expired are failed as interrupted.
+    """
+
+    def __init__(self, workers: int = JOB_WORKERS, max_pending: int = JOB_MAX_PENDING,
+                 heartbeat_seconds: float = JOB_HEARTBEAT_SECONDS, lease_seconds: float = JOB_LEASE_SECONDS):
+        self.workers = max(1, workers)
+        self.max_pending = max(1, max_pending)
+        self.heartbeat_seconds = heartbeat_seconds
+        self.lease_seconds = max(lease_seconds, 2 * heartbeat_seconds)
+        self.worker_id = f"{socket.gethostname()}:{os.getpid()}"
+        self._heartbeat_thread: Optional[threading.Thread] = None
+        self._executor = ThreadPoolExecutor(max_workers=self.workers, thread_name_prefix="generation-job")
+        self._handlers: Dict[str, JobHandler] = {}
+        self._lock = threading.Lock()
+        self._pending = 0
+        self.succeeded = 0
+        self.failed = 0
+
+    def register(self, kind: str, handler: JobHandler) -> None:
+        self._handlers[kind] = handler
+
+    def submit(self, user_id: Optional[int], kind: str, request_json: str, rows_requested: int) -> GenerationJob:
+        """Persists a queued job and hands it to the worker pool; raises JobQueueFull when at capacity."""
+        if kind not in self._handlers:
+            raise ValueError(f"No handler registered for job kind '{kind}'")
+        with self._lock:
+            if self._pending >= self.max_pending:
+                raise JobQueueFull(f"{self._pending} jobs are already pending")
+            self._pending += 1
+
+        db = SessionLocal()
+        try:
+            job = GenerationJob(
+                id=uuid.uuid4().hex,
+                user_id=user_id,
+                kind=kind,
+                status=JobStatus.QUEUED.value,
+                request_json=request_json,
+                rows_requested=rows_requested,
+                rows_generated=0,
+                owner=self.worker_id,
+                heartbeat_at=datetime.utcnow()
+            )
+            db.add(job)
+            db.commit()
+            db.refresh(job)
+            db.expunge(job)
+        except Exception:
+            with self._lock:
+                self._pending -= 1
+            db.rollback()
+            raise
+        finally:
+            db.close()
+
+        self._executor.submit(self._run, job.id)
+        print(f"📥 Queued {kind} job {job.id} for {rows_requested} rows")
+        return job
+
+    def get(self, job_id: str, user_id: Optional[int]) -> Optional[GenerationJob]:
+        """Returns the job if it belongs to the user, detached from its session."""
+        db = SessionLocal()
+        try:
+            job = db.query(GenerationJob)\
+                    .filter(GenerationJob.id == job_id, GenerationJob.user_id == user_id)\
+                    .first()
+            if job is not None:
+                db.expunge(job)
+            return job
+        finally:
+            db.close()
+
+    def start(self) -> None:
+        """Fails abandoned jobs and starts the heartbeat thread; called from the app's lifespan hook."""
+        self.recover_interrupted()
+        with self._lock:
+            if self._heartbeat_thread is None:
+                self._heartbeat_thread = threading.Thread(target=self._heartbeat_loop, name="generation-job-heartbeat", daemon=True)
+                self._heartbeat_thread.start()
+
+    def recover_interrupted(self) -> None:
+        """
+        Marks queued or running jobs as failed when they belong to this worker id (a previous
+        process that stopped) or their owner's heartbeat is older than the lease.
+        """
+        self._fail_abandoned(include_own=True)
+
+    def _fail_abandoned(self, include_own: bool) -> None:
+        cutoff = datetime.utcnow() - timedelta(seconds=self.lease_seconds)
+        abandoned = [
+            GenerationJob.heartbeat_at < cutoff,
+            # Jobs queued before owners were recorded
+            and_(GenerationJob.heartbeat_at.is_(None), GenerationJob.created_at < cutoff)
+        ]
+        if include_own:
+            abandoned.append(GenerationJob.owner == self.worker_id)
+        db = SessionLocal()
+        try:
+            interrupted = db.query(GenerationJob)\
+                            .filter(GenerationJob.status.in_([JobStatus.QUEUED.value, JobStatus.RUNNING.value]))\
+                            .filter(or_(*abandoned))\
+                            .update({
+                                GenerationJob.status: JobStatus.FAILED.value,
+                                GenerationJob.error: "Interrupted by a server restart, please submit the job again.",
+                                GenerationJob.finished_at: datetime.utcnow()
+                            }, synchronize_session=False)
+            db.commit()
+            if interrupted:
+                print(f"⚠️  Marked {interrupted} interrupted generation jobs as failed")
+        except Exception as e:
+            print(f"❌ Job recovery failed: {e}")
+            db.rollback()
+        finally:
+            db.close()
+
+    def _heartbeat_loop(self) -> None:
+        while True:
+            time.sleep(self.heartbeat_seconds)
+            with self._lock:
+                pending = self._pending
+            if pending:
+                self._heartbeat()
+            # Jobs of workers that stopped for good are picked up here
+            self._fail_abandoned(include_own=False)
+
+    def _heartbeat(self) -> None:
+        db = SessionLocal()
+        try:
+            db.query(GenerationJob)\
+              .filter(GenerationJob.owner == self.worker_id,
+                      GenerationJob.status.in_([JobStatus.QUEUED.value, JobStatus.RUNNING.value]))\
+              .update({GenerationJob.heartbeat_at: datetime.utcnow()}, synchronize_session=False)
+            db.commit()
+        except Exception as e:
+            print(f"❌ Job heartbeat failed: {e}")
+            db.rollback()
+        finally:
+            db.close()
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "workers": self.workers,
+                "pending": self._pending,
+                "succeeded": self.succeeded,
+                "failed": self.failed,
+            }
+
+    def _run(self, job_id: str) -> None:
+        try:
+            job = self._update(job_id, status=JobStatus.RUNNING.value, started_at=datetime.utcnow())
+            if job is None:
+                return
+            print(f"🚀 Running {job.kind} job {job_id}")
+
+            def progress(rows_generated: int, rows_requested: int) -> None:
+                self._update(job_id, rows_generated=rows_generated)
+
+            history_id, rows_generated = self._handlers[job.kind](job.request_json, job.user_id, progress)
+            self._update(
+                job_id,
+                status=JobStatus.SUCCEEDED.value,
+                history_id=history_id,
+                rows_generated=rows_generated,
+                finished_at=datetime.utcnow()
+            )
+            with self._lock:
+                self.succeeded += 1
+            print(f"✅ Job {job_id} finished with {rows_generated} rows")
+        except Exception as e:
+            print(f"❌ Job {job_id} failed: {e}")
+            self._update(job_id, status=JobStatus.FAILED.value, error=str(e) or type(e).__name__, finished_at=datetime.utcnow())
+            with self._lock:
+                self.failed += 1
+        finally:
+            with self._lock:
+                self._pending -= 1
+
+    def _update(self, job_id: str, **fields) -> Optional[GenerationJob]:
+        db = SessionLocal()
+        try:
+            job = db.query(GenerationJob).filter(GenerationJob.id == job_id).first()
+            if job is None:
+                return None
+            for name, value in fields.items():
+                setattr(job, name, value)
+            db.commit()
+            db.refresh(job)
+            db.expunge(job)
+            return job
+        except Exception as e:
+            print(f"❌ Could not update job {job_id}: {e}")
+            db.rollback()
+            return None
+        finally:
+            db.close()
+
+
+# Global job queue instance
+job_queue = JobQueue()
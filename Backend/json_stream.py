@@ -0,0 +1,188 @@
+import json
+import re
+from typing import Dict, List, Tuple
+
+# Characters that can change the parser state outside of a string literal
+_STRUCTURAL = re.compile(r'["\[\]{}]')
+# Characters that can end (or escape inside) a string literal
+_STRING_SPECIAL = re.compile(r'["\\]')
+_TRAILING_COMMA = re.compile(r',\s*([}\]])')
+# Start of a top-level object whose first value is an array, as in {"data": [...]}
+_WRAPPER_PREFIX = re.compile(r'\{\s*"(?:[^"\\]|\\.)*"\s*:\s*\[')
+# Text that may still grow into _WRAPPER_PREFIX once more of the stream arrives
+_PARTIAL_WRAPPER_PREFIX = re.compile(r'\{\s*(?:"(?:[^"\\]|\\.)*\\?(?:"\s*(?::\s*)?)?)?')
+
+
+class JSONRecordParser:
+    """
+    Incremental parser that pulls complete JSON objects out of a JSON array as text arrives.
+
+    Well-formed records are decoded straight from the buffer with JSONDecoder.raw_decode, so
+    the common case runs at C speed; only a record that fails to decode is scanned
+    structurally (a compiled regex over quotes and brackets) to find where it ends.
+    Anything outside the array - markdown fences, prose, a missing closing bracket - is
+    ignored, and every well-formed record is kept even when the response is truncated or
+    a neighbouring record is malformed.
+    Top-level objects that are not wrapped in an array are accepted as records too, unless
+    they have no scalar fields: an object such as {"data": [...]} or {"records": [...]} wraps
+    the records in its one array, and any other object without scalar fields is dropped.
+    """
+
+    def __init__(self):
+        self._buffer = ""
+        self._pos = 0
+        self._depth = 0
+        self._in_string = False
+        self._in_array = False
+        self._record_start = -1
+        self._record_depth = 0
+        self.salvaged = 0
+        self.dropped = 0
+        self.truncated = False
+        self._decoder = json.JSONDecoder()
+
+    def feed(self, chunk: str) -> List[Dict]:
+        """Consumes the next piece of text and returns the records completed by it."""
+        self._buffer += chunk
+        records: List[Dict] = []
+        buffer = self._buffer
+        pos = self._pos
+
+        while True:
+            if self._record_start == -1:
+                # Between records: decode the next object in one C-level call when it is well formed
+                match = _STRUCTURAL.search(buffer, pos)
+                if match is None:
+                    pos = len(buffer)
+                    break
+                char = match.group()
+                pos = match.end()
+                if char == "{":
+                    top_level = not self._in_array and self._depth == 0
+                    try:
+                        record, pos = self._decoder.raw_decode(buffer, match.start())
+                    except ValueError:
+                        if top_level:
+                            wrapper = _WRAPPER_PREFIX.match(buffer, match.start())
+                            if wrapper is not None:
+                                # Read the wrapped array record by record, so a truncated
+                                # wrapper still keeps its complete records
+                                self._in_array = True
+                                pos = wrapper.end()
+                                continue
+                            if _PARTIAL_WRAPPER_PREFIX.fullmatch(buffer, match.start()):
+                                # Too little has arrived to tell a wrapper from a record
+                                pos = match.start()
+                                break
+                        # Malformed or not fully arrived yet: fall back to scanning this record
+                        self._record_start = match.start()
+                        self._record_depth = self._depth
+                        self._depth += 1
+                        continue
+                    records.extend(self._accept(record, top_level))
+                elif char == "[":
+                    if self._in_array:
+                        # Nested arrays directly inside the outer array are not records
+                        self._depth += 1
+                    else:
+                        self._in_array = True
+                elif char == "]":
+                    if self._depth > 0:
+                        self._depth -= 1
+                    elif self._in_array:
+                        self._in_array = False
+                # Quotes and stray closing braces outside a record are noise
+                continue
+
+            if self._in_string:
+                match = _STRING_SPECIAL.search(buffer, pos)
+                if match is None:
+                    pos = len(buffer)
+                    break
+                if match.group() == "\\":
+                    if match.end() >= len(buffer):
+                        # The escaped character has not arrived yet
+                        pos = match.start()
+                        break
+                    pos = match.end() + 1
+                    continue
+                self._in_string = False
+                pos = match.end()
+                continue
+
+            match = _STRUCTURAL.search(buffer, pos)
+            if match is None:
+                pos = len(buffer)
+                break
+            char = match.group()
+            pos = match.end()
+
+            if char == '"':
+                self._in_string = True
+            elif char in "[{":
+                self._depth += 1
+            else:
+                self._depth -= 1
+                if self._depth == self._record_depth:
+                    record = self._decode(buffer[self._record_start:pos])
+                    if record is not None:
+                        records.extend(self._accept(record, not self._in_array and self._depth == 0))
+                    self._record_start = -1
+
+        # Drop consumed text so the buffer only holds the record in progress
+        keep_from = self._record_start if self._record_start != -1 else pos
+        self._buffer = buffer[keep_from:]
+        self._pos = pos - keep_from
+        if self._record_start != -1:
+            self._record_start = 0
+        return records
+
+    def close(self) -> Tuple[int, int]:
+        """
+        Ends the stream. A record still open at this point counts as dropped, and the
+        stream is marked truncated if it stopped inside a record or an unclosed array.
+        """
+        self.truncated = self._record_start != -1 or self._in_array
+        if self._record_start != -1:
+            self.dropped += 1
+            self._record_start = -1
+        self._buffer = ""
+        self._pos = 0
+        return self.salvaged, self.dropped
+
+    def _decode(self, text: str):
+        try:
+            record = json.loads(text)
+        except ValueError:
+            try:
+                record = json.loads(_TRAILING_COMMA.sub(r'\1', text))
+            except ValueError:
+                self.dropped += 1
+                return None
+        return record
+
+    def _accept(self, record, top_level: bool) -> List[Dict]:
+        """The records a decoded object stands for, counted as salvaged or dropped."""
+        if not isinstance(record, dict):
+            self.dropped += 1
+            return []
+        if top_level and not any(isinstance(value, (str, int, float)) for value in record.values()):
+            # No scalar fields: a wrapper such as {"data": [...]}, not a record
+            arrays = [value for value in record.values() if isinstance(value, list)]
+            if len(arrays) != 1:
+                self.dropped += 1
+                return []
+            wrapped = [item for item in arrays[0] if isinstance(item, dict)]
+            self.salvaged += len(wrapped)
+            self.dropped += len(arrays[0]) - len(wrapped)
+            return wrapped
+        self.salvaged += 1
+        return [record]
+
+
+def parse_records(text: str) -> Tuple[List[Dict], JSONRecordParser]:
+    """Parses a complete response in one go; the returned parser carries salvaged/dropped/truncated."""
+    parser = JSONRecordParser()
+    records = parser.feed(text)
+    parser.close()
+    return records, parser
@@ -0,0 +1,230 @@
+import csv
+import hashlib
+import io
+import json
+import os
+import re
+import threading
+import time
+from abc import ABC, abstractmethod
+from collections import OrderedDict
+from typing import Dict, List, Optional
+
+import google.api_core.exceptions as api_exceptions
+import numpy as np
+
+from rate_limit import estimate_tokens
+from synthesis import ColumnarSampler, columns_to_records
+
+LLM_PROVIDER = os.getenv("LLM_PROVIDER", "gemini").lower()
+GEMINI_MODEL_NAME = os.getenv("GEMINI_MODEL_NAME", "gemini-1.5-flash")
+
+# Offline stub behaviour, for benchmarks and load tests without network access
+LLM_STUB_LATENCY_SECONDS = float(os.getenv("LLM_STUB_LATENCY_SECONDS", "0.0"))
+LLM_STUB_LATENCY_PER_RECORD_SECONDS = float(os.getenv("LLM_STUB_LATENCY_PER_RECORD_SECONDS", "0.0"))
+LLM_STUB_ERROR_RATE = float(os.getenv("LLM_STUB_ERROR_RATE", "0.0"))
+LLM_STUB_TRUNCATION_RATE = float(os.getenv("LLM_STUB_TRUNCATION_RATE", "0.0"))
+LLM_STUB_SEED = int(os.getenv("LLM_STUB_SEED", "0"))
+# Distinct prompts the stub keeps a call count for; the least recently used beyond this start over at 0
+LLM_STUB_MAX_TRACKED_PROMPTS = int(os.getenv("LLM_STUB_MAX_TRACKED_PROMPTS", "10000"))
+
+
+class LLMUsage:
+    """Token counts of one call, mirroring the fields of Gemini's usage_metadata."""
+
+    def __init__(self, prompt_token_count: int, candidates_token_count: int):
+        self.prompt_token_count = prompt_token_count
+        self.candidates_token_count = candidates_token_count
+        self.total_token_count = prompt_token_count + candidates_token_count
+
+
+class LLMResponse:
+    """Provider-neutral response: the generated text plus its token usage."""
+
+    def __init__(self, text: str, usage_metadata: Optional[LLMUsage] = None):
+        self.text = text
+        self.usage_metadata = usage_metadata
+
+
+class LLMProvider(ABC):
+    """
+    Interface of the text-generation backends used by DatasetGenerator.
+    A provider turns a prompt into an object with a .text attribute (and, ideally,
+    .usage_metadata) and raises google.api_core exceptions for API failures.
+    """
+
+    name = "base"
+
+    @abstractmethod
+    def generate_content(self, prompt: str):
+        """Generates a response for the prompt."""
+
+
+class GeminiProvider(LLMProvider):
+    name = "gemini"
+
+    def __init__(self, model_name: str = GEMINI_MODEL_NAME):
+        api_key = os.getenv('GEMINI_API_KEY')
+        if not api_key:
+            raise ValueError("GEMINI_API_KEY not found in environment variables")
+
+        try:
+            # Imported here: the SDK takes longer to import than the rest of the app together
+            import google.generativeai as genai
+            genai.configure(api_key=api_key)
+            self.model = genai.GenerativeModel(model_name)
+            print("✅ Gemini API initialized successfully")
+        except Exception as e:
+            print(f"❌ Failed to initialize Gemini API: {e}")
+            raise
+
+    def generate_content(self, prompt: str):
+        return self.model.generate_content(prompt)
+
+
+class StubProvider(LLMProvider):
+    """
+    Offline provider that answers generator prompts locally with schema-conformant data.
+
+    Batch prompts get exactly the requested number of records, in the output format the
+    prompt asks for (JSON records, columnar JSON or CSV), built from
+    the columns named in the prompt ("Name (type)" lists and "- name (type)" table lines;
+    foreign-key value lists are honoured). Refinement and spec-inference prompts get answers
+    in the format the generator expects. Output is deterministic for a given seed, prompt and
+    call count (counted for the max_tracked_prompts most recently used prompts). Latency, the rate of failed calls (raised as ServiceUnavailable) and the rate
+    of truncated responses are configurable so the batching, parsing and retry paths can be
+    exercised under realistic conditions.
+    """
+
+    name = "stub"
+
+    _GENERIC_COLUMNS = [("id", "integer"), ("name", "string"), ("category", "string"),
+                        ("amount", "float"), ("active", "boolean"), ("created_at", "date")]
+    _TYPE_SPECS = {
+        "integer": {"type": "integer", "min": 1, "max": 1000},
+        "float": {"type": "float", "min": 0.0, "max": 1000.0, "decimals": 2},
+        "boolean": {"type": "boolean"},
+        "date": {"type": "date", "start": "2020-01-01", "end": "2024-12-31"},
+        "datetime": {"type": "datetime", "start": "2020-01-01", "end": "2024-12-31"},
+    }
+
+    def __init__(self, latency: float = LLM_STUB_LATENCY_SECONDS,
+                 latency_per_record: float = LLM_STUB_LATENCY_PER_RECORD_SECONDS,
+                 error_rate: float = LLM_STUB_ERROR_RATE,
+                 truncation_rate: float = LLM_STUB_TRUNCATION_RATE,
+                 seed: int = LLM_STUB_SEED,
+                 max_tracked_prompts: int = LLM_STUB_MAX_TRACKED_PROMPTS):
+        self.latency = latency
+        self.latency_per_record = latency_per_record
+        self.error_rate = error_rate
+        self.truncation_rate = truncation_rate
+        self.seed = seed
+        self.max_tracked_prompts = max(1, max_tracked_prompts)
+        self._calls: "OrderedDict[bytes, int]" = OrderedDict()
+        self._lock = threading.Lock()
+        print(f"✅ Offline stub LLM provider initialized (latency {latency}s, error rate {error_rate}, truncation rate {truncation_rate})")
+
+    def generate_content(self, prompt: str) -> LLMResponse:
+        rng = self._rng_for(prompt)
+        if rng.random() < self.error_rate:
+            time.sleep(self.latency)
+            raise api_exceptions.ServiceUnavailable("Stub provider simulated an outage")
+
+        if "User input:" in prompt and "VAGUE_PROMPT" in prompt:
+            text, records = self._refine(prompt), 0
+        elif "Do NOT generate any rows" in prompt:
+            text, records = self._spec(), 0
+        else:
+            records = self._row_count(prompt)
+            text = self._encode(prompt, self._records(prompt, records, rng))
+            if text and rng.random() < self.truncation_rate:
+                text = text[:int(rng.integers(len(text) // 2, len(text)))]
+
+        time.sleep(self.latency + self.latency_per_record * records)
+        return LLMResponse(text, LLMUsage(estimate_tokens(prompt), estimate_tokens(text)))
+
+    def _rng_for(self, prompt: str) -> np.random.Generator:
+        digest = hashlib.sha256(prompt.encode("utf-8")).digest()
+        with self._lock:
+            call = self._calls.get(digest, 0)
+            self._calls[digest] = call + 1
+            self._calls.move_to_end(digest)
+            if len(self._calls) > self.max_tracked_prompts:
+                self._calls.popitem(last=False)
+        return np.random.default_rng([self.seed, int.from_bytes(digest[:8], "little"), call])
+
+    @staticmethod
+    def _row_count(prompt: str) -> int:
+        match = re.search(r'exactly (\d+) records', prompt) or re.search(r'(\d+) (?:records|rows)', prompt)
+        return int(match.group(1)) if match else 10
+
+    def _columns(self, prompt: str) -> List[tuple]:
+        table_columns = re.findall(r'^\s*-\s*([^\s(][^(\n]*?)\s*\((\w+)\)', prompt, re.MULTILINE)
+        if table_columns:
+            return table_columns
+        listed = re.search(r'columns:(.*?)(?:\.\s|\.$|\n|$)', prompt, re.IGNORECASE | re.DOTALL)
+        if listed:
+            columns = re.findall(r'([^,(]+?)\s*\((\w+)[^)]*\)', listed.group(1))
+            if columns:
+                return [(name.strip(), kind) for name, kind in columns]
+        return self._GENERIC_COLUMNS
+
+    def _records(self, prompt: str, rows: int, rng: np.random.Generator) -> List[Dict]:
+        pools = {
+            field: json.loads(values)
+            for field, values in re.findall(r"The '([^']+)' field must only use these existing values: (\[.*\])", prompt)
+        }
+        specs = []
+        for name, kind in self._columns(prompt):
+            if name in pools and pools[name]:
+                specs.append({"name": name, "type": "category", "values": pools[name]})
+            elif kind.lower() in self._TYPE_SPECS:
+                specs.append({"name": name, **self._TYPE_SPECS[kind.lower()]})
+            else:
+                # Random codes keep string keys from colliding between calls
+                specs.append({"name": name, "type": "code", "prefix": f"{name}_", "min": 0, "max": 10**9})
+        return columns_to_records(ColumnarSampler(specs, seed=int(rng.integers(2**32))).sample_columns(rows))
+
+    @staticmethod
+    def _encode(prompt: str, records: List[Dict]) -> str:
+        """Answers in the output format the prompt asks for (see wire_format.py)."""
+        if '"rows": [[' in prompt:
+            columns = list(records[0]) if records else []
+            return json.dumps({"columns": columns, "rows": [[record[c] for c in columns] for record in records]})
+        if "Return only CSV" in prompt:
+            buffer = io.StringIO()
+            writer = csv.DictWriter(buffer, fieldnames=list(records[0]) if records else [])
+            writer.writeheader()
+            writer.writerows(records)
+            return buffer.getvalue()
+        return json.dumps(records)
+
+    def _refine(self, prompt: str) -> str:
+        user_input = prompt.rsplit("User input:", 1)[1]
+        match = re.search(r'(\d+)', user_input)
+        rows = match.group(1) if match else "100"
+        columns = ", ".join(f"{name} ({kind})" for name, kind in self._GENERIC_COLUMNS)
+        return f"Generate a dataset with {rows} rows and columns: {columns}."
+
+    def _spec(self) -> str:
+        return json.dumps({"columns": [
+            {"name": "id", "type": "id"},
+            {"name": "name", "type": "string", "values": [f"Name {i}" for i in range(1, 51)]},
+            {"name": "category", "type": "category", "values": ["A", "B", "C", "D"], "weights": [4, 3, 2, 1]},
+            {"name": "amount", "type": "float", "min": 1.0, "max": 1000.0, "distribution": "normal", "mean": 250.0, "std": 100.0},
+            {"name": "active", "type": "boolean", "true_probability": 0.7},
+            {"name": "created_at", "type": "date", "start": "2020-01-01", "end": "2024-12-31"},
+        ]})
+
+
+PROVIDERS = {
+    GeminiProvider.name: GeminiProvider,
+    StubProvider.name: StubProvider,
+}
+
+
+def create_provider(name: str = LLM_PROVIDER) -> LLMProvider:
+    """Instantiates the provider selected by name (LLM_PROVIDER): "gemini" or "stub"."""
+    if name not in PROVIDERS:
+        raise ValueError(f"Unknown LLM provider '{name}', expected one of {sorted(PROVIDERS)}")
+    return PROVIDERS[name]()
@@ -1,38 +1,55 @@
-import csv
-import io
+# Imported first so the startup report's import phase covers everything below
+from startup import startup_report  # isort:skip
+
 import json
 import os
+from contextlib import asynccontextmanager
 from datetime import datetime
-from typing import Any, Dict, List, Optional, Union
+from typing import Callable, Dict, List, Optional, Tuple, Union
 
 import google.api_core.exceptions as api_exceptions
-import pandas as pd
+from augmentation import AUGMENT_STREAM_MIN_ROWS, AugmentationEngine
 from auth_new import auth_manager, get_current_user, get_db
-from authlib.integrations.starlette_client import OAuth as OAuthClient
+from circuit_breaker import CIRCUIT_OPEN_ACTION, CircuitOpenError, llm_breaker
 from exports import exporter
-from fastapi import (BackgroundTasks, Depends, FastAPI, HTTPException, Request,
-                     status)
+from fastapi import BackgroundTasks, Depends, FastAPI, HTTPException, status
 from fastapi.middleware.cors import CORSMiddleware
-from fastapi.responses import RedirectResponse, Response
+from fastapi.responses import Response, StreamingResponse
 from fastapi.security import OAuth2PasswordRequestForm
-from generator import DatasetGenerator
+from generator import DatasetGenerator, GenerationOutcome, track_outcome
 from jinja2 import Environment, FileSystemLoader
-from models import GenerationHistory, User
+from jobs import JobQueueFull, job_queue
+from metrics import labelled_iterator, metric_labels, registry
+from models import (GenerationHistory, GenerationJob, SessionLocal, User,
+                    init_db)
+from prompt_cache import prompt_cache
 from pydantic import BaseModel
-from schemas import (AugmentationResponse, AugmentDataRequest,
-                     ExactValueConstraint, ForgotPasswordRequest,
-                     GenerationRequest, GenerationResponse, HistoryEntry,
-                     HistoryResponse, PercentageConstraint, RangeConstraint,
-                     RelationalGenerationRequest, RelationalGenerationResponse,
-                     ResetPasswordRequest, TableSchema, Token, UserCreate,
-                     UserResponse)
-from sendgrid import SendGridAPIClient
-from sendgrid.helpers.mail import Mail
+from rate_limit import rate_limiter
+from result_cache import result_cache
+from schemas import (AugmentationResponse, AugmentDataRequest, CacheMode,
+                     ForgotPasswordRequest, GenerationMode, GenerationRequest,
+                     GenerationResponse, JobCreateRequest, JobKind,
+                     JobResponse, JobStatus, RelationalGenerationRequest,
+                     RelationalGenerationResponse, ResetPasswordRequest,
+                     Token, UserCreate, UserResponse)
+from singleflight import (generation_flight_key, generation_flights,
+                          relational_flight_key)
 from sqlalchemy.orm import Session
-from starlette.config import Config
 from starlette.middleware.sessions import SessionMiddleware
 
-app = FastAPI(title="Synthetic Dataset Generator with GenAI", version="2.0.0")
+startup_report.mark("imports")
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Work that needs the database runs here rather than at import time."""
+    with startup_report.measure("database schema"):
+        init_db()
+    with startup_report.measure("job recovery"):
+        job_queue.start()
+    startup_report.ready()
+    yield
+
+app = FastAPI(title="Synthetic Dataset Generator with GenAI", version="2.0.0", lifespan=lifespan)
 
 # CORS configuration - FIXED
 origins = [
@@ -64,6 +81,14 @@ async def options_token():
 async def options_generate():
     return {"message": "OK"}
 
+@app.options("/generate/stream")
+async def options_generate_stream():
+    return {"message": "OK"}
+
+@app.options("/jobs")
+async def options_jobs():
+    return {"message": "OK"}
+
 generator = DatasetGenerator()
 
 SENDGRID_API_KEY = os.getenv("SENDGRID_API_KEY")
@@ -71,17 +96,6 @@ SENDER_EMAIL = os.getenv("SENDGRID_SENDER_EMAIL")
 
 template_env = Environment(loader=FileSystemLoader("templates"))
 
-config = Config('.env')
-oauth = OAuthClient(config)
-
-oauth.register(
-    name='google',
-    server_metadata_url='https://accounts.google.com/.well-known/openid-configuration',
-    client_kwargs={
-        'scope': 'openid email profile'
-    }
-)
-
 app.add_middleware(SessionMiddleware, secret_key=os.getenv("SECRET_KEY"))
 
 @app.get("/")
@@ -196,6 +210,9 @@ def get_current_user_info(current_user: User = Depends(get_current_user)):
 
 def send_password_reset_email(email: str, reset_url: str):
     try:
+        from sendgrid import SendGridAPIClient
+        from sendgrid.helpers.mail import Mail
+
         template = template_env.get_template("password_reset.html")
         html_content = template.render(reset_url=reset_url, current_year=datetime.now().year)
 
@@ -244,12 +261,97 @@ def reset_password(request: ResetPasswordRequest, db: Session = Depends(get_db))
     auth_manager.update_password(db, user, request.new_password)
     return {"message": "Password updated successfully."}
 
+registry.register_collector("rate_limiter", rate_limiter.stats)
+registry.register_collector("singleflight", generation_flights.stats)
+registry.register_collector("result_cache", result_cache.stats)
+registry.register_collector("prompt_cache", prompt_cache.stats)
+registry.register_collector("job_queue", job_queue.stats)
+registry.register_collector("llm_circuit", llm_breaker.stats)
+
+@app.get("/metrics")
+def get_metrics():
+    """Prometheus text exposition of generation latency, batch sizes, token usage, failures and fallbacks."""
+    return Response(content=registry.render(), media_type="text/plain; version=0.0.4")
+
+@app.get("/status/llm")
+def get_llm_status():
+    """State of the LLM provider's circuit breaker and rate limiter, for operators."""
+    return {
+        "provider": generator.provider_name,
+        "circuit": llm_breaker.stats(),
+        "open_action": CIRCUIT_OPEN_ACTION,
+        "rate_limiter": rate_limiter.stats()
+    }
+
+@app.get("/status/startup")
+def get_startup_status():
+    """Boot time of this worker by phase, and the first-use cost of lazily created subsystems."""
+    return startup_report.summary()
+
 @app.get("/domains")
 def get_domains():
     return {
         "domains": ["E-commerce", "Healthcare", "Finance", "Marketing", "HR", "Custom"]
     }
 
+def circuit_open_error(retry_after: float) -> HTTPException:
+    return HTTPException(
+        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        detail="The AI provider is currently unavailable. Please try again shortly or use the fallback generator.",
+        headers={"Retry-After": str(max(1, int(retry_after)))}
+    )
+
+def reject_while_circuit_open() -> None:
+    """With CIRCUIT_OPEN_ACTION=reject, generation endpoints answer 503 at once while the LLM circuit is open."""
+    if CIRCUIT_OPEN_ACTION != "reject":
+        return
+    try:
+        llm_breaker.check()
+    except CircuitOpenError as e:
+        raise circuit_open_error(e.retry_after)
+
+def refine_request_prompt(request: GenerationRequest) -> Optional[str]:
+    """The Prompt Refinement Layer shared by the generation endpoints."""
+    refined_prompt = None
+    if request.custom_prompt:
+        # We now catch the quota error here and handle it gracefully
+        try:
+            refined_prompt = generator.refine_prompt(request.custom_prompt)
+        except api_exceptions.ResourceExhausted as e:
+            raise HTTPException(
+                status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                detail="Generation failed due to API quota limits. Please try again in a few minutes."
+            )
+        except CircuitOpenError as e:
+            # Built-in domains can still be served by the fallback generator; custom prompts cannot
+            if request.domain == 'Custom' or CIRCUIT_OPEN_ACTION == "reject":
+                raise circuit_open_error(e.retry_after)
+
+    # Fallback if prompt is too vague or could not be refined
+    if refined_prompt is None and request.domain == 'Custom':
+        raise HTTPException(
+            status_code=status.HTTP_400_BAD_REQUEST,
+            detail="Your custom prompt was too vague or could not be refined. Please provide more detail."
+        )
+    return refined_prompt
+
+def run_generation(request: GenerationRequest,
+                   progress: Optional[Callable[[int, int], None]] = None) -> Tuple[List[Dict], str, Optional[str], GenerationOutcome]:
+    """Refines the prompt and generates the data; returns (data, domain name, refined prompt, outcome)."""
+    refined_prompt = refine_request_prompt(request)
+
+    with track_outcome() as outcome:
+        if request.mode == GenerationMode.SEED_SCALE:
+            data = generator.generate_seed_scale_data(request.domain, request.rows, request.constraints, refined_prompt, request.seed)
+            domain_name = request.domain
+        elif request.domain == "Custom":
+            data = generator.generate_custom_data(refined_prompt, request.rows, request.constraints, request.unique_fields, progress, request.seed)
+            domain_name = "Custom"
+        else:
+            data = generator.generate_sample_data(request.domain, request.rows, request.constraints, refined_prompt, request.unique_fields, progress, request.seed)
+            domain_name = request.domain
+    return data, domain_name, refined_prompt, outcome
+
 @app.post("/generate", response_model=GenerationResponse)
 def generate_dataset(
     request: GenerationRequest,
@@ -257,31 +359,35 @@ def generate_dataset(
     db: Session = Depends(get_db)
 ):
     try:
-        # The Prompt Refinement Layer
-        refined_prompt = None
-        if request.custom_prompt:
-            # We now catch the quota error here and handle it gracefully
-            try:
-                refined_prompt = generator.refine_prompt(request.custom_prompt)
-            except api_exceptions.ResourceExhausted as e:
-                raise HTTPException(
-                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                    detail="Generation failed due to API quota limits. Please try again after 24 hours."
+        reject_while_circuit_open()
+        if request.cache_mode == CacheMode.REUSE:
+            cached_data = result_cache.lookup(request)
+            if cached_data is not None:
+                domain_name = request.domain
+                constraints_str = json.dumps([c.dict() for c in request.constraints]) if request.constraints else None
+                history_entry = GenerationHistory(
+                    domain=domain_name,
+                    rows_generated=len(cached_data),
+                    data_json=json.dumps(cached_data),
+                    user_id=current_user.id,
+                    custom_prompt=request.custom_prompt if request.custom_prompt else constraints_str
                 )
-        
-        # Fallback if prompt is too vague or could not be refined
-        if refined_prompt is None and request.domain == 'Custom':
-             raise HTTPException(
-                status_code=status.HTTP_400_BAD_REQUEST,
-                detail="Your custom prompt was too vague or could not be refined. Please provide more detail."
+                db.add(history_entry)
+                db.commit()
+                return GenerationResponse(
+                    success=True,
+                    data=cached_data,
+                    count=len(cached_data),
+                    generated_by=current_user.username,
+                    domain=domain_name,
+                    cached=True
+                )
+
+        # Identical requests already being generated share that run instead of starting another
+        with metric_labels("/generate", request.domain):
+            (data, domain_name, refined_prompt, outcome), coalesced = generation_flights.do(
+                generation_flight_key(request), lambda: run_generation(request)
             )
-            
-        if request.domain == "Custom":
-            data = generator.generate_custom_data(refined_prompt, request.rows, request.constraints)
-            domain_name = "Custom"
-        else:
-            data = generator.generate_sample_data(request.domain, request.rows, request.constraints, refined_prompt)
-            domain_name = request.domain
 
         # Save to history
         constraints_str = json.dumps([c.dict() for c in request.constraints]) if request.constraints else None
@@ -294,14 +400,22 @@ def generate_dataset(
         )
         db.add(history_entry)
         db.commit()
+
+        # Fallback data stands in for a failed generation; caching it would outlive the outage
+        if request.cache_mode == CacheMode.REUSE and not coalesced and not outcome.used_fallback:
+            result_cache.store(request, data, history_entry.id)
         
         return GenerationResponse(
             success=True,
             data=data,
             count=len(data),
             generated_by=current_user.username,
-            domain=domain_name
+            domain=domain_name,
+            coalesced=coalesced,
+            warnings=outcome.warnings
         )
+    except HTTPException as e:
+        raise e
     except Exception as e:
         # A more generic error catch for other issues
         raise HTTPException(
@@ -309,6 +423,75 @@ def generate_dataset(
             detail=f"Generation failed: {str(e)}"
         )
 
+@app.post("/generate/stream")
+def generate_dataset_stream(
+    request: GenerationRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Streaming variant of /generate. Emits newline-delimited JSON events:
+    {"event": "batch", "batch": n, "rows": [...]} as each batch is parsed, followed by a
+    {"event": "progress", ...} line, and a final {"event": "done", ...} once the history
+    entry is saved (or {"event": "error", ...} if generation fails midway).
+    Batches arrive in completion order; "batch" is their position in the dataset.
+    In seed_scale mode the rows are sampled with the request's seed and streamed in fixed-size batches.
+    """
+    reject_while_circuit_open()
+    with metric_labels("/generate/stream", request.domain):
+        refined_prompt = refine_request_prompt(request)
+    domain_name = request.domain
+    user_id = current_user.id
+    history_prompt = refined_prompt if refined_prompt else (
+        json.dumps([c.dict() for c in request.constraints]) if request.constraints else None
+    )
+
+    def event_stream():
+        # Batches are kept only as serialized JSON fragments, reused for the history entry
+        fragments: List[str] = []
+        generated = 0
+        try:
+            if request.mode == GenerationMode.SEED_SCALE:
+                source = generator.stream_seed_scale_data(domain_name, request.rows, request.constraints, refined_prompt, request.seed)
+            else:
+                source = generator.stream_data(domain_name, request.rows, request.constraints, refined_prompt,
+                                               request.unique_fields, request.seed)
+            batches = labelled_iterator(source, "/generate/stream", domain_name)
+            for batch_number, batch_data in batches:
+                batch_data = batch_data[:request.rows - generated]
+                if not batch_data:
+                    continue
+                rows_json = json.dumps(batch_data)
+                fragments.append(rows_json[1:-1])
+                generated += len(batch_data)
+                yield f'{{"event": "batch", "batch": {batch_number}, "count": {len(batch_data)}, "rows": {rows_json}}}\n'
+                yield json.dumps({
+                    "event": "progress",
+                    "generated": generated,
+                    "requested": request.rows,
+                    "percent": round(100 * generated / request.rows, 1)
+                }) + "\n"
+
+            db = SessionLocal()
+            try:
+                history_entry = GenerationHistory(
+                    domain=domain_name,
+                    rows_generated=generated,
+                    data_json="[" + ",".join(fragments) + "]",
+                    user_id=user_id,
+                    custom_prompt=history_prompt
+                )
+                db.add(history_entry)
+                db.commit()
+                history_id = history_entry.id
+            finally:
+                db.close()
+            yield json.dumps({"event": "done", "count": generated, "domain": domain_name, "history_id": history_id}) + "\n"
+        except Exception as e:
+            print(f"❌ Streaming generation failed: {e}")
+            yield json.dumps({"event": "error", "detail": f"Generation failed: {str(e)}", "count": generated}) + "\n"
+
+    return StreamingResponse(event_stream(), media_type="application/x-ndjson")
+
 # NEW ENDPOINT: This endpoint bypasses the AI generation completely
 @app.post("/generate/fallback", response_model=GenerationResponse)
 def generate_fallback_dataset(
@@ -317,7 +500,8 @@ def generate_fallback_dataset(
     db: Session = Depends(get_db)
 ):
     # Retrieve the fallback data directly based on the domain
-    fallback_data = generator._get_fallback_data(request.domain, request.rows)
+    with metric_labels("/generate/fallback", request.domain):
+        fallback_data = generator._get_fallback_data(request.domain, request.rows, request.seed)
     
     # Save the fallback generation to history
     history_entry = GenerationHistory(
@@ -344,8 +528,12 @@ def generate_relational_dataset(
     current_user: User = Depends(get_current_user),
     db: Session = Depends(get_db)
 ):
+    reject_while_circuit_open()
     try:
-        generated_data = generator.generate_relational_data(request)
+        with metric_labels("/generate/relational", "Relational"):
+            generated_data, _ = generation_flights.do(
+                relational_flight_key(request), lambda: generator.generate_relational_data(request)
+            )
         total_records = sum(len(table_data) for table_data in generated_data.values())
         history_entry = GenerationHistory(
             domain="Relational",
@@ -369,6 +557,147 @@ def generate_relational_dataset(
             detail=f"Relational generation failed: {str(e)}"
         )
 
+def run_generation_job(request_json: str, user_id: int, progress: Callable[[int, int], None]) -> Tuple[int, int]:
+    """Job handler for "generate" jobs: generates the dataset and saves it as a history entry."""
+    request = GenerationRequest.parse_raw(request_json)
+    try:
+        data = result_cache.lookup(request) if request.cache_mode == CacheMode.REUSE else None
+        store_in_cache = False
+        if data is not None:
+            domain_name, history_prompt = request.domain, request.custom_prompt
+        else:
+            with metric_labels("/jobs", request.domain):
+                (data, domain_name, history_prompt, outcome), coalesced = generation_flights.do(
+                    generation_flight_key(request), lambda: run_generation(request, progress)
+                )
+            store_in_cache = request.cache_mode == CacheMode.REUSE and not coalesced and not outcome.used_fallback
+    except HTTPException as e:
+        raise ValueError(e.detail)
+
+    constraints_str = json.dumps([c.dict() for c in request.constraints]) if request.constraints else None
+    db = SessionLocal()
+    try:
+        history_entry = GenerationHistory(
+            domain=domain_name,
+            rows_generated=len(data),
+            data_json=json.dumps(data),
+            user_id=user_id,
+            custom_prompt=history_prompt if history_prompt else constraints_str
+        )
+        db.add(history_entry)
+        db.commit()
+        if store_in_cache:
+            result_cache.store(request, data, history_entry.id)
+        return history_entry.id, len(data)
+    finally:
+        db.close()
+
+def run_relational_job(request_json: str, user_id: int, progress: Callable[[int, int], None]) -> Tuple[int, int]:
+    """Job handler for "relational" jobs."""
+    request = RelationalGenerationRequest.parse_raw(request_json)
+    with metric_labels("/jobs", "Relational"):
+        generated_data, _ = generation_flights.do(
+            relational_flight_key(request), lambda: generator.generate_relational_data(request, progress)
+        )
+    total_records = sum(len(table_data) for table_data in generated_data.values())
+    db = SessionLocal()
+    try:
+        history_entry = GenerationHistory(
+            domain="Relational",
+            rows_generated=total_records,
+            data_json=json.dumps(generated_data),
+            user_id=user_id,
+            custom_prompt=request.json()
+        )
+        db.add(history_entry)
+        db.commit()
+        return history_entry.id, total_records
+    finally:
+        db.close()
+
+job_queue.register(JobKind.GENERATE.value, run_generation_job)
+job_queue.register(JobKind.RELATIONAL.value, run_relational_job)
+
+@app.post("/jobs", response_model=JobResponse, status_code=status.HTTP_202_ACCEPTED)
+def create_generation_job(
+    request: JobCreateRequest,
+    current_user: User = Depends(get_current_user)
+):
+    """
+    Queues a generation in the background and returns immediately with the job id.
+    Poll GET /jobs/{id} for status and progress, then fetch GET /jobs/{id}/result.
+    """
+    if request.kind == JobKind.RELATIONAL:
+        payload = request.relational
+        rows_requested = sum(table.rows for table in payload.tables)
+    else:
+        payload = request.generation
+        rows_requested = payload.rows
+    try:
+        return job_queue.submit(current_user.id, request.kind.value, payload.json(), rows_requested)
+    except JobQueueFull:
+        raise HTTPException(
+            status_code=status.HTTP_429_TOO_MANY_REQUESTS,
+            detail="Too many generation jobs are pending. Please try again later."
+        )
+
+@app.get("/jobs", response_model=List[JobResponse])
+def list_generation_jobs(
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    return db.query(GenerationJob)\
+             .filter(GenerationJob.user_id == current_user.id)\
+             .order_by(GenerationJob.created_at.desc())\
+             .limit(20).all()
+
+@app.get("/jobs/{job_id}", response_model=JobResponse)
+def get_generation_job(
+    job_id: str,
+    current_user: User = Depends(get_current_user)
+):
+    job = job_queue.get(job_id, current_user.id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or not owned by user.")
+    return job
+
+@app.get("/jobs/{job_id}/result", response_model=Union[GenerationResponse, RelationalGenerationResponse])
+def get_generation_job_result(
+    job_id: str,
+    current_user: User = Depends(get_current_user),
+    db: Session = Depends(get_db)
+):
+    job = job_queue.get(job_id, current_user.id)
+    if job is None:
+        raise HTTPException(status_code=404, detail="Job not found or not owned by user.")
+    if job.status == JobStatus.FAILED.value:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Job failed: {job.error}")
+    if job.status != JobStatus.SUCCEEDED.value:
+        raise HTTPException(status_code=status.HTTP_409_CONFLICT, detail=f"Job is still {job.status}.")
+
+    history_entry = db.query(GenerationHistory).filter(
+        GenerationHistory.id == job.history_id,
+        GenerationHistory.user_id == current_user.id
+    ).first()
+    if not history_entry:
+        raise HTTPException(status_code=404, detail="The job's history entry no longer exists.")
+    data = json.loads(history_entry.data_json)
+    if job.kind == JobKind.RELATIONAL.value:
+        return RelationalGenerationResponse(
+            success=True,
+            data=data,
+            generated_by=current_user.username,
+            total_tables=len(data),
+            total_records=history_entry.rows_generated
+        )
+    return GenerationResponse(
+        success=True,
+        data=data,
+        count=len(data),
+        generated_by=current_user.username,
+        domain=history_entry.domain
+    )
+
 @app.post("/augment", response_model=AugmentationResponse)
 def augment_dataset(
     request: AugmentDataRequest,
@@ -396,15 +725,39 @@ def augment_dataset(
             raise HTTPException(status_code=400, detail="Either 'data' or 'history_id' must be provided.")
         
         original_count = len(original_data_list)
-        augmented_data = generator.augment_data(original_data_list, request.rules)
+        engine = AugmentationEngine(original_data_list).apply(request.rules)
+        augmented_data = engine.materialize()
         augmented_count = len(augmented_data)
-        return AugmentationResponse(
-            success=True,
-            augmented_data=augmented_data,
-            original_count=original_count,
-            augmented_count=augmented_count,
-            message=f"Dataset augmented from {original_count} to {augmented_count} records."
-        )
+        if augmented_count <= AUGMENT_STREAM_MIN_ROWS:
+            return AugmentationResponse(
+                success=True,
+                augmented_data=list(augmented_data),
+                original_count=original_count,
+                augmented_count=augmented_count,
+                message=f"Dataset augmented from {original_count} to {augmented_count} records.",
+                rule_report=engine.report
+            )
+
+        summary = json.dumps({
+            "success": True,
+            "original_count": original_count,
+            "augmented_count": augmented_count,
+            "message": f"Dataset augmented from {original_count} to {augmented_count} records.",
+            "rule_report": engine.report
+        }, default=str)
+
+        # Same document as AugmentationResponse, but the records are serialized chunk by chunk
+        # from the view instead of being copied into a list first. The first chunk is serialized
+        # here so a failure still becomes a 500 instead of a truncated 200 body.
+        chunks = augmented_data.iter_json()
+        head = [summary[:-1] + ', "augmented_data": ', next(chunks), next(chunks)]
+
+        def response_body():
+            yield from head
+            yield from chunks
+            yield "}"
+
+        return StreamingResponse(response_body(), media_type="application/json")
     except HTTPException as e:
         raise e
     except Exception as e:
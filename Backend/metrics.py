@@ -0,0 +1,169 @@
+import contextvars
+import threading
+from contextlib import contextmanager
+from typing import Callable, Dict, Iterator, List, Optional, Sequence, Tuple
+
+# Latency buckets in seconds, sized for LLM calls that take from well under a second to a minute
+LATENCY_BUCKETS = (0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0, 20.0, 30.0, 60.0, 120.0)
+# Batch size buckets in rows
+BATCH_SIZE_BUCKETS = (1, 5, 10, 25, 50, 75, 100, 150, 200, 300, 500)
+
+# Labels every generation metric is recorded under, set per request by the API
+_labels: contextvars.ContextVar = contextvars.ContextVar("metric_labels", default=("unknown", "unknown"))
+
+
+@contextmanager
+def metric_labels(endpoint: str, domain: Optional[str]):
+    """Records everything measured inside the block under the given endpoint and domain."""
+    token = _labels.set((endpoint, domain or "unknown"))
+    try:
+        yield
+    finally:
+        _labels.reset(token)
+
+
+def current_labels() -> Tuple[str, str]:
+    return _labels.get()
+
+
+def labelled_iterator(iterator: Iterator, endpoint: str, domain: Optional[str]) -> Iterator:
+    """
+    Iterates under the given labels. Streaming responses resume their generator from a new
+    thread for every chunk, so the labels are kept in a context of their own instead.
+    """
+    context = contextvars.copy_context()
+    context.run(_labels.set, (endpoint, domain or "unknown"))
+    while True:
+        try:
+            yield context.run(next, iterator)
+        except StopIteration:
+            return
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str], extra: str = "") -> str:
+    pairs = [f'{name}="{_escape(value)}"' for name, value in zip(names, values)]
+    if extra:
+        pairs.append(extra)
+    return "{" + ",".join(pairs) + "}" if pairs else ""
+
+
+def _escape(value) -> str:
+    return str(value).replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+class Counter:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self._values: Dict[Tuple[str, ...], float] = {}
+        self._lock = threading.Lock()
+
+    def inc(self, amount: float = 1.0, *labelvalues: str) -> None:
+        key = tuple(labelvalues) or current_labels()
+        with self._lock:
+            self._values[key] = self._values.get(key, 0.0) + amount
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} counter"]
+        with self._lock:
+            for key, value in sorted(self._values.items()):
+                lines.append(f"{self.name}{_format_labels(self.labelnames, key)} {value:g}")
+        return lines
+
+
+class Histogram:
+    def __init__(self, name: str, documentation: str, labelnames: Sequence[str], buckets: Sequence[float]):
+        self.name = name
+        self.documentation = documentation
+        self.labelnames = tuple(labelnames)
+        self.buckets = tuple(sorted(buckets))
+        # Per label set: [count per bucket..., count above the last bucket], sum
+        self._values: Dict[Tuple[str, ...], Tuple[List[int], List[float]]] = {}
+        self._lock = threading.Lock()
+
+    def observe(self, value: float, *labelvalues: str) -> None:
+        key = tuple(labelvalues) or current_labels()
+        index = next((i for i, bound in enumerate(self.buckets) if value <= bound), len(self.buckets))
+        with self._lock:
+            counts, total = self._values.setdefault(key, ([0] * (len(self.buckets) + 1), [0.0]))
+            counts[index] += 1
+            total[0] += value
+
+    def render(self) -> List[str]:
+        lines = [f"# HELP {self.name} {self.documentation}", f"# TYPE {self.name} histogram"]
+        with self._lock:
+            for key, (counts, total) in sorted(self._values.items()):
+                cumulative = 0
+                for bound, count in zip(self.buckets, counts):
+                    cumulative += count
+                    labels = _format_labels(self.labelnames, key, 'le="%g"' % bound)
+                    lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                cumulative += counts[-1]
+                labels = _format_labels(self.labelnames, key, 'le="+Inf"')
+                lines.append(f"{self.name}_bucket{labels} {cumulative}")
+                lines.append(f"{self.name}_sum{_format_labels(self.labelnames, key)} {total[0]:g}")
+                lines.append(f"{self.name}_count{_format_labels(self.labelnames, key)} {cumulative}")
+        return lines
+
+
+class MetricsRegistry:
+    """
+    Minimal Prometheus registry rendered in the text exposition format.
+
+    Counters and histograms are labelled by endpoint and domain; unless label values are
+    passed explicitly they come from the metric_labels() block the measurement happens in.
+    Collectors expose the stats() of the caches, rate limiter, singleflight group and job
+    queue as gauges at scrape time.
+    """
+
+    def __init__(self):
+        self._metrics: List = []
+        self._collectors: List[Tuple[str, Callable[[], Dict]]] = []
+
+    def counter(self, name: str, documentation: str, labelnames: Sequence[str] = ("endpoint", "domain")) -> Counter:
+        metric = Counter(name, documentation, labelnames)
+        self._metrics.append(metric)
+        return metric
+
+    def histogram(self, name: str, documentation: str, buckets: Sequence[float],
+                  labelnames: Sequence[str] = ("endpoint", "domain")) -> Histogram:
+        metric = Histogram(name, documentation, labelnames, buckets)
+        self._metrics.append(metric)
+        return metric
+
+    def register_collector(self, prefix: str, stats: Callable[[], Dict]) -> None:
+        self._collectors.append((prefix, stats))
+
+    def render(self) -> str:
+        lines: List[str] = []
+        for metric in self._metrics:
+            lines.extend(metric.render())
+        for prefix, stats in self._collectors:
+            try:
+                values = stats()
+            except Exception as e:
+                print(f"❌ Metrics collector '{prefix}' failed: {e}")
+                continue
+            for key, value in values.items():
+                if isinstance(value, bool) or not isinstance(value, (int, float)):
+                    continue
+                name = f"{prefix}_{key}"
+                lines.append(f"# TYPE {name} gauge")
+                lines.append(f"{name} {value:g}")
+        return "\n".join(lines) + "\n"
+
+
+# Global metrics registry and the generation metrics recorded into it
+registry = MetricsRegistry()
+
+llm_call_seconds = registry.histogram("llm_call_duration_seconds", "Latency of LLM provider calls, one per attempt, excluding rate limiter waits and retry backoff.", LATENCY_BUCKETS)
+rate_limit_wait_seconds = registry.histogram("llm_rate_limit_wait_seconds", "Time LLM call attempts spent queued in the rate limiter before being sent.", LATENCY_BUCKETS)
+batch_rows = registry.histogram("generation_batch_rows", "Rows requested per generation batch.", BATCH_SIZE_BUCKETS)
+llm_tokens = registry.counter("llm_tokens_total", "Tokens reported in the response usage metadata.", ("endpoint", "domain", "kind"))
+llm_errors = registry.counter("llm_call_errors_total", "LLM calls that failed after retries.")
+quota_errors = registry.counter("llm_quota_errors_total", "LLM calls that failed because the API quota was exhausted.")
+parse_failures = registry.counter("generation_parse_failures_total", "Batches whose response was truncated, malformed or empty.")
+salvaged_rows = registry.counter("generation_salvaged_rows_total", "Rows recovered from truncated or partly malformed batches.")
+rows_generated = registry.counter("generation_rows_total", "Rows produced by generation batches.")
+fallbacks = registry.counter("generation_fallbacks_total", "Datasets served from the local fallback generator instead of the LLM.")
@@ -32,6 +32,44 @@ class GenerationHistory(Base):
     user_id = Column(Integer, nullable=True)  # Will link to User.id
     custom_prompt = Column(Text, nullable=True)  # For custom domain prompts
 
+class RefinedPromptCacheEntry(Base):
+    __tablename__ = "refined_prompt_cache"
+
+    id = Column(Integer, primary_key=True, index=True)
+    prompt_key = Column(String(64), unique=True, index=True, nullable=False)  # sha256 of the normalized prompt
+    refined_prompt = Column(Text, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+class ResultCacheEntry(Base):
+    __tablename__ = "result_cache"
+
+    id = Column(Integer, primary_key=True, index=True)
+    request_key = Column(String(64), unique=True, index=True, nullable=False)  # sha256 of the canonical request
+    rows_available = Column(Integer, nullable=False)
+    history_id = Column(Integer, nullable=True)  # Will link to GenerationHistory.id
+    blob_name = Column(String, nullable=True)  # File in the local blob store, None once evicted
+    size_bytes = Column(Integer, default=0, nullable=False)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    last_used_at = Column(DateTime, default=datetime.utcnow, index=True)
+
+class GenerationJob(Base):
+    __tablename__ = "generation_jobs"
+
+    id = Column(String(32), primary_key=True, index=True)  # uuid4 hex, not guessable
+    user_id = Column(Integer, nullable=True, index=True)  # Will link to User.id
+    kind = Column(String, nullable=False)  # "generate" or "relational"
+    status = Column(String, nullable=False, default="queued", index=True)
+    request_json = Column(Text, nullable=False)
+    rows_requested = Column(Integer, nullable=False)
+    rows_generated = Column(Integer, default=0, nullable=False)
+    history_id = Column(Integer, nullable=True)  # Will link to GenerationHistory.id once the job succeeded
+    error = Column(Text, nullable=True)
+    created_at = Column(DateTime, default=datetime.utcnow)
+    started_at = Column(DateTime, nullable=True)
+    finished_at = Column(DateTime, nullable=True)
+    owner = Column(String, nullable=True, index=True)  # Worker ("host:pid") whose queue runs the job
+    heartbeat_at = Column(DateTime, nullable=True)  # Refreshed by the owner while the job is queued or running
+
 # Database setup - UPDATED FOR POSTGRESQL SUPPORT
 DATABASE_URL = os.getenv("DATABASE_URL")
 
@@ -60,9 +98,20 @@ else:
 
 SessionLocal = sessionmaker(autocommit=False, autoflush=False, bind=engine)
 
-# Create all tables
-try:
-    Base.metadata.create_all(bind=engine)
-    print("✅ Database tables created successfully")
-except Exception as e:
-    print(f"❌ Error creating database tables: {e}")
\ No newline at end of file
+_schema_ready = False
+
+
+def init_db() -> None:
+    """
+    Creates all tables. Called from the app's lifespan hook (and by scripts that use the
+    models directly) instead of at import time, so importing the models needs no database.
+    """
+    global _schema_ready
+    if _schema_ready:
+        return
+    try:
+        Base.metadata.create_all(bind=engine)
+        _schema_ready = True
+        print("✅ Database tables created successfully")
+    except Exception as e:
+        print(f"❌ Error creating database tables: {e}")
\ No newline at end of file
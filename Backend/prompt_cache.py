@@ -0,0 +1,129 @@
+import hashlib
+import os
+import re
+import threading
+import time
+from collections import OrderedDict
+from datetime import datetime, timedelta
+from typing import Dict, Optional, Tuple
+
+from sqlalchemy.exc import IntegrityError
+
+from models import RefinedPromptCacheEntry, SessionLocal
+
+PROMPT_CACHE_MAX_ENTRIES = int(os.getenv("PROMPT_CACHE_MAX_ENTRIES", "1024"))
+PROMPT_CACHE_TTL_SECONDS = int(os.getenv("PROMPT_CACHE_TTL_SECONDS", str(7 * 24 * 3600)))
+
+
+class PromptCache:
+    """
+    Two-tier cache for refine_prompt results.
+
+    Tier one is an in-process LRU; tier two is the refined_prompt_cache table in the
+    application database, so refined prompts survive restarts and are shared between
+    workers. Entries older than the TTL are treated as misses and evicted from both tiers.
+    """
+
+    def __init__(self, max_entries: int = PROMPT_CACHE_MAX_ENTRIES, ttl_seconds: int = PROMPT_CACHE_TTL_SECONDS):
+        self.max_entries = max(1, max_entries)
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[str, float]]" = OrderedDict()
+        self._lock = threading.Lock()
+        self.memory_hits = 0
+        self.db_hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def normalize(prompt: str) -> str:
+        return re.sub(r'\s+', ' ', prompt).strip().lower()
+
+    def make_key(self, prompt: str) -> str:
+        return hashlib.sha256(self.normalize(prompt).encode('utf-8')).hexdigest()
+
+    def get(self, prompt: str) -> Optional[str]:
+        key = self.make_key(prompt)
+        now = time.time()
+
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is not None:
+                refined, stored_at = entry
+                if now - stored_at <= self.ttl_seconds:
+                    self._entries.move_to_end(key)
+                    self.memory_hits += 1
+                    return refined
+                del self._entries[key]
+
+        refined, stored_at = self._db_get(key)
+        with self._lock:
+            if refined is None:
+                self.misses += 1
+                return None
+            self.db_hits += 1
+            self._remember(key, refined, stored_at)
+        return refined
+
+    def set(self, prompt: str, refined: str) -> None:
+        key = self.make_key(prompt)
+        with self._lock:
+            self._remember(key, refined, time.time())
+        self._db_set(key, refined)
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "memory_hits": self.memory_hits,
+                "db_hits": self.db_hits,
+                "misses": self.misses,
+                "memory_entries": len(self._entries),
+            }
+
+    def _remember(self, key: str, refined: str, stored_at: float) -> None:
+        self._entries[key] = (refined, stored_at)
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def _db_get(self, key: str) -> Tuple[Optional[str], float]:
+        db = SessionLocal()
+        try:
+            entry = db.query(RefinedPromptCacheEntry).filter(RefinedPromptCacheEntry.prompt_key == key).first()
+            if entry is None:
+                return None, 0.0
+            age = datetime.utcnow() - entry.created_at
+            if age > timedelta(seconds=self.ttl_seconds):
+                db.delete(entry)
+                db.commit()
+                return None, 0.0
+            return entry.refined_prompt, time.time() - age.total_seconds()
+        except Exception as e:
+            print(f"❌ Prompt cache lookup failed: {e}")
+            db.rollback()
+            return None, 0.0
+        finally:
+            db.close()
+
+    def _db_set(self, key: str, refined: str) -> None:
+        db = SessionLocal()
+        try:
+            expired_before = datetime.utcnow() - timedelta(seconds=self.ttl_seconds)
+            db.query(RefinedPromptCacheEntry).filter(RefinedPromptCacheEntry.created_at < expired_before).delete()
+            entry = db.query(RefinedPromptCacheEntry).filter(RefinedPromptCacheEntry.prompt_key == key).first()
+            if entry is None:
+                db.add(RefinedPromptCacheEntry(prompt_key=key, refined_prompt=refined))
+            else:
+                entry.refined_prompt = refined
+                entry.created_at = datetime.utcnow()
+            db.commit()
+        except IntegrityError:
+            # Another worker stored the same prompt first
+            db.rollback()
+        except Exception as e:
+            print(f"❌ Prompt cache store failed: {e}")
+            db.rollback()
+        finally:
+            db.close()
+
+
+# Global prompt cache instance
+prompt_cache = PromptCache()
@@ -0,0 +1,174 @@
+import os
+import random
+import threading
+import time
+from typing import Any, Callable, Dict
+
+import google.api_core.exceptions as api_exceptions
+
+from metrics import rate_limit_wait_seconds
+
+GEMINI_REQUESTS_PER_MINUTE = int(os.getenv("GEMINI_REQUESTS_PER_MINUTE", "15"))
+GEMINI_TOKENS_PER_MINUTE = int(os.getenv("GEMINI_TOKENS_PER_MINUTE", "1000000"))
+GEMINI_MAX_RETRIES = int(os.getenv("GEMINI_MAX_RETRIES", "4"))
+GEMINI_BACKOFF_BASE_SECONDS = float(os.getenv("GEMINI_BACKOFF_BASE_SECONDS", "1.0"))
+GEMINI_BACKOFF_MAX_SECONDS = float(os.getenv("GEMINI_BACKOFF_MAX_SECONDS", "32.0"))
+
+# Errors worth retrying: quota exhaustion and transient server-side failures
+RETRYABLE_ERRORS = (
+    api_exceptions.ResourceExhausted,
+    api_exceptions.TooManyRequests,
+    api_exceptions.ServiceUnavailable,
+    api_exceptions.InternalServerError,
+    api_exceptions.DeadlineExceeded,
+)
+
+
+def estimate_tokens(text: str) -> int:
+    """Rough token count for budgeting; Gemini averages about four characters per token."""
+    return max(1, len(text) // 4)
+
+
+class TokenBucket:
+    """
+    Continuously refilling budget of per_minute units, holding at most one minute's worth.
+    A per_minute of 0 or less disables the bucket.
+    """
+
+    def __init__(self, per_minute: int):
+        self.enabled = per_minute > 0
+        self.capacity = float(max(per_minute, 1))
+        self.rate = self.capacity / 60.0
+        self.available = self.capacity
+        self.updated = time.monotonic()
+
+    def wait_time(self, amount: float, now: float) -> float:
+        """Seconds until amount units are available (requests larger than the bucket wait for a full bucket)."""
+        if not self.enabled:
+            return 0.0
+        self._refill(now)
+        amount = min(amount, self.capacity)
+        return 0.0 if self.available >= amount else (amount - self.available) / self.rate
+
+    def take(self, amount: float, now: float) -> None:
+        """Spends amount units; the balance may go negative, which delays later callers."""
+        if not self.enabled:
+            return
+        self._refill(now)
+        self.available -= amount
+
+    def _refill(self, now: float) -> None:
+        self.available = min(self.capacity, self.available + (now - self.updated) * self.rate)
+        self.updated = now
+
+
+class RateLimiter:
+    """
+    Shared quota-aware gate for every Gemini call.
+
+    Each call needs one unit from the requests-per-minute bucket and its estimated prompt
+    tokens from the tokens-per-minute bucket; the real token usage reported in the response
+    metadata is charged afterwards. Waiting callers are served strictly in arrival order
+    (ticket queue), so concurrent requests share the budget fairly instead of racing for it.
+    Retryable errors are retried with full-jitter exponential backoff, and a quota error
+    pauses the whole limiter so every caller backs off together.
+    """
+
+    def __init__(self, requests_per_minute: int = GEMINI_REQUESTS_PER_MINUTE,
+                 tokens_per_minute: int = GEMINI_TOKENS_PER_MINUTE,
+                 max_retries: int = GEMINI_MAX_RETRIES,
+                 backoff_base: float = GEMINI_BACKOFF_BASE_SECONDS,
+                 backoff_max: float = GEMINI_BACKOFF_MAX_SECONDS):
+        self.requests = TokenBucket(requests_per_minute)
+        self.tokens = TokenBucket(tokens_per_minute)
+        self.max_retries = max(0, max_retries)
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self._cond = threading.Condition()
+        self._next_ticket = 0
+        self._serving = 0
+        self._paused_until = 0.0
+        self.calls = 0
+        self.retries = 0
+        self.failures = 0
+        self.tokens_used = 0
+        self.wait_seconds = 0.0
+
+    def call(self, fn: Callable[[str], Any], prompt: str) -> Any:
+        """Runs fn(prompt) within the quota, retrying retryable errors; re-raises once retries are exhausted."""
+        estimate = estimate_tokens(prompt)
+        for attempt in range(self.max_retries + 1):
+            self.acquire(estimate)
+            try:
+                response = fn(prompt)
+            except RETRYABLE_ERRORS as e:
+                if attempt == self.max_retries:
+                    with self._cond:
+                        self.failures += 1
+                    raise
+                delay = random.uniform(0, min(self.backoff_max, self.backoff_base * 2 ** attempt))
+                print(f"⚠️  Gemini call failed with {type(e).__name__}, retry {attempt + 1}/{self.max_retries} in {delay:.1f}s")
+                with self._cond:
+                    self.retries += 1
+                if isinstance(e, (api_exceptions.ResourceExhausted, api_exceptions.TooManyRequests)):
+                    # Out of quota: hold back every caller, not just this one
+                    self._pause(delay)
+                else:
+                    time.sleep(delay)
+                continue
+            self._charge(estimate, response)
+            return response
+
+    def acquire(self, estimated_tokens: int) -> None:
+        """Blocks until it is this caller's turn and the buckets can cover one request of estimated_tokens."""
+        started = time.monotonic()
+        with self._cond:
+            ticket = self._next_ticket
+            self._next_ticket += 1
+            while True:
+                if ticket != self._serving:
+                    self._cond.wait()
+                    continue
+                now = time.monotonic()
+                wait = max(self._paused_until - now,
+                           self.requests.wait_time(1, now),
+                           self.tokens.wait_time(estimated_tokens, now))
+                if wait <= 0:
+                    self.requests.take(1, now)
+                    self.tokens.take(estimated_tokens, now)
+                    self._serving += 1
+                    self.calls += 1
+                    self.wait_seconds += now - started
+                    rate_limit_wait_seconds.observe(now - started)
+                    self._cond.notify_all()
+                    return
+                self._cond.wait(wait)
+
+    def stats(self) -> Dict[str, Any]:
+        with self._cond:
+            return {
+                "calls": self.calls,
+                "retries": self.retries,
+                "failures": self.failures,
+                "tokens_used": self.tokens_used,
+                "queued": self._next_ticket - self._serving,
+                "wait_seconds": round(self.wait_seconds, 3),
+            }
+
+    def _charge(self, estimate: int, response: Any) -> None:
+        """Charges the difference between the estimate and the usage reported by the response."""
+        usage = getattr(response, "usage_metadata", None)
+        used = getattr(usage, "total_token_count", 0) or estimate
+        with self._cond:
+            self.tokens_used += used
+            if used > estimate:
+                self.tokens.take(used - estimate, time.monotonic())
+
+    def _pause(self, delay: float) -> None:
+        with self._cond:
+            self._paused_until = max(self._paused_until, time.monotonic() + delay)
+            self._cond.notify_all()
+
+
+# Global rate limiter shared by every Gemini call in the process
+rate_limiter = RateLimiter()
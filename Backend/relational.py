@@ -0,0 +1,125 @@
+from datetime import date, timedelta
+from typing import Dict, List, Optional
+
+import numpy as np
+
+from schemas import ColumnDataType, ColumnSchema, TableSchema
+from synthesis import ColumnarSampler
+
+
+def table_levels(tables: List[TableSchema]) -> List[List[TableSchema]]:
+    """
+    Groups tables into dependency levels: every table comes after the tables its foreign keys
+    reference, and tables in the same level do not depend on each other (Kahn's algorithm,
+    stable with respect to the request order). References to tables outside the request are
+    ignored; tables caught in a cycle form a final level in request order.
+    """
+    by_name = {table.name: table for table in tables}
+    parents = {
+        table.name: {
+            col.references_table for col in table.columns
+            if col.is_foreign_key and col.references_table in by_name and col.references_table != table.name
+        }
+        for table in tables
+    }
+
+    levels: List[List[TableSchema]] = []
+    placed = set()
+    pending = [table.name for table in tables]
+    while pending:
+        ready = [name for name in pending if parents[name] <= placed]
+        if not ready:
+            print(f"⚠️  Foreign-key cycle between tables {pending}, generating them in request order")
+            ready = pending
+        levels.append([by_name[name] for name in ready])
+        placed.update(ready)
+        pending = [name for name in pending if name not in placed]
+    return levels
+
+
+class RelationalSynthesizer:
+    """
+    Vectorized fallback generator for multi-table requests.
+
+    Tables are generated one at a time in foreign-key order (see table_levels): primary-key
+    columns are laid out first, then every foreign-key column is drawn from the referenced table's key array, so each
+    child key exists in its parent. Unique foreign keys are drawn without replacement.
+    """
+
+    def __init__(self, seed: Optional[int] = None):
+        self.rng = np.random.default_rng(seed)
+
+    def table_columns(self, table: TableSchema, generated: Dict[str, Dict[str, np.ndarray]]) -> Dict[str, np.ndarray]:
+        """Generates one table; generated maps already generated tables to their column arrays."""
+        rows = table.rows
+        plain = [
+            col for col in table.columns
+            if not col.is_primary_key and not col.is_foreign_key and not (col.unique and col.data_type != ColumnDataType.STRING)
+        ]
+        sampled = ColumnarSampler([self._column_spec(col) for col in plain],
+                                  seed=int(self.rng.integers(2**32))).sample_columns(rows)
+
+        columns: Dict[str, np.ndarray] = {}
+        for col in table.columns:
+            if col.is_primary_key:
+                columns[col.name] = self._primary_keys(table, col)
+            elif col.is_foreign_key:
+                columns[col.name] = self._foreign_keys(table, col, generated)
+            elif col.name in sampled:
+                columns[col.name] = sampled[col.name]
+            else:
+                columns[col.name] = self._unique_column(col, rows)
+        return columns
+
+    @staticmethod
+    def _primary_keys(table: TableSchema, col: ColumnSchema) -> np.ndarray:
+        if col.data_type == ColumnDataType.INTEGER:
+            return np.arange(1, table.rows + 1)
+        prefix = f"{table.name.upper()}_{col.name.upper()}_"
+        return np.array([f"{prefix}{i}" for i in range(1, table.rows + 1)], dtype=object)
+
+    def _foreign_keys(self, table: TableSchema, col: ColumnSchema, generated: Dict[str, Dict[str, np.ndarray]]) -> np.ndarray:
+        rows = table.rows
+        parent_keys = generated.get(col.references_table, {}).get(col.references_column)
+        if parent_keys is None:
+            # The referenced table or column is not part of this request: keep the legacy key format
+            print(f"⚠️  {table.name}.{col.name} references {col.references_table}.{col.references_column}, which is not generated; using synthetic keys")
+            prefix = f"{col.references_table.upper()}_{col.references_column.upper()}_"
+            return np.array([f"{prefix}{n}" for n in self.rng.integers(1, rows + 1, rows).tolist()], dtype=object)
+
+        if col.unique:
+            if rows <= len(parent_keys):
+                return parent_keys[self.rng.permutation(len(parent_keys))[:rows]]
+            print(f"⚠️  {table.name}.{col.name} is unique but {col.references_table} only has {len(parent_keys)} keys for {rows} rows; keys will repeat")
+        return parent_keys[self.rng.integers(0, len(parent_keys), rows)]
+
+    def _unique_column(self, col: ColumnSchema, rows: int) -> np.ndarray:
+        """Draws a non-key unique column as a random permutation of distinct values."""
+        order = self.rng.permutation(rows)
+        if col.data_type == ColumnDataType.INTEGER:
+            return order + 1
+        if col.data_type == ColumnDataType.FLOAT:
+            # Distinct integer parts keep the values distinct after truncating to two decimals
+            return order + 1 + np.floor(self.rng.random(rows) * 100) / 100
+        if col.data_type in (ColumnDataType.DATE, ColumnDataType.DATETIME):
+            unit = "D" if col.data_type == ColumnDataType.DATE else "s"
+            end = np.datetime64(date.today().isoformat(), unit)
+            return np.datetime_as_string(end - order.astype(f"timedelta64[{unit}]"), unit=unit).astype(object)
+        # Booleans cannot be unique beyond two rows
+        return self.rng.random(rows) < 0.5
+
+    @staticmethod
+    def _column_spec(col: ColumnSchema) -> Dict:
+        if col.data_type == ColumnDataType.INTEGER:
+            return {"name": col.name, "type": "integer", "min": 1, "max": 100}
+        if col.data_type == ColumnDataType.FLOAT:
+            return {"name": col.name, "type": "float", "min": 1.0, "max": 100.0, "decimals": 2}
+        if col.data_type == ColumnDataType.BOOLEAN:
+            return {"name": col.name, "type": "boolean"}
+        if col.data_type in (ColumnDataType.DATE, ColumnDataType.DATETIME):
+            end = date.today()
+            start = end - timedelta(days=5 * 365)
+            kind = "date" if col.data_type == ColumnDataType.DATE else "datetime"
+            return {"name": col.name, "type": kind, "start": start.isoformat(), "end": end.isoformat()}
+        # Strings are "<column>_<row>", which is unique by construction
+        return {"name": col.name, "type": "string"}
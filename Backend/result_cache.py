@@ -0,0 +1,208 @@
+import hashlib
+import json
+import os
+import threading
+from datetime import datetime
+from typing import Dict, List, Optional
+
+from sqlalchemy import func
+from sqlalchemy.exc import IntegrityError
+
+from constraints import ConstraintEnforcer
+from models import GenerationHistory, ResultCacheEntry, SessionLocal
+from schemas import GenerationRequest
+
+RESULT_CACHE_DIR = os.getenv("RESULT_CACHE_DIR", "./result_cache")
+RESULT_CACHE_MAX_BYTES = int(os.getenv("RESULT_CACHE_MAX_BYTES", str(256 * 1024 * 1024)))
+
+
+def canonical_request_key(request: GenerationRequest) -> str:
+    """
+    Content address of a generation request: sha256 over a canonical JSON encoding of
+    the domain, the whitespace-normalized custom prompt, the constraints (order-insensitive),
+    the generation mode and the seed. The row count is left out so a larger cached dataset
+    can serve smaller requests.
+    """
+    constraints = sorted(
+        json.dumps(c.dict(), sort_keys=True, default=str) for c in (request.constraints or [])
+    )
+    canonical = {
+        "domain": request.domain,
+        "custom_prompt": " ".join(request.custom_prompt.split()) if request.custom_prompt else None,
+        "constraints": constraints,
+        "mode": request.mode.value,
+        "seed": request.seed,
+    }
+    if request.unique_fields:
+        # Only added when set, so keys of requests without it stay the same
+        canonical["unique_fields"] = sorted(set(request.unique_fields))
+    encoded = json.dumps(canonical, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(encoded.encode("utf-8")).hexdigest()
+
+
+class ResultCache:
+    """
+    Opt-in cache of generated datasets for identical requests.
+
+    The index lives in the result_cache table. Payloads are kept as JSON files in a local
+    blob store bounded to max_bytes (least recently used blobs are evicted first); an entry
+    whose blob was evicted can still be served from the GenerationHistory row it was saved with.
+    """
+
+    def __init__(self, directory: str = RESULT_CACHE_DIR, max_bytes: int = RESULT_CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self._lock = threading.Lock()
+        self.hits = 0
+        self.misses = 0
+
+    def lookup(self, request: GenerationRequest) -> Optional[List[Dict]]:
+        """
+        Returns the first request.rows records of a cached dataset, or None on a miss. A slice of
+        a larger dataset has the request's constraints enforced again, since exact percentages
+        of the whole dataset do not carry over to its first rows.
+        """
+        key = canonical_request_key(request)
+        db = SessionLocal()
+        try:
+            entry = db.query(ResultCacheEntry).filter(ResultCacheEntry.request_key == key).first()
+            if entry is None or entry.rows_available < request.rows:
+                self._count(hit=False)
+                return None
+
+            data = self._read_blob(entry.blob_name) if entry.blob_name else None
+            if data is None and entry.history_id is not None:
+                history_entry = db.query(GenerationHistory).filter(GenerationHistory.id == entry.history_id).first()
+                if history_entry is not None:
+                    data = json.loads(history_entry.data_json)
+
+            if not isinstance(data, list) or len(data) < request.rows:
+                print(f"⚠️  Result cache entry {key[:12]} is no longer readable, dropping it")
+                self._delete_blob(entry.blob_name)
+                db.delete(entry)
+                db.commit()
+                self._count(hit=False)
+                return None
+
+            entry.last_used_at = datetime.utcnow()
+            db.commit()
+            self._count(hit=True)
+            print(f"✅ Result cache hit {key[:12]}: serving {request.rows} of {entry.rows_available} cached records")
+            if len(data) > request.rows and request.constraints:
+                return ConstraintEnforcer(request.constraints, request.seed).enforce(data[:request.rows])
+            return data[:request.rows]
+        except Exception as e:
+            print(f"❌ Result cache lookup failed: {e}")
+            db.rollback()
+            return None
+        finally:
+            db.close()
+
+    def store(self, request: GenerationRequest, data: List[Dict], history_id: Optional[int] = None) -> None:
+        """Caches data for the request unless a dataset with at least as many rows is already cached."""
+        if not data:
+            return
+        key = canonical_request_key(request)
+        payload = json.dumps(data, default=str)
+        db = SessionLocal()
+        try:
+            entry = db.query(ResultCacheEntry).filter(ResultCacheEntry.request_key == key).first()
+            if entry is not None and entry.rows_available >= len(data):
+                return
+
+            blob_name = None
+            size_bytes = 0
+            if len(payload) <= self.max_bytes:
+                blob_name = f"{key}.json"
+                size_bytes = self._write_blob(blob_name, payload)
+
+            if entry is None:
+                entry = ResultCacheEntry(request_key=key)
+                db.add(entry)
+            entry.rows_available = len(data)
+            entry.history_id = history_id
+            entry.blob_name = blob_name
+            entry.size_bytes = size_bytes
+            entry.last_used_at = datetime.utcnow()
+            db.commit()
+            print(f"💾 Cached {len(data)} records for request {key[:12]} ({size_bytes} bytes)")
+            self._evict(db)
+        except IntegrityError:
+            # A concurrent identical request stored its result first
+            db.rollback()
+        except Exception as e:
+            print(f"❌ Result cache store failed: {e}")
+            db.rollback()
+        finally:
+            db.close()
+
+    def stats(self) -> Dict[str, int]:
+        db = SessionLocal()
+        try:
+            entries, stored_bytes = db.query(
+                func.count(ResultCacheEntry.id), func.coalesce(func.sum(ResultCacheEntry.size_bytes), 0)
+            ).one()
+        finally:
+            db.close()
+        with self._lock:
+            return {"hits": self.hits, "misses": self.misses, "entries": entries, "stored_bytes": int(stored_bytes)}
+
+    def _evict(self, db) -> None:
+        """Drops least recently used blobs until the blob store fits in max_bytes."""
+        total = db.query(func.coalesce(func.sum(ResultCacheEntry.size_bytes), 0)).scalar() or 0
+        if total <= self.max_bytes:
+            return
+        candidates = db.query(ResultCacheEntry)\
+                       .filter(ResultCacheEntry.blob_name.isnot(None))\
+                       .order_by(ResultCacheEntry.last_used_at.asc())\
+                       .all()
+        for entry in candidates:
+            if total <= self.max_bytes:
+                break
+            self._delete_blob(entry.blob_name)
+            total -= entry.size_bytes
+            print(f"🧹 Evicted cached result {entry.request_key[:12]} ({entry.size_bytes} bytes)")
+            if entry.history_id is None:
+                db.delete(entry)
+            else:
+                entry.blob_name = None
+                entry.size_bytes = 0
+        db.commit()
+
+    def _count(self, hit: bool) -> None:
+        with self._lock:
+            if hit:
+                self.hits += 1
+            else:
+                self.misses += 1
+
+    def _blob_path(self, blob_name: str) -> str:
+        return os.path.join(self.directory, blob_name)
+
+    def _write_blob(self, blob_name: str, payload: str) -> int:
+        os.makedirs(self.directory, exist_ok=True)
+        path = self._blob_path(blob_name)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        with open(tmp_path, "w", encoding="utf-8") as f:
+            f.write(payload)
+        os.replace(tmp_path, path)
+        return os.path.getsize(path)
+
+    def _read_blob(self, blob_name: str) -> Optional[List[Dict]]:
+        try:
+            with open(self._blob_path(blob_name), "r", encoding="utf-8") as f:
+                return json.load(f)
+        except (OSError, ValueError):
+            return None
+
+    def _delete_blob(self, blob_name: Optional[str]) -> None:
+        if not blob_name:
+            return
+        try:
+            os.remove(self._blob_path(blob_name))
+        except OSError:
+            pass
+
+
+# Global result cache instance
+result_cache = ResultCache()
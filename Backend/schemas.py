@@ -108,6 +108,14 @@ class RelationalGenerationRequest(BaseModel):
             raise ValueError('All table names must be unique.')
         return v
 
+class GenerationMode(str, Enum):
+    LLM = "llm"
+    SEED_SCALE = "seed_scale"
+
+class CacheMode(str, Enum):
+    OFF = "off"
+    REUSE = "reuse"
+
 class GenerationRequest(BaseModel):
     domain: str = Field(..., description="The domain for which to generate data (e.g., 'E-commerce', 'Custom').")
     rows: int = Field(5, ge=1, description="The number of records to generate.")
@@ -115,6 +123,18 @@ class GenerationRequest(BaseModel):
     constraints: Optional[List[Union[PercentageConstraint, ExactValueConstraint, RangeConstraint]]] = Field(
         None, description="A list of granular constraints to apply to the generated data."
     )
+    mode: GenerationMode = Field(
+        GenerationMode.LLM, description="'llm' generates every row with the AI; 'seed_scale' asks the AI once for a column spec and samples all rows locally."
+    )
+    seed: Optional[int] = Field(
+        None, description="Optional random seed for reproducible locally sampled data (seed_scale mode and fallback generation)."
+    )
+    cache_mode: CacheMode = Field(
+        CacheMode.OFF, description="'reuse' serves a previously generated dataset (or a prefix of one) for an identical request instead of calling the AI again."
+    )
+    unique_fields: Optional[List[str]] = Field(
+        None, description="Fields whose values must not repeat across the generated records (e.g. identifiers)."
+    )
 
     @validator('custom_prompt')
     def custom_prompt_required_for_custom_domain(cls, v, values):
@@ -122,40 +142,88 @@ class GenerationRequest(BaseModel):
             raise ValueError('custom_prompt is required for the "Custom" domain')
         return v
 
+class JobKind(str, Enum):
+    GENERATE = "generate"
+    RELATIONAL = "relational"
+
+class JobStatus(str, Enum):
+    QUEUED = "queued"
+    RUNNING = "running"
+    SUCCEEDED = "succeeded"
+    FAILED = "failed"
+
+class JobCreateRequest(BaseModel):
+    kind: JobKind = Field(JobKind.GENERATE, description="'generate' runs a GenerationRequest, 'relational' a RelationalGenerationRequest.")
+    generation: Optional[GenerationRequest] = Field(None, description="The request for a 'generate' job.")
+    relational: Optional[RelationalGenerationRequest] = Field(None, description="The request for a 'relational' job.")
+
+    @validator('relational', always=True)
+    def request_matches_kind(cls, v, values):
+        if values.get('kind') == JobKind.GENERATE and values.get('generation') is None:
+            raise ValueError('generation is required for "generate" jobs')
+        if values.get('kind') == JobKind.RELATIONAL and v is None:
+            raise ValueError('relational is required for "relational" jobs')
+        return v
+
+class JobResponse(BaseModel):
+    id: str
+    kind: JobKind
+    status: JobStatus
+    rows_requested: int
+    rows_generated: int
+    history_id: Optional[int] = None
+    error: Optional[str] = None
+    created_at: datetime
+    started_at: Optional[datetime] = None
+    finished_at: Optional[datetime] = None
+
+    class Config:
+        orm_mode = True
+
 class AugmentationStrategy(str, Enum):
     TARGET_PERCENTAGE = "target_percentage"
     BALANCE_CATEGORIES = "balance_categories"
     OVERSAMPLE_VALUE = "oversample_value"
+    SMOTE = "smote"
 
 class AugmentationRule(BaseModel):
     field: str = Field(..., description="The name of the field to which the rule applies.")
     strategy: AugmentationStrategy = Field(..., description="The augmentation strategy to use.")
     value: Optional[Any] = Field(
-        None, description="The specific value within the field to target (relevant for TARGET_PERCENTAGE, OVERSAMPLE_VALUE)."
+        None, description="The specific value within the field to target (relevant for TARGET_PERCENTAGE, OVERSAMPLE_VALUE, SMOTE)."
     )
     target_percentage: Optional[float] = Field(
         None, ge=0.0, le=100.0, description="The desired percentage for the specified value (for TARGET_PERCENTAGE)."
     )
     target_count: Optional[int] = Field(
-        None, ge=0, description="The desired exact count for the specified value (for OVERSAMPLE_VALUE)."
+        None, ge=0, description="The desired exact count for the specified value (for OVERSAMPLE_VALUE, SMOTE)."
+    )
+    k_neighbors: Optional[int] = Field(
+        None, ge=1, le=50, description=(
+            "Nearest neighbors a synthesized record may be interpolated towards (for SMOTE, default 5). "
+            "The neighbor search is exact for small classes; for classes of several thousand records it is "
+            "approximate and finds about 65-85% of the true nearest neighbors, fewer the more numeric fields "
+            "there are, using slightly farther records for the rest."
+        )
     )
 
-    @validator('target_percentage')
+    @validator('target_percentage', always=True)
     def target_percentage_required_for_percentage_strategy(cls, v, values):
         if values.get('strategy') == AugmentationStrategy.TARGET_PERCENTAGE and v is None:
             raise ValueError('target_percentage is required for TARGET_PERCENTAGE strategy')
         return v
     
-    @validator('target_count')
+    @validator('target_count', always=True)
     def target_count_required_for_oversample_strategy(cls, v, values):
-        if values.get('strategy') == AugmentationStrategy.OVERSAMPLE_VALUE and v is None:
-            raise ValueError('target_count is required for OVERSAMPLE_VALUE strategy')
+        if values.get('strategy') in [AugmentationStrategy.OVERSAMPLE_VALUE, AugmentationStrategy.SMOTE] and v is None:
+            raise ValueError('target_count is required for OVERSAMPLE_VALUE and SMOTE strategies')
         return v
 
-    @validator('value')
+    @validator('value', always=True)
     def value_required_for_specific_strategies(cls, v, values):
-        if values.get('strategy') in [AugmentationStrategy.TARGET_PERCENTAGE, AugmentationStrategy.OVERSAMPLE_VALUE] and v is None:
-            raise ValueError('value is required for TARGET_PERCENTAGE and OVERSAMPLE_VALUE strategies')
+        if values.get('strategy') in [AugmentationStrategy.TARGET_PERCENTAGE, AugmentationStrategy.OVERSAMPLE_VALUE,
+                                      AugmentationStrategy.SMOTE] and v is None:
+            raise ValueError('value is required for TARGET_PERCENTAGE, OVERSAMPLE_VALUE and SMOTE strategies')
         return v
 
 class AugmentDataRequest(BaseModel):
@@ -222,6 +290,9 @@ class GenerationResponse(BaseModel):
     count: int
     generated_by: str
     domain: str
+    cached: bool = False
+    coalesced: bool = False
+    warnings: List[str] = Field(default_factory=list, description="Why the dataset may differ from the request, e.g. fewer rows than requested.")
 
 class HistoryEntry(BaseModel):
     id: int
@@ -251,3 +322,6 @@ class AugmentationResponse(BaseModel):
     original_count: int
     augmented_count: int
     message: str
+    rule_report: List[Dict[str, Any]] = Field(
+        default_factory=list, description="Per rule: the target, what the rebalanced dataset achieved, and the difference."
+    )
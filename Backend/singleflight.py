@@ -0,0 +1,94 @@
+import hashlib
+import json
+import threading
+from typing import Any, Callable, Dict, Optional, Tuple
+
+from result_cache import canonical_request_key
+from schemas import GenerationRequest, RelationalGenerationRequest
+
+
+def generation_flight_key(request: GenerationRequest) -> str:
+    """
+    Identity of a /generate run: the result cache's content address plus the row count,
+    which that address leaves out.
+    """
+    canonical = {
+        "request": canonical_request_key(request),
+        "rows": request.rows,
+    }
+    return hashlib.sha256(json.dumps(canonical, sort_keys=True).encode("utf-8")).hexdigest()
+
+
+def relational_flight_key(request: RelationalGenerationRequest) -> str:
+    encoded = json.dumps(request.dict(), sort_keys=True, separators=(",", ":"), default=str)
+    return hashlib.sha256(f"relational:{encoded}".encode("utf-8")).hexdigest()
+
+
+class _Flight:
+    def __init__(self):
+        self.done = threading.Event()
+        self.result: Any = None
+        self.error: Optional[BaseException] = None
+        self.waiters = 0
+
+
+class SingleFlight:
+    """
+    Coalesces identical in-flight work within the process.
+
+    The first caller for a key runs the function; callers that arrive with the same key
+    while it is still running wait for it and receive the same result (or exception)
+    instead of starting their own run. Nothing is kept once the run finishes - that is
+    the result cache's job.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._flights: Dict[str, _Flight] = {}
+        self.leaders = 0
+        self.coalesced = 0
+
+    def do(self, key: str, fn: Callable[[], Any]) -> Tuple[Any, bool]:
+        """Returns (result, shared); shared is True when the result came from another caller's run."""
+        with self._lock:
+            flight = self._flights.get(key)
+            if flight is not None:
+                flight.waiters += 1
+                self.coalesced += 1
+                leader = False
+            else:
+                flight = self._flights[key] = _Flight()
+                self.leaders += 1
+                leader = True
+
+        if not leader:
+            print(f"🔗 Joining in-flight generation {key[:12]} ({flight.waiters} waiting)")
+            flight.done.wait()
+            if flight.error is not None:
+                raise flight.error
+            return flight.result, True
+
+        try:
+            flight.result = fn()
+        except BaseException as e:
+            flight.error = e
+            raise
+        finally:
+            with self._lock:
+                del self._flights[key]
+            flight.done.set()
+            if flight.waiters:
+                print(f"🔗 Generation {key[:12]} served {flight.waiters} coalesced requests")
+        return flight.result, False
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "leaders": self.leaders,
+                "coalesced": self.coalesced,
+                "in_flight": len(self._flights),
+            }
+
+
+# Global singleflight group for generation endpoints
+generation_flights = SingleFlight()
@@ -0,0 +1,73 @@
+import os
+import threading
+import time
+from contextlib import contextmanager
+from typing import Any, Dict
+
+# Time a worker may take from importing the app to serving its first request
+STARTUP_BUDGET_SECONDS = float(os.getenv("STARTUP_BUDGET_SECONDS", "3.0"))
+
+
+class StartupReport:
+    """
+    Where a worker's boot time goes.
+
+    Boot phases (module imports, the lifespan hook's steps) are timed from the moment this
+    module is first imported; subsystems that are now created on first use (the LLM client,
+    pandas) record what that first use cost instead, so their price stays visible
+    without being paid at boot. ready() prints the report and warns when the boot phases
+    exceeded STARTUP_BUDGET_SECONDS.
+    """
+
+    def __init__(self, budget_seconds: float = STARTUP_BUDGET_SECONDS):
+        self.budget_seconds = budget_seconds
+        self.started = time.perf_counter()
+        self._last_mark = self.started
+        self.phases: Dict[str, float] = {}
+        self.deferred: Dict[str, float] = {}
+        self.ready_seconds = None
+        self._lock = threading.Lock()
+
+    def mark(self, name: str) -> None:
+        """Records the time since the previous mark (or since boot) as a phase."""
+        now = time.perf_counter()
+        self.phases[name] = now - self._last_mark
+        self._last_mark = now
+
+    @contextmanager
+    def measure(self, name: str):
+        started = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.phases[name] = time.perf_counter() - started
+            self._last_mark = time.perf_counter()
+
+    def record_deferred(self, name: str, seconds: float) -> None:
+        """Records the one-off cost of a subsystem initialized on first use."""
+        with self._lock:
+            self.deferred.setdefault(name, seconds)
+        print(f"⏱️  Initialized {name} on first use in {seconds:.2f}s")
+
+    def ready(self) -> None:
+        self.ready_seconds = time.perf_counter() - self.started
+        phases = ", ".join(f"{name} {seconds:.2f}s" for name, seconds in self.phases.items())
+        print(f"⏱️  Worker ready in {self.ready_seconds:.2f}s ({phases})")
+        if self.ready_seconds > self.budget_seconds:
+            slowest = max(self.phases, key=self.phases.get) if self.phases else "unknown"
+            print(f"⚠️  Startup took {self.ready_seconds:.2f}s, over the {self.budget_seconds:.1f}s budget; slowest phase: {slowest}")
+
+    def summary(self) -> Dict[str, Any]:
+        with self._lock:
+            deferred = {name: round(seconds, 3) for name, seconds in self.deferred.items()}
+        return {
+            "ready_seconds": round(self.ready_seconds, 3) if self.ready_seconds is not None else None,
+            "budget_seconds": self.budget_seconds,
+            "within_budget": self.ready_seconds is not None and self.ready_seconds <= self.budget_seconds,
+            "phases": {name: round(seconds, 3) for name, seconds in self.phases.items()},
+            "deferred": deferred,
+        }
+
+
+# Global report for this worker process
+startup_report = StartupReport()
@@ -0,0 +1,255 @@
+from typing import Any, Dict, List, Optional, Union
+
+import numpy as np
+
+from schemas import ExactValueConstraint, PercentageConstraint, RangeConstraint
+
+# Rows sampled per vectorized pass; bounds peak memory for very large requests
+SAMPLE_CHUNK_ROWS = 250_000
+
+NUMERIC_TYPES = ("integer", "float")
+COLUMN_TYPES = ("category", "string", "integer", "float", "boolean", "date", "datetime", "id", "code", "constant")
+
+
+def normalize_spec(spec: Dict) -> List[Dict]:
+    """
+    Validates a dataset spec of the form {"columns": [{"name": ..., "type": ..., ...}]} and
+    returns its column list. Columns without a usable name are dropped; unknown types become strings.
+
+    Supported column types and their keys:
+      - category / string: "values" (list) and optional "weights"; strings without values are "<name>_<row>"
+      - integer / float:   "min", "max", optional "distribution" ("uniform" or "normal"), "mean", "std", "decimals"
+      - boolean:           optional "true_probability"
+      - date / datetime:   "start", "end" (ISO strings)
+      - id:                optional "prefix", "suffix" and "start"; sequential and unique
+      - code:              "prefix" plus a random integer in ["min", "max"] (not unique)
+      - constant:          "value" repeated on every row
+    """
+    columns = spec.get("columns") if isinstance(spec, dict) else None
+    if not isinstance(columns, list):
+        raise ValueError("Dataset spec must contain a 'columns' list")
+
+    normalized = []
+    for column in columns:
+        if not isinstance(column, dict) or not column.get("name"):
+            continue
+        column = dict(column)
+        column["type"] = str(column.get("type", "string")).lower()
+        if column["type"] not in COLUMN_TYPES:
+            column["type"] = "string"
+        normalized.append(column)
+    if not normalized:
+        raise ValueError("Dataset spec does not define any usable columns")
+    return normalized
+
+
+class ColumnarSampler:
+    """
+    Samples rows from a column spec with NumPy, one whole column per draw.
+
+    Constraints are applied exactly while sampling rather than afterwards:
+    RangeConstraint narrows the numeric bounds before drawing, ExactValueConstraint
+    fixes the column, and PercentageConstraint assigns the value to exactly
+    round(percentage * rows) randomly chosen rows while the remaining rows are drawn
+    from the rest of the vocabulary.
+    """
+
+    def __init__(self, columns: List[Dict],
+                 constraints: Optional[List[Union[PercentageConstraint, ExactValueConstraint, RangeConstraint]]] = None,
+                 seed: Optional[int] = None):
+        self.columns = [dict(column) for column in columns]
+        self.rng = np.random.default_rng(seed)
+        self.percentages: Dict[str, List[PercentageConstraint]] = {}
+        self.exact: Dict[str, Any] = {}
+        self._apply_constraints(constraints or [])
+
+    def sample_columns(self, rows: int) -> Dict[str, np.ndarray]:
+        """Returns {column name: array of length rows}, sampled in chunks of SAMPLE_CHUNK_ROWS."""
+        result: Dict[str, np.ndarray] = {}
+        for column in self.columns:
+            name = column["name"]
+            if name in self.exact:
+                result[name] = _constant(self.exact[name], rows)
+                continue
+            chunks = [
+                self._sample_column(column, start, min(SAMPLE_CHUNK_ROWS, rows - start))
+                for start in range(0, rows, SAMPLE_CHUNK_ROWS)
+            ]
+            result[name] = np.concatenate(chunks) if chunks else np.empty(0, dtype=object)
+            if name in self.percentages:
+                result[name] = self._assign_percentages(column, result[name].astype(object))
+        return result
+
+    def sample(self, rows: int) -> List[Dict]:
+        """Samples rows and materializes them as records."""
+        return columns_to_records(self.sample_columns(rows))
+
+    def _apply_constraints(self, constraints) -> None:
+        by_name = {column["name"]: column for column in self.columns}
+        for constraint in constraints:
+            column = by_name.get(constraint.field)
+            if isinstance(constraint, ExactValueConstraint):
+                if column is None:
+                    column = {"name": constraint.field, "type": "string"}
+                    self.columns.append(column)
+                    by_name[constraint.field] = column
+                self.exact[constraint.field] = constraint.value
+            elif isinstance(constraint, RangeConstraint):
+                if column is None or column["type"] not in NUMERIC_TYPES:
+                    is_float = any(isinstance(v, float) for v in (constraint.min_value, constraint.max_value))
+                    column = {"name": constraint.field, "type": "float" if is_float else "integer"}
+                    self.columns = [c for c in self.columns if c["name"] != constraint.field] + [column]
+                    by_name[constraint.field] = column
+                low, high = self._bounds(column)
+                if constraint.min_value is not None:
+                    low = constraint.min_value if low is None else max(low, constraint.min_value)
+                if constraint.max_value is not None:
+                    high = constraint.max_value if high is None else min(high, constraint.max_value)
+                if low is not None and high is not None and low > high:
+                    # The spec and the constraint do not overlap; the constraint wins
+                    low, high = constraint.min_value, constraint.max_value
+                if low is None:
+                    low = high - 100
+                if high is None:
+                    high = low + 100
+                column["min"], column["max"] = low, high
+            elif isinstance(constraint, PercentageConstraint):
+                if column is None:
+                    column = {"name": constraint.field, "type": "category", "values": [constraint.value, "Other"]}
+                    self.columns.append(column)
+                    by_name[constraint.field] = column
+                self.percentages.setdefault(constraint.field, []).append(constraint)
+
+    @staticmethod
+    def _bounds(column: Dict):
+        low, high = column.get("min"), column.get("max")
+        low = float(low) if isinstance(low, (int, float)) else None
+        high = float(high) if isinstance(high, (int, float)) else None
+        return low, high
+
+    def _sample_column(self, column: Dict, offset: int, rows: int) -> np.ndarray:
+        kind = column["type"]
+        if kind == "id":
+            start = int(column.get("start", 1)) + offset
+            prefix, suffix = column.get("prefix"), column.get("suffix")
+            if prefix or suffix:
+                return _labels(str(prefix or ""), range(start, start + rows), str(suffix or ""))
+            return np.arange(start, start + rows)
+        if kind == "code":
+            low, high = int(column.get("min", 0)), int(column.get("max", 99999))
+            numbers = self.rng.integers(low, high + 1, rows)
+            if high - low < rows:
+                # Fewer possible codes than rows: format each code once and index into the table
+                return _labels(str(column.get("prefix", "")), range(low, high + 1))[numbers - low]
+            return _labels(str(column.get("prefix", "")), numbers.tolist())
+        if kind == "constant":
+            return _constant(column.get("value"), rows)
+        if kind in NUMERIC_TYPES:
+            return self._sample_numeric(column, rows)
+        if kind == "boolean":
+            return self.rng.random(rows) < float(column.get("true_probability", 0.5))
+        if kind in ("date", "datetime"):
+            return self._sample_dates(column, rows)
+        values = column.get("values")
+        if isinstance(values, list) and values:
+            return self._sample_categories(values, column.get("weights"), rows)
+        return _labels(f"{column['name']}_", range(offset + 1, offset + rows + 1))
+
+    def _sample_numeric(self, column: Dict, rows: int) -> np.ndarray:
+        low, high = self._bounds(column)
+        low = 0.0 if low is None else low
+        high = low + 100.0 if high is None else high
+        if column.get("distribution") == "normal":
+            mean = float(column.get("mean", (low + high) / 2))
+            std = float(column.get("std", (high - low) / 6 or 1.0))
+            values = np.clip(self.rng.normal(mean, std, rows), low, high)
+        else:
+            values = self.rng.uniform(low, high, rows)
+
+        if column["type"] == "integer":
+            # Round inwards so the result never leaves [low, high]
+            values = np.clip(np.rint(values), np.ceil(low), np.floor(high)).astype(np.int64)
+            return values
+        return np.round(values, int(column.get("decimals", 2)))
+
+    def _sample_dates(self, column: Dict, rows: int) -> np.ndarray:
+        unit = "D" if column["type"] == "date" else "s"
+        try:
+            start = np.datetime64(column.get("start", "2020-01-01"), unit)
+            end = np.datetime64(column.get("end", "2024-12-31"), unit)
+        except ValueError:
+            start, end = np.datetime64("2020-01-01", unit), np.datetime64("2024-12-31", unit)
+        if end < start:
+            start, end = end, start
+        span = int((end - start).astype(np.int64)) + 1
+        offsets = self.rng.integers(0, span, rows)
+        if span <= rows:
+            # Format every possible value once and index into it instead of formatting each row
+            labels = np.datetime_as_string(start + np.arange(span).astype(f"timedelta64[{unit}]"), unit=unit).astype(object)
+            return labels[offsets]
+        return np.datetime_as_string(start + offsets.astype(f"timedelta64[{unit}]"), unit=unit).astype(object)
+
+    def _sample_categories(self, values: List, weights: Optional[List], rows: int) -> np.ndarray:
+        probabilities = None
+        if isinstance(weights, list) and len(weights) == len(values):
+            weights_array = np.clip(np.asarray(weights, dtype=float), 0, None)
+            if weights_array.sum() > 0:
+                probabilities = weights_array / weights_array.sum()
+        choices = self.rng.choice(len(values), size=rows, p=probabilities)
+        return np.asarray(values, dtype=object)[choices]
+
+    def _assign_percentages(self, column: Dict, values: np.ndarray) -> np.ndarray:
+        """Gives each constrained value exactly its share of rows; other rows get unconstrained values."""
+        rows = len(values)
+        constraints = self.percentages[column["name"]]
+        constrained_values = {c.value for c in constraints}
+
+        order = self.rng.permutation(rows)
+        assigned = 0
+        for constraint in constraints:
+            count = min(int(round(constraint.percentage / 100 * rows)), rows - assigned)
+            values[order[assigned:assigned + count]] = constraint.value
+            assigned += count
+
+        rest = order[assigned:]
+        if rest.size == 0:
+            return values
+        remaining_values = values[rest]
+        clash_mask = np.zeros(rest.size, dtype=bool)
+        for value in constrained_values:
+            clash_mask |= remaining_values == value
+        clashes = rest[clash_mask]
+        if clashes.size == 0:
+            return values
+        vocabulary = column.get("values") if isinstance(column.get("values"), list) else []
+        weights = column.get("weights")
+        weights = weights if isinstance(weights, list) and len(weights) == len(vocabulary) else None
+        keep = [i for i, v in enumerate(vocabulary) if str(v) not in constrained_values]
+        if keep:
+            values[clashes] = self._sample_categories(
+                [vocabulary[i] for i in keep], [weights[i] for i in keep] if weights else None, clashes.size
+            )
+        else:
+            values[clashes] = "Other"
+        return values
+
+
+def _constant(value: Any, rows: int) -> np.ndarray:
+    # fill() is several times faster than np.full for object arrays
+    column = np.empty(rows, dtype=object)
+    column.fill(value)
+    return column
+
+
+def _labels(prefix: str, numbers, suffix: str = "") -> np.ndarray:
+    """Object array of "<prefix><n><suffix>" strings; a comprehension beats np.char for this."""
+    return np.array([f"{prefix}{n}{suffix}" for n in numbers], dtype=object)
+
+
+def columns_to_records(columns: Dict[str, np.ndarray]) -> List[Dict]:
+    """Materializes column arrays into records with native Python values (JSON-serializable)."""
+    names = list(columns)
+    if not names:
+        return []
+    lists = [columns[name].tolist() for name in names]
+    return [dict(zip(names, row)) for row in zip(*lists)]
@@ -0,0 +1,111 @@
+import hashlib
+import json
+import threading
+from typing import Any, Dict, Iterable, List, Optional
+
+
+class UniquenessEnforcer:
+    """
+    Enforces unique columns and unique rows across every batch of one generation run.
+
+    One hash set is kept per unique column plus a set of full-row fingerprints, so each
+    incoming row is checked in O(1) no matter how many rows came before. Rows whose key
+    collides with an earlier row are rejected, except for integer keys in repair_fields, which
+    are renumbered past the largest key seen so far. Rows missing a value for a required key
+    are rejected; None is allowed (and may repeat) in the other unique columns. Keys compare
+    by their string form, so 7 and "7" collide.
+    The caller asks the model again for rejected rows only, which makes up the shortfall.
+    """
+
+    def __init__(self, unique_fields: Iterable[str] = (), required_fields: Iterable[str] = (),
+                 repair_fields: Iterable[str] = (), dedupe_rows: bool = True):
+        self.required_fields = list(dict.fromkeys(required_fields))
+        self.unique_fields = list(dict.fromkeys([*self.required_fields, *unique_fields]))
+        self.repair_fields = set(repair_fields)
+        self.dedupe_rows = dedupe_rows
+        self._seen: Dict[str, set] = {field: set() for field in self.unique_fields}
+        self._max_key: Dict[str, int] = {field: 0 for field in self.repair_fields}
+        self._fingerprints = set()
+        self._lock = threading.Lock()
+        self.accepted = 0
+        self.duplicate_rows = 0
+        self.key_collisions = 0
+        self.missing_keys = 0
+        self.repaired_keys = 0
+
+    def filter(self, records: List[Dict]) -> List[Dict]:
+        """Returns the records that keep every unique column and the row set free of duplicates."""
+        accepted = []
+        with self._lock:
+            for record in records:
+                fingerprint = self._fingerprint(record) if self.dedupe_rows else None
+                if fingerprint is not None and fingerprint in self._fingerprints:
+                    self.duplicate_rows += 1
+                    continue
+                keys = self._check_keys(record)
+                if keys is None:
+                    continue
+                for field, key in keys.items():
+                    self._seen[field].add(key)
+                if fingerprint is not None:
+                    # Fingerprint after a repair, so the renumbered row is what later rows compare against
+                    self._fingerprints.add(self._fingerprint(record) if self.repair_fields & keys.keys() else fingerprint)
+                accepted.append(record)
+            self.accepted += len(accepted)
+        return accepted
+
+    def stats(self) -> Dict[str, int]:
+        with self._lock:
+            return {
+                "accepted": self.accepted,
+                "duplicate_rows": self.duplicate_rows,
+                "key_collisions": self.key_collisions,
+                "missing_keys": self.missing_keys,
+                "repaired_keys": self.repaired_keys,
+            }
+
+    def _check_keys(self, record: Dict) -> Optional[Dict[str, str]]:
+        """Returns the record's key per unique column (repairing integer keys in place), or None to reject it."""
+        keys = {}
+        repairs = {}
+        for field in self.unique_fields:
+            value = record.get(field)
+            if value is None:
+                if field in self.required_fields:
+                    self.missing_keys += 1
+                    return None
+                continue
+            key = self._key(value)
+            if field in self.repair_fields and isinstance(value, int) and not isinstance(value, bool):
+                if key in self._seen[field]:
+                    repairs[field] = self._max_key[field] + 1
+                    continue
+            elif key in self._seen[field]:
+                self.key_collisions += 1
+                return None
+            keys[field] = key
+
+        for field, value in repairs.items():
+            # A renumbered key can still collide with a string key such as "12"
+            while str(value) in self._seen[field]:
+                value += 1
+            record[field] = value
+            keys[field] = str(value)
+            self.repaired_keys += 1
+        for field in self.repair_fields & keys.keys():
+            value = record[field]
+            if isinstance(value, int) and not isinstance(value, bool):
+                self._max_key[field] = max(self._max_key[field], value)
+        return keys
+
+    @staticmethod
+    def _key(value: Any) -> str:
+        if isinstance(value, (dict, list)):
+            return json.dumps(value, sort_keys=True, default=str)
+        return str(value)
+
+    @staticmethod
+    def _fingerprint(record: Dict) -> bytes:
+        # 128-bit digests keep the set small while making accidental collisions negligible
+        encoded = json.dumps(record, sort_keys=True, default=str).encode("utf-8")
+        return hashlib.blake2b(encoded, digest_size=16).digest()
@@ -0,0 +1,158 @@
+import csv
+import io
+import json
+import re
+from typing import Any, Dict, List, Tuple
+
+from json_stream import parse_records
+
+# "records": a JSON array of objects (the original format, every record repeats the column names)
+# "columnar": one JSON object with the column names once and every row as an array of values
+# "csv": a header line followed by one CSV line per record
+OUTPUT_FORMATS = ("records", "columnar", "csv")
+
+_INSTRUCTIONS = {
+    "records": "Return only a valid JSON array of objects, with no extra text or markdown.",
+    "columnar": (
+        'Return only a single JSON object of the form {"columns": ["first_column", "second_column", ...], '
+        '"rows": [[value, value, ...], ...]} where every row lists its values in the order of "columns". '
+        "No extra text or markdown."
+    ),
+    "csv": (
+        "Return only CSV: a header line with the column names, then one line per record. "
+        'Quote values that contain commas or quotes. No extra text or markdown.'
+    ),
+}
+
+_FENCE = re.compile(r'```[a-zA-Z]*')
+# No leading zeros, so codes such as "007" stay strings
+_INTEGER = re.compile(r'-?(0|[1-9]\d*)\Z')
+_FLOAT = re.compile(r'-?(\d+\.\d*|\.\d+|\d+(?=[eE]))([eE][-+]?\d+)?\Z')
+# Anything _typed() might convert: numbers, booleans, null markers and empty strings
+_MAYBE_TYPED = re.compile(r'-?[\d.]|(true|false|null|none)?\Z', re.IGNORECASE)
+_NUMBER = re.compile(r'-?(0|[1-9]\d*|\d+\.\d*|\.\d+|\d+(?=[eE]))([eE][-+]?\d+)?\Z')
+
+
+class DecodeStats:
+    """Same counters as JSONRecordParser, for the formats that do not go through it."""
+
+    def __init__(self):
+        self.salvaged = 0
+        self.dropped = 0
+        self.truncated = False
+
+
+def output_instruction(output_format: str) -> str:
+    """The sentence that tells the model which format to answer in."""
+    return _INSTRUCTIONS[output_format]
+
+
+def decode_output(text: str, output_format: str) -> Tuple[List[Dict], Any]:
+    """Decodes a model response in the given format into records plus salvaged/dropped/truncated counters."""
+    if output_format == "columnar":
+        return decode_columnar(text)
+    if output_format == "csv":
+        return decode_csv(text)
+    return parse_records(text)
+
+
+def decode_columnar(text: str) -> Tuple[List[Dict], DecodeStats]:
+    """
+    Decodes {"columns": [...], "rows": [[...], ...]}. Every row is decoded on its own with
+    JSONDecoder.raw_decode, so a truncated response keeps all of its complete rows and a row
+    with the wrong number of values is dropped without affecting its neighbours.
+    """
+    stats = DecodeStats()
+    decoder = json.JSONDecoder()
+    header_match = re.search(r'"columns"\s*:\s*\[', text)
+    rows_match = re.search(r'"rows"\s*:\s*\[', text)
+    if header_match is None or rows_match is None:
+        # Not in the requested shape; the model may have answered with plain records
+        return parse_records(text)
+    try:
+        columns, _ = decoder.raw_decode(text, header_match.end() - 1)
+    except ValueError:
+        stats.truncated = True
+        return [], stats
+    columns = [str(column) for column in columns]
+
+    records: List[Dict] = []
+    pos = rows_match.end()
+    length = len(text)
+    while True:
+        while pos < length and text[pos] in " \t\r\n,":
+            pos += 1
+        if pos >= length:
+            stats.truncated = True
+            break
+        if text[pos] == "]":
+            break
+        try:
+            row, pos = decoder.raw_decode(text, pos)
+        except ValueError:
+            # Either the response was cut off here or the row is malformed; skip to the next row
+            next_row = text.find("[", pos + 1)
+            stats.dropped += 1
+            if next_row == -1:
+                stats.truncated = True
+                break
+            pos = next_row
+            continue
+        if isinstance(row, list) and len(row) == len(columns):
+            records.append(dict(zip(columns, row)))
+            stats.salvaged += 1
+        else:
+            stats.dropped += 1
+    return records, stats
+
+
+def decode_csv(text: str) -> Tuple[List[Dict], DecodeStats]:
+    """
+    Decodes a header line plus CSV rows. Values are typed back to int, float, bool or None
+    where they look like one. Rows with the wrong number of fields are dropped; when that is
+    the last row, the response counts as truncated.
+    """
+    stats = DecodeStats()
+    text = _FENCE.sub("", text).strip("\n")
+    rows = [row for row in csv.reader(io.StringIO(text), skipinitialspace=True) if row]
+    if not rows:
+        return [], stats
+    columns = [column.strip() for column in rows[0]]
+
+    complete = [row for row in rows[1:] if len(row) == len(columns)]
+    stats.salvaged = len(complete)
+    stats.dropped = len(rows) - 1 - len(complete)
+    if rows[1:] and len(rows[-1]) != len(columns):
+        stats.truncated = True
+    if not complete:
+        return [], stats
+    # Type whole columns at once; only mixed columns fall back to typing cell by cell
+    typed = [_typed_column(values) for values in zip(*complete)]
+    return [dict(zip(columns, row)) for row in zip(*typed)], stats
+
+
+def _typed_column(values: Tuple[str, ...]) -> List:
+    if not any(map(_MAYBE_TYPED.match, values)):
+        return list(values)
+    if all(map(_INTEGER.match, values)):
+        return list(map(int, values))
+    if all(map(_NUMBER.match, values)):
+        return list(map(float, values))
+    if set(map(str.lower, values)) <= {"true", "false"}:
+        return [value.lower() == "true" for value in values]
+    return [_typed(value) for value in values]
+
+
+def _typed(value: str):
+    if value == "":
+        return None
+    if _INTEGER.match(value):
+        return int(value)
+    if _FLOAT.match(value):
+        return float(value)
+    lowered = value.lower()
+    if lowered in ("true", "false"):
+        return lowered == "true"
+    if lowered in ("null", "none"):
+        return None
+    return value